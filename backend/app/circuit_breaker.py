@@ -0,0 +1,133 @@
+from typing import Any, Dict, Optional
+from collections import deque
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Per-provider circuit breakers. Each provider host gets one breaker that records the
+# outcome of its last calls; calls slower than SLOW_CALL_S count as failures. When the
+# failure rate over the window trips the breaker it opens and calls are refused
+# immediately (callers fall back) for OPEN_S seconds, after which a limited number of
+# half-open probe calls decide whether it closes again or re-opens.
+
+BREAKER_FAILURE_RATE = float(os.environ.get("PROVIDER_BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_MIN_CALLS = int(os.environ.get("PROVIDER_BREAKER_MIN_CALLS", "5"))
+BREAKER_WINDOW = int(os.environ.get("PROVIDER_BREAKER_WINDOW", "20"))
+BREAKER_SLOW_CALL_S = float(os.environ.get("PROVIDER_BREAKER_SLOW_CALL_S", "5"))
+BREAKER_OPEN_S = float(os.environ.get("PROVIDER_BREAKER_OPEN_S", "30"))
+BREAKER_HALF_OPEN_PROBES = int(os.environ.get("PROVIDER_BREAKER_HALF_OPEN_PROBES", "1"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate: float = BREAKER_FAILURE_RATE, min_calls: int = BREAKER_MIN_CALLS,
+                 window: int = BREAKER_WINDOW, slow_call_s: float = BREAKER_SLOW_CALL_S,
+                 open_seconds: float = BREAKER_OPEN_S, half_open_probes: int = BREAKER_HALF_OPEN_PROBES):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_s = slow_call_s
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._outcomes = deque(maxlen=window)  # True = failed or slow
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "trips": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance()
+            return self._state
+
+    def _advance(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+    def _trip(self):
+        if self._state != OPEN:
+            self._counters["trips"] += 1
+            print(f"Circuit breaker for {self.name} opened")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now. Every allowed call must end with record() or release()."""
+        with self._lock:
+            self._advance()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def release(self):
+        """An allowed call ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record(self, success: bool, elapsed_s: float = 0.0):
+        slow = elapsed_s > self.slow_call_s
+        failed = not success or slow
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["failures"] += not success
+            self._counters["slow_calls"] += slow
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed:
+                    self._trip()
+                else:
+                    print(f"Circuit breaker for {self.name} closed")
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            if self._state == OPEN:
+                return  # a call that started before the breaker opened
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                self._trip()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._advance()
+            stats = dict(self._counters)
+            stats["state"] = self._state
+            stats["window_failure_rate"] = round(sum(self._outcomes) / len(self._outcomes), 4) if self._outcomes else 0.0
+            if self._state == OPEN:
+                stats["retry_in_s"] = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+            return stats
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url_or_host: str) -> CircuitBreaker:
+    """Shared breaker for the provider host of a URL (or a bare host name)."""
+    host = urlsplit(url_or_host).netloc or url_or_host
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host)
+        return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.stats() for b in breakers}
+
+
+def is_failure_status(status_code: Optional[int]) -> bool:
+    """Responses that count against the provider: server errors and rate limiting."""
+    return status_code is None or status_code >= 500 or status_code == 429
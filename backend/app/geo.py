@@ -0,0 +1,58 @@
+import numpy as np
+
+# Batch (NumPy) versions of the scalar helpers in route_service.
+# Polylines are (N, 2) arrays or lists of [lat, lng]; distances are in km and
+# bearings in degrees 0-360, matching calculate_distance / calculate_bearing.
+
+EARTH_RADIUS_KM = 6371
+
+
+def _as_coords(coords) -> np.ndarray:
+    return np.asarray(coords, dtype=float).reshape(-1, 2)
+
+
+def haversine(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Element-wise (broadcasting) Haversine distance in km."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def bearing(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Element-wise (broadcasting) initial bearing from point 1 to point 2."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lng1, lat2, lng2))
+    y = np.sin(lng2 - lng1) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lng2 - lng1)
+    return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+
+def distance_matrix(coords_a, coords_b=None) -> np.ndarray:
+    """Pairwise distances (km) between two point sets, or within one set."""
+    a = _as_coords(coords_a)
+    b = a if coords_b is None else _as_coords(coords_b)
+    return haversine(a[:, 0:1], a[:, 1:2], b[None, :, 0], b[None, :, 1])
+
+
+def segment_distances(coords) -> np.ndarray:
+    """Length (km) of each consecutive segment of a polyline (N-1 values)."""
+    c = _as_coords(coords)
+    return haversine(c[:-1, 0], c[:-1, 1], c[1:, 0], c[1:, 1])
+
+
+def cumulative_lengths(coords) -> np.ndarray:
+    """Distance (km) along the polyline at each vertex, starting at 0 (N values)."""
+    seg = segment_distances(coords)
+    out = np.zeros(len(seg) + 1)
+    np.cumsum(seg, out=out[1:])
+    return out
+
+
+def segment_bearings(coords) -> np.ndarray:
+    """Bearing of each consecutive segment of a polyline (N-1 values)."""
+    c = _as_coords(coords)
+    return bearing(c[:-1, 0], c[:-1, 1], c[1:, 0], c[1:, 1])
+
+
+def polyline_length(coords) -> float:
+    """Total length (km) of a polyline."""
+    return float(segment_distances(coords).sum())
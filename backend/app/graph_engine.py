@@ -0,0 +1,283 @@
+from typing import List, Dict, Any, Tuple
+import numpy as np
+
+# When the landmark set changes the engine's matrices are patched rather than recomputed
+# (FloydWarshallEngine.updated). Inserting a landmark or lowering an edge weight is an O(n^2)
+# min-plus update through the new vertex or edge. Removing a landmark or raising / removing an
+# edge only recomputes the pairs whose shortest paths used it, unless that is more than
+# INCREMENTAL_MAX_PAIRS_FRACTION of all pairs; a change touching more than
+# INCREMENTAL_MAX_CHANGED_FRACTION of the landmarks is rebuilt from scratch.
+INCREMENTAL_MAX_PAIRS_FRACTION = 0.25
+INCREMENTAL_MAX_CHANGED_FRACTION = 0.25
+# Relative slack when testing whether a path through a vertex or edge is a shortest path
+PATH_TOLERANCE = 1e-9
+
+
+def floyd_warshall_matrix(weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized Floyd-Warshall over a dense weight matrix (np.inf = no edge).
+    Each pivot k is one min-plus update of the whole matrix, which is equivalent
+    to the triple loop because row k and column k do not change while k is the pivot.
+    Returns: dist (float matrix), next_hop (int matrix, -1 = no path).
+    """
+    n = weights.shape[0]
+    dist = np.array(weights, dtype=float, copy=True)
+    next_hop = np.where(np.isfinite(dist), np.arange(n)[None, :], -1)
+    np.fill_diagonal(dist, 0.0)
+    np.fill_diagonal(next_hop, -1)
+    via = np.empty_like(dist)
+    better = np.empty(dist.shape, dtype=bool)
+    for k in range(n):
+        np.add(dist[:, k:k + 1], dist[k:k + 1, :], out=via)
+        np.less(via, dist, out=better)
+        np.copyto(dist, via, where=better)
+        np.copyto(next_hop, next_hop[:, k:k + 1], where=better)
+    return dist, next_hop
+
+
+def _on_shortest_paths(via: np.ndarray, dist: np.ndarray) -> np.ndarray:
+    """Pairs whose distance is matched by the path lengths in via (ties included)."""
+    return np.isfinite(via) & (via <= dist + PATH_TOLERANCE * np.maximum(dist, 1.0))
+
+
+def recompute_pairs(weights: np.ndarray, dist: np.ndarray, next_hop: np.ndarray, affected: np.ndarray):
+    """
+    Recompute the affected (source, target) entries of dist / next_hop in place; every other
+    entry must already be correct for weights. Each affected pair is relaxed through the
+    out-edges of its source against the current matrix (Bellman-Ford over just those pairs)
+    until nothing improves.
+    """
+    pi, pj = np.nonzero(affected)
+    if not len(pi):
+        return
+    src, dst = np.nonzero(np.isfinite(weights))
+    loop = src == dst
+    src, dst = src[~loop], dst[~loop]
+    indptr = np.searchsorted(src, np.arange(weights.shape[0] + 1))
+    # One entry per (affected pair, out-edge of its source)
+    degree = np.diff(indptr)[pi]
+    offsets = np.cumsum(degree) - degree
+    pair_of = np.repeat(np.arange(len(pi)), degree)
+    edge = indptr[pi][pair_of] + np.arange(len(pair_of)) - offsets[pair_of]
+    hop, col, edge_km = dst[edge], pj[pair_of], weights[src[edge], dst[edge]]
+    starts = offsets[degree > 0]
+
+    dist[pi, pj] = np.inf
+    next_hop[pi, pj] = -1
+    if not len(edge):
+        return
+    best = np.full(len(pi), np.inf)
+    while True:
+        via = edge_km + dist[hop, col]
+        best[degree > 0] = np.minimum.reduceat(via, starts)
+        better = best < dist[pi, pj]
+        if not better.any():
+            break
+        dist[pi[better], pj[better]] = best[better]
+    # First hop: the first out-edge whose path attains the final distance
+    attained = np.where(via == dist[pi, pj][pair_of], np.arange(len(via)), len(via))
+    first = np.full(len(pi), len(via))
+    first[degree > 0] = np.minimum.reduceat(attained, starts)
+    reached = (first < len(via)) & np.isfinite(dist[pi, pj])
+    next_hop[pi[reached], pj[reached]] = hop[first[reached]]
+
+
+class FloydWarshallEngine:
+    """
+    All-pairs shortest paths for the landmark graph, held as NumPy matrices
+    indexed by landmark position. Built once and shared by the FW endpoints;
+    updated() derives the engine for a changed landmark set incrementally.
+    """
+    name = "floyd_warshall"
+
+    def __init__(self, graph: Dict[str, List[Tuple[str, float]]], locations: List[Dict[str, Any]], max_edge_km: float):
+        self.max_edge_km = max_edge_km
+        self.names = list(graph.keys())
+        self.index = {name: i for i, name in enumerate(self.names)}
+        coords_by_name = {loc['name']: (loc['lat'], loc['lng']) for loc in locations}
+        self.coords = [coords_by_name[name] for name in self.names]
+        n = len(self.names)
+        weights = np.full((n, n), np.inf)
+        for u, edges in graph.items():
+            for v, w in edges:
+                weights[self.index[u], self.index[v]] = w
+        self.weights = weights
+        self.dist, self.next_hop = floyd_warshall_matrix(weights)
+
+    def distance(self, start: str, end: str) -> float:
+        return float(self.dist[self.index[start], self.index[end]])
+
+    def path_indices(self, start: str, end: str) -> List[int]:
+        i, j = self.index[start], self.index[end]
+        if self.next_hop[i, j] < 0:
+            return []
+        path = [i]
+        while i != j:
+            i = int(self.next_hop[i, j])
+            path.append(i)
+        return path
+
+    def path(self, start: str, end: str) -> List[str]:
+        """Landmark names along the shortest path ([] if unreachable, as reconstruct_fw_path)."""
+        return [self.names[i] for i in self.path_indices(start, end)]
+
+    def path_coords(self, start: str, end: str) -> List[Tuple[float, float]]:
+        return [self.coords[i] for i in self.path_indices(start, end)]
+
+    def shortest_path(self, start: str, end: str) -> Tuple[List[str], float]:
+        return self.path(start, end), self.distance(start, end)
+
+    # --- Incremental updates (these modify the engine; updated() applies them to a copy) ---
+
+    def _copy(self) -> "FloydWarshallEngine":
+        engine = object.__new__(FloydWarshallEngine)
+        engine.max_edge_km = self.max_edge_km
+        engine.names = list(self.names)
+        engine.index = dict(self.index)
+        engine.coords = list(self.coords)
+        engine.weights = self.weights.copy()
+        engine.dist = self.dist.copy()
+        engine.next_hop = self.next_hop.copy()
+        return engine
+
+    def _recompute_affected(self, affected: np.ndarray):
+        """Recompute the pairs flagged in affected, or everything if there are too many."""
+        if affected.sum() > INCREMENTAL_MAX_PAIRS_FRACTION * affected.size:
+            self.dist, self.next_hop = floyd_warshall_matrix(self.weights)
+        else:
+            recompute_pairs(self.weights, self.dist, self.next_hop, affected)
+
+    def add_landmark(self, name: str, coords: Tuple[float, float],
+                     out_edges: List[Tuple[str, float]], in_edges: List[Tuple[str, float]]):
+        """
+        Insert a landmark with its edges to / from existing landmarks in O(n^2): distances from
+        and to the new vertex come from its neighbours' rows and columns, then every pair is
+        relaxed through it.
+        """
+        n = len(self.names)
+        v = n
+        weights = np.full((n + 1, n + 1), np.inf)
+        weights[:n, :n] = self.weights
+        dist = np.full((n + 1, n + 1), np.inf)
+        dist[:n, :n] = self.dist
+        next_hop = np.full((n + 1, n + 1), -1, dtype=self.next_hop.dtype)
+        next_hop[:n, :n] = self.next_hop
+        for u, w in out_edges:
+            weights[v, self.index[u]] = w
+        for u, w in in_edges:
+            weights[self.index[u], v] = w
+        dist[v, v] = 0.0
+        cols = np.arange(n)
+
+        out = np.array(sorted({self.index[u] for u, _ in out_edges}), dtype=np.intp)
+        if len(out):
+            via = weights[v, out][:, None] + dist[out, :n]
+            best = via.argmin(axis=0)
+            dist[v, :n] = via[best, cols]
+            next_hop[v, :n] = np.where(np.isfinite(dist[v, :n]), out[best], -1)
+        into = np.array(sorted({self.index[u] for u, _ in in_edges}), dtype=np.intp)
+        if len(into):
+            via = dist[:n, into] + weights[into, v][None, :]
+            best = via.argmin(axis=1)
+            dist[:n, v] = via[cols, best]
+            # First hop towards the chosen in-neighbour, or the new vertex itself from that neighbour
+            first = np.where(cols == into[best], v, next_hop[cols, into[best]])
+            next_hop[:n, v] = np.where(np.isfinite(dist[:n, v]), first, -1)
+
+        via = dist[:n, v:v + 1] + dist[v:v + 1, :n]
+        better = via < dist[:n, :n]
+        np.copyto(dist[:n, :n], via, where=better)
+        np.copyto(next_hop[:n, :n], np.broadcast_to(next_hop[:n, v:v + 1], (n, n)), where=better)
+
+        self.weights, self.dist, self.next_hop = weights, dist, next_hop
+        self.names.append(name)
+        self.index[name] = v
+        self.coords.append(tuple(coords))
+
+    def remove_landmark(self, name: str):
+        """Remove a landmark; only the pairs whose shortest path ran through it are recomputed."""
+        x = self.index[name]
+        affected = _on_shortest_paths(self.dist[:, x:x + 1] + self.dist[x:x + 1, :], self.dist)
+        affected[x, :] = False
+        affected[:, x] = False
+        np.fill_diagonal(affected, False)
+        self.weights[x, :] = np.inf
+        self.weights[:, x] = np.inf
+        self._recompute_affected(affected)
+
+        keep = np.arange(len(self.names)) != x
+        self.weights = self.weights[keep][:, keep]
+        self.dist = self.dist[keep][:, keep]
+        next_hop = self.next_hop[keep][:, keep]
+        self.next_hop = np.where(next_hop > x, next_hop - 1, next_hop)
+        del self.names[x]
+        del self.coords[x]
+        self.index = {n: i for i, n in enumerate(self.names)}
+
+    def set_edge(self, start: str, end: str, km: float):
+        """
+        Set the weight of edge start -> end (np.inf removes it). A decrease relaxes every pair
+        through the edge in O(n^2); an increase recomputes the pairs whose shortest paths used it.
+        """
+        a, b = self.index[start], self.index[end]
+        old = self.weights[a, b]
+        if km == old:
+            return
+        self.weights[a, b] = km
+        if km < old:
+            if km >= self.dist[a, b]:
+                return
+            via = self.dist[:, a:a + 1] + km + self.dist[b:b + 1, :]
+            better = via < self.dist
+            np.copyto(self.dist, via, where=better)
+            first = self.next_hop[:, a:a + 1].copy()
+            first[a] = b
+            np.copyto(self.next_hop, np.broadcast_to(first, self.dist.shape), where=better)
+        elif _on_shortest_paths(np.array(old), self.dist[a, b]):
+            affected = _on_shortest_paths(self.dist[:, a:a + 1] + old + self.dist[b:b + 1, :], self.dist)
+            np.fill_diagonal(affected, False)
+            self._recompute_affected(affected)
+
+    def updated(self, graph: Dict[str, List[Tuple[str, float]]], locations: List[Dict[str, Any]]) -> "FloydWarshallEngine":
+        """
+        Engine for a changed landmark graph, derived from this one: removed and moved landmarks
+        are deleted, edges between the others are re-weighted, then new landmarks are inserted.
+        This engine is left untouched, so readers holding it are unaffected.
+        """
+        coords_by_name = {loc['name']: (loc['lat'], loc['lng']) for loc in locations}
+        removed = [name for name in self.names
+                   if name not in graph or tuple(coords_by_name[name]) != tuple(self.coords[self.index[name]])]
+        removed_names = set(removed)
+        added = [name for name in graph if name not in self.index or name in removed_names]
+        if len(removed) + len(added) > INCREMENTAL_MAX_CHANGED_FRACTION * max(len(self.names), 1):
+            return FloydWarshallEngine(graph, locations, self.max_edge_km)
+
+        engine = self._copy()
+        for name in removed:
+            engine.remove_landmark(name)
+        # Edges between the remaining landmarks: raise / remove first, lower last (after inserts)
+        decreases = []
+        for u in list(engine.names):
+            row = engine.weights[engine.index[u]].copy()
+            new_edges = {v: w for v, w in graph[u] if v in engine.index}
+            for j in np.flatnonzero(np.isfinite(row)):
+                v = engine.names[j]
+                if v == u:
+                    continue
+                w = new_edges.get(v, np.inf)
+                if w > row[j]:
+                    engine.set_edge(u, v, w)
+                elif w < row[j]:
+                    decreases.append((u, v, w))
+            decreases += [(u, v, w) for v, w in new_edges.items() if not np.isfinite(row[engine.index[v]])]
+        incoming = {}
+        for u, edges in graph.items():
+            for v, w in edges:
+                incoming.setdefault(v, []).append((u, w))
+        for name in added:
+            engine.add_landmark(name, coords_by_name[name],
+                                [(u, w) for u, w in graph[name] if u in engine.index],
+                                [(u, w) for u, w in incoming.get(name, []) if u in engine.index])
+        for u, v, w in decreases:
+            engine.set_edge(u, v, w)
+        return engine
@@ -0,0 +1,36 @@
+from typing import List
+import numpy as np
+
+from .spatial_index import KM_PER_DEG_LAT
+
+# Approximate reachability polygons. Every reached point (the origin and each reachable
+# landmark) can still travel for its leftover time budget, which covers a disc around it;
+# the polygon is the outline of those discs seen from the origin, sampled at a fixed
+# number of bearings (so it is star-shaped around the origin).
+
+POLYGON_BEARINGS = 72
+
+
+def reachability_polygon(origin, centers, radii_km, bearings: int = POLYGON_BEARINGS) -> List[List[float]]:
+    """
+    Closed [lat, lng] ring around origin covering the discs (centers [lat, lng], radii in km).
+    Along each bearing the ring reaches the farthest disc edge crossing that ray.
+    """
+    origin = np.asarray(origin, dtype=float)
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    radii = np.asarray(radii_km, dtype=float)
+    lng_scale = KM_PER_DEG_LAT * np.cos(np.radians(origin[0]))
+    # Local planar km offsets from the origin (x east, y north)
+    x = (centers[:, 1] - origin[1]) * lng_scale
+    y = (centers[:, 0] - origin[0]) * KM_PER_DEG_LAT
+    theta = np.linspace(0, 2 * np.pi, bearings, endpoint=False)
+    ux, uy = np.sin(theta)[:, None], np.cos(theta)[:, None]
+    along = ux * x + uy * y  # (bearings, discs): projection of each center on each ray
+    across = ux * y - uy * x
+    half_chord = np.sqrt(np.maximum(radii ** 2 - across ** 2, 0))
+    reach = np.where(np.abs(across) <= radii, along + half_chord, 0)
+    extent = np.maximum(reach.max(axis=1), 0) if len(radii) else np.zeros(bearings)
+    lats = origin[0] + extent * np.cos(theta) / KM_PER_DEG_LAT
+    lngs = origin[1] + extent * np.sin(theta) / lng_scale
+    ring = np.column_stack([lats, lngs])
+    return np.vstack([ring, ring[:1]]).round(6).tolist()
@@ -0,0 +1,377 @@
+from typing import List, Dict, Any, Optional, Tuple
+import bz2
+import gzip
+import heapq
+import math
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+import numpy as np
+
+from .geo import haversine, segment_bearings
+from .spatial_index import GridIndex
+
+# In-process road router over a local OpenStreetMap extract (.osm / .osm.gz / .osm.bz2 XML).
+# The road network is compiled into CSR arrays (indptr/indices plus per-edge attributes)
+# with array-backed node coordinates and cached next to the extract as <extract>.csr.npz.
+# Convert a .pbf download first, e.g. `osmium cat dehradun.osm.pbf -o dehradun.osm`.
+
+LOCAL_OSM_PATH = os.environ.get("LOCAL_OSM_PATH")
+# After a failed load the extract is not re-parsed until it changes or this many seconds pass
+LOCAL_OSM_RETRY_INTERVAL = float(os.environ.get("LOCAL_OSM_RETRY_INTERVAL", "300"))
+
+MODES = ("car", "bike", "foot")
+
+# Road classes (highway=*, with *_link folded into the parent class) and speeds in km/h per mode.
+# A speed of 0 means the mode may not use that class.
+ROAD_CLASSES = [
+    "motorway", "trunk", "primary", "secondary", "tertiary", "unclassified", "residential",
+    "service", "living_street", "road", "track", "cycleway", "path", "footway", "pedestrian", "steps",
+]
+CLASS_SPEEDS_KMH = {
+    "car":  [80, 60, 45, 40, 35, 30, 25, 15, 10, 25, 10, 0, 0, 0, 0, 0],
+    "bike": [0, 0, 18, 18, 16, 16, 15, 12, 10, 15, 10, 18, 12, 8, 8, 0],
+    "foot": [0, 0, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 4],
+}
+
+PROFILE_MODES = {
+    "driving-car": "car", "driving": "car", "car": "car",
+    "cycling-regular": "bike", "cycling": "bike", "bike": "bike",
+    "foot-walking": "foot", "walking": "foot", "foot": "foot", "walk": "foot",
+}
+
+# Snapped query points further than this from any usable road are rejected
+MAX_SNAP_KM = 2.0
+
+
+def _open_extract(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def _compass(bearing: float) -> str:
+    return ["north", "northeast", "east", "southeast", "south", "southwest", "west", "northwest"][int((bearing + 22.5) // 45) % 8]
+
+
+class LocalRoadNetwork:
+    """
+    Road graph in CSR form. Outgoing edges of node u are indptr[u]:indptr[u+1] and
+    every per-edge array (indices, length_m, road_class, name_idx, against_oneway)
+    is aligned with that range.
+    """
+
+    def __init__(self, node_lat, node_lng, indptr, indices, length_m, road_class, name_idx, against_oneway, names):
+        self.node_lat = np.asarray(node_lat, dtype=np.float64)
+        self.node_lng = np.asarray(node_lng, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.length_m = np.asarray(length_m, dtype=np.float32)
+        self.road_class = np.asarray(road_class, dtype=np.uint8)
+        self.name_idx = np.asarray(name_idx, dtype=np.int32)
+        self.against_oneway = np.asarray(against_oneway, dtype=bool)
+        self.names = list(names)
+        self._lock = threading.Lock()
+        self._adjacency = None
+        self._mode_costs: Dict[str, List[float]] = {}
+        self._snap_indexes: Dict[str, Tuple[GridIndex, np.ndarray]] = {}
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_lat)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    # --- Loading ---
+
+    @classmethod
+    def from_osm_xml(cls, path: str) -> "LocalRoadNetwork":
+        """Parse highway ways from an OSM XML extract and compile them to CSR."""
+        class_codes = {name: i for i, name in enumerate(ROAD_CLASSES)}
+        node_coords: Dict[int, Tuple[float, float]] = {}
+        ways = []
+        with _open_extract(path) as f:
+            for _, elem in ET.iterparse(f, events=("end",)):
+                if elem.tag == "node":
+                    node_coords[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+                elif elem.tag == "way":
+                    tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+                    highway = tags.get("highway", "")
+                    if highway.endswith("_link"):
+                        highway = highway[:-5]
+                    if highway in class_codes and tags.get("area") != "yes":
+                        oneway = tags.get("oneway")
+                        refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                        if oneway == "-1":
+                            refs.reverse()
+                        is_oneway = oneway in ("yes", "1", "true", "-1") or tags.get("junction") == "roundabout"
+                        ways.append((refs, class_codes[highway], tags.get("name") or tags.get("ref") or "", is_oneway))
+                if elem.tag in ("node", "way", "relation"):
+                    elem.clear()
+
+        compact: Dict[int, int] = {}
+        names = [""]
+        name_codes = {"": 0}
+        src, dst, cls_, name_, against = [], [], [], [], []
+        for refs, road_class, name, is_oneway in ways:
+            refs = [r for r in refs if r in node_coords]
+            name_code = name_codes.setdefault(name, len(names))
+            if name_code == len(names):
+                names.append(name)
+            for a, b in zip(refs, refs[1:]):
+                if a == b:
+                    continue
+                ia = compact.setdefault(a, len(compact))
+                ib = compact.setdefault(b, len(compact))
+                src += [ia, ib]
+                dst += [ib, ia]
+                cls_ += [road_class, road_class]
+                name_ += [name_code, name_code]
+                against += [False, is_oneway]
+
+        osm_ids = np.fromiter(compact.keys(), dtype=np.int64, count=len(compact))
+        coords = np.array([node_coords[i] for i in osm_ids], dtype=np.float64).reshape(-1, 2)
+        return cls.from_edges(coords[:, 0], coords[:, 1], np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64),
+                              np.array(cls_, dtype=np.uint8), np.array(name_, dtype=np.int32),
+                              np.array(against, dtype=bool), names)
+
+    @classmethod
+    def from_edges(cls, node_lat, node_lng, src, dst, road_class, name_idx, against_oneway, names) -> "LocalRoadNetwork":
+        """Sort an edge list by source node into CSR and compute edge lengths."""
+        order = np.argsort(src, kind="stable")
+        src, dst = src[order], dst[order]
+        indptr = np.zeros(len(node_lat) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(node_lat)), out=indptr[1:])
+        length_m = haversine(node_lat[src], node_lng[src], node_lat[dst], node_lng[dst]) * 1000
+        return cls(node_lat, node_lng, indptr, dst, length_m, road_class[order], name_idx[order],
+                   against_oneway[order], names)
+
+    def save(self, path: str):
+        np.savez(path, node_lat=self.node_lat, node_lng=self.node_lng, indptr=self.indptr, indices=self.indices,
+                 length_m=self.length_m, road_class=self.road_class, name_idx=self.name_idx,
+                 against_oneway=self.against_oneway, names=np.array(self.names, dtype=str))
+
+    @classmethod
+    def load(cls, path: str) -> "LocalRoadNetwork":
+        data = np.load(path)
+        return cls(data["node_lat"], data["node_lng"], data["indptr"], data["indices"], data["length_m"],
+                   data["road_class"], data["name_idx"], data["against_oneway"], data["names"].tolist())
+
+    @classmethod
+    def from_extract(cls, path: str) -> "LocalRoadNetwork":
+        """Load the compiled CSR cache if it is newer than the extract, otherwise parse and cache."""
+        cache_path = path + ".csr.npz"
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+            return cls.load(cache_path)
+        network = cls.from_osm_xml(path)
+        try:
+            network.save(cache_path)
+        except OSError as e:
+            print(f"Could not write road network cache {cache_path}: {e}")
+        return network
+
+    # --- Queries ---
+
+    def _ensure_mode(self, mode: str):
+        with self._lock:
+            if self._adjacency is None:
+                self._adjacency = (self.indptr.tolist(), self.indices.tolist())
+            if mode not in self._mode_costs:
+                speeds_ms = np.array(CLASS_SPEEDS_KMH[mode], dtype=np.float64) / 3.6
+                speed = speeds_ms[self.road_class]
+                if mode != "foot":
+                    speed = np.where(self.against_oneway, 0.0, speed)
+                with np.errstate(divide="ignore"):
+                    cost = np.where(speed > 0, self.length_m / np.maximum(speed, 1e-9), np.inf)
+                self._mode_costs[mode] = cost.tolist()
+                usable = np.zeros(self.num_nodes, dtype=bool)
+                usable[np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))[np.isfinite(cost)]] = True
+                nodes = np.flatnonzero(usable)
+                self._snap_indexes[mode] = (GridIndex(self.node_lat[nodes], self.node_lng[nodes], cell_km=0.5), nodes)
+
+    def nearest_nodes(self, lat: float, lng: float, k: int = 1, mode: str = "car") -> Tuple[np.ndarray, np.ndarray]:
+        """The k nearest nodes usable by mode. Returns: (node ids, distances_km) sorted by distance"""
+        self._ensure_mode(mode)
+        index, nodes = self._snap_indexes[mode]
+        idx, dists = index.nearest(lat, lng, k)
+        return nodes[idx], dists
+
+    def snap(self, lat: float, lng: float, mode: str = "car") -> Tuple[Optional[int], float]:
+        """Nearest node usable by mode. Returns: (node id or None, distance_km)"""
+        nodes, dists = self.nearest_nodes(lat, lng, 1, mode)
+        if len(nodes) == 0 or dists[0] > MAX_SNAP_KM:
+            return None, float('inf')
+        return int(nodes[0]), float(dists[0])
+
+    def shortest_path(self, source: int, target: int, mode: str = "car", penalties: Dict[int, float] = None) -> Tuple[List[int], float]:
+        """
+        A* on travel time with a straight-line heuristic at the mode's top speed.
+        penalties multiplies the cost of specific edge ids (used for alternatives).
+        Returns: (edge ids along the path, travel time in seconds)
+        """
+        self._ensure_mode(mode)
+        indptr, indices = self._adjacency
+        costs = self._mode_costs[mode]
+        max_speed_ms = max(CLASS_SPEEDS_KMH[mode]) / 3.6
+        lat_t, lng_t = self.node_lat[target], self.node_lng[target]
+        node_lat, node_lng = self.node_lat, self.node_lng
+        cos_t = math.cos(math.radians(lat_t))
+
+        def heuristic(u):
+            # Equirectangular approximation, scaled down to stay below the haversine distance
+            dx = math.radians(node_lng[u] - lng_t) * cos_t
+            dy = math.radians(node_lat[u] - lat_t)
+            return 0.99 * 6371000 * math.hypot(dx, dy) / max_speed_ms
+
+        best = {source: 0.0}
+        via_edge = {source: -1}
+        settled = set()
+        heap = [(heuristic(source), 0.0, source)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            if u == target:
+                edges = []
+                while via_edge[u] >= 0:
+                    e = via_edge[u]
+                    edges.append(e)
+                    u = self._edge_source(e)
+                edges.reverse()
+                return edges, d
+            settled.add(u)
+            for e in range(indptr[u], indptr[u + 1]):
+                cost = costs[e]
+                if cost == math.inf:
+                    continue
+                if penalties and e in penalties:
+                    cost *= penalties[e]
+                v = indices[e]
+                nd = d + cost
+                if nd < best.get(v, math.inf):
+                    best[v] = nd
+                    via_edge[v] = e
+                    heapq.heappush(heap, (nd + heuristic(v), nd, v))
+        return [], math.inf
+
+    def _edge_source(self, edge: int) -> int:
+        return int(np.searchsorted(self.indptr, edge, side="right") - 1)
+
+    def _build_route(self, edges: List[int], source: int, mode: str) -> Dict[str, Any]:
+        costs = self._mode_costs[mode]
+        nodes = [source] + [int(self.indices[e]) for e in edges]
+        lats, lngs = self.node_lat[nodes], self.node_lng[nodes]
+        bearings = segment_bearings(np.column_stack([lats, lngs])).tolist()
+        steps = []
+        prev_bearing = None
+        for e, bearing in zip(edges, bearings):
+            name = self.names[self.name_idx[e]]
+            if not steps:
+                steps.append({"instruction": f"Head {_compass(bearing)}" + (f" on {name}" if name else ""),
+                              "name": name, "distance": 0.0, "duration": 0.0})
+            elif name != steps[-1]["name"]:
+                turn = (bearing - prev_bearing + 180) % 360 - 180
+                if turn > 30:
+                    verb = "Turn right"
+                elif turn < -30:
+                    verb = "Turn left"
+                else:
+                    verb = "Continue"
+                steps.append({"instruction": verb + (f" onto {name}" if name else ""),
+                              "name": name, "distance": 0.0, "duration": 0.0})
+            steps[-1]["distance"] += float(self.length_m[e])
+            steps[-1]["duration"] += float(costs[e])
+            prev_bearing = bearing
+        steps.append({"instruction": "Arrive at your destination", "name": "", "distance": 0.0, "duration": 0.0})
+        for step in steps:
+            step.pop("name")
+            step["distance"] = round(step["distance"], 1)
+            step["duration"] = round(step["duration"], 1)
+        return {
+            "geometry": {"type": "LineString", "coordinates": np.column_stack([lngs, lats]).tolist()},
+            "distance": float(self.length_m[edges].sum(dtype=np.float64)),
+            "duration": float(sum(costs[e] for e in edges)),
+            "segments": [{"steps": steps}],
+        }
+
+    def route(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float,
+              profile: str = "driving-car", alternatives: int = 1) -> List[Dict[str, Any]]:
+        """
+        Route between two coordinates in the same shape as get_ors_alternatives.
+        Extra alternatives come from re-running the search with the edges of the
+        routes found so far penalised; near-duplicates are dropped.
+        """
+        mode = PROFILE_MODES.get(profile, "car")
+        source, _ = self.snap(start_lat, start_lng, mode)
+        target, _ = self.snap(end_lat, end_lng, mode)
+        if source is None or target is None:
+            return []
+        routes = []
+        penalties: Dict[int, float] = {}
+        seen = []
+        for _ in range(max(1, alternatives) * 2):
+            edges, cost = self.shortest_path(source, target, mode, penalties)
+            if cost == math.inf:
+                break
+            edge_set = set(edges)
+            if not any(len(edge_set & other) > 0.6 * max(1, len(edge_set)) for other in seen):
+                seen.append(edge_set)
+                routes.append(self._build_route(edges, source, mode))
+                if len(routes) >= alternatives:
+                    break
+            for e in edges:
+                penalties[e] = penalties.get(e, 1.0) * 1.4
+        for i, route in enumerate(routes):
+            route["option_name"] = f"Route {i+1}: {'Fast (Shortest)' if i==0 else 'Alternate'}"
+        return routes
+
+
+_local_network = None
+_local_network_lock = threading.Lock()
+_load_failure = None  # (extract mtime, monotonic time) of the last failed load
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def get_local_router() -> Optional[LocalRoadNetwork]:
+    """
+    Shared road network loaded from LOCAL_OSM_PATH, or None if not configured or unreadable.
+    A failed load is retried once the extract changes or LOCAL_OSM_RETRY_INTERVAL has passed.
+    """
+    global _local_network, _load_failure
+    if not LOCAL_OSM_PATH:
+        return None
+    if _local_network is not None:
+        return _local_network
+    with _local_network_lock:
+        if _local_network is None:
+            failure = _load_failure
+            if (failure is not None and failure[0] == _mtime(LOCAL_OSM_PATH)
+                    and time.monotonic() - failure[1] < LOCAL_OSM_RETRY_INTERVAL):
+                return None
+            try:
+                _local_network = LocalRoadNetwork.from_extract(LOCAL_OSM_PATH)
+                _load_failure = None
+                print(f"Loaded local road network: {_local_network.num_nodes} nodes, {_local_network.num_edges} edges")
+            except (OSError, ET.ParseError, ValueError) as e:
+                print(f"Local road network unavailable ({LOCAL_OSM_PATH}): {e}")
+                _load_failure = (_mtime(LOCAL_OSM_PATH), time.monotonic())
+                return None
+        return _local_network
+
+
+if __name__ == "__main__":
+    # Precompile the CSR cache: python -m app.local_router path/to/extract.osm
+    import sys
+    net = LocalRoadNetwork.from_extract(sys.argv[1])
+    print(f"{net.num_nodes} nodes, {net.num_edges} edges")
@@ -1,48 +1,257 @@
-from typing import List, Dict, Any
-
-DEHRADUN_LOCATIONS = sorted([
-    {"name": "Ballupur", "lat": 30.333275, "lng": 78.011248, "type": "residential", "parking": True, "traffic_zone": "medium"},
-    {"name": "Badripur", "lat": 30.284644, "lng": 78.065020, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "Vasant Vihar", "lat": 30.323023, "lng": 78.004126, "type": "residential", "parking": True, "traffic_zone": "medium"},
-    {"name": "Bharuwala Grant", "lat": 30.2675, "lng": 77.9959, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "Chakrata Road", "lat": 30.3456, "lng": 78.0112, "type": "transport", "parking": True, "traffic_zone": "medium"},
-    {"name": "Clement Town", "lat": 30.2791, "lng": 78.0078, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "Clock Tower", "lat": 30.3242, "lng": 78.0417, "type": "commercial", "parking": True, "traffic_zone": "high"},
-    {"name": "Dalanwala", "lat": 30.3126, "lng": 78.0573, "type": "commercial", "parking": False, "traffic_zone": "high"},
-    {"name": "Doiwala", "lat": 30.1758, "lng": 78.1242, "type": "residential", "parking": True, "traffic_zone": "medium"},
-    {"name": "Doon University", "lat": 30.2697, "lng": 78.0436, "type": "institutional", "parking": True, "traffic_zone": "low"},
-    {"name": "Forest Research Institute", "lat": 30.3421, "lng": 77.9972, "type": "institutional", "parking": True, "traffic_zone": "low"},
-    {"name": "Graphic Era University", "lat": 30.268745, "lng": 77.993425, "type": "institutional", "parking": True, "traffic_zone": "medium"},
-    {"name": "Harrawala", "lat": 30.2507, "lng": 78.0772, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "ISBT Dehradun", "lat": 30.2879, "lng": 77.9985, "type": "transport", "parking": True, "traffic_zone": "high"},
-    {"name": "Jolly Grant Airport", "lat": 30.1872, "lng": 78.1748, "type": "transport", "parking": True, "traffic_zone": "low"},
-    {"name": "Kandoli", "lat": 30.3599, "lng": 78.0624, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "Kargi Chowk", "lat": 30.290801, "lng": 78.024759, "type": "commercial", "parking": True, "traffic_zone": "medium"},
-    {"name": "Kedarpur", "lat": 30.3123, "lng": 78.0456, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "Majra", "lat": 30.2947, "lng": 77.9937, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "Mothrowala", "lat": 30.2679, "lng": 78.0368, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "Mussoorie Diversion", "lat": 30.371537, "lng": 78.077424, "type": "transport", "parking": True, "traffic_zone": "medium"},
-    {"name": "Nehru Colony", "lat": 30.2986, "lng": 78.0555, "type": "residential", "parking": True, "traffic_zone": "medium"},
-    {"name": "Pacific Hills", "lat": 30.3486, "lng": 78.0344, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "Paltan Bazaar", "lat": 30.3222, "lng": 78.0373, "type": "commercial", "parking": False, "traffic_zone": "high"},
-    {"name": "Patel Nagar", "lat": 30.3210, "lng": 78.0215, "type": "residential", "parking": True, "traffic_zone": "medium"},
-    {"name": "Premnagar", "lat": 30.3350, "lng": 77.9582, "type": "residential", "parking": True, "traffic_zone": "medium"},
-    {"name": "Race Course", "lat": 30.3145, "lng": 78.0438, "type": "recreational", "parking": True, "traffic_zone": "low"},
-    {"name": "Rajpur", "lat": 30.3848, "lng": 78.0950, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "Rajpur Road", "lat": 30.3346, "lng": 78.0504, "type": "residential", "parking": True, "traffic_zone": "medium"},
-    {"name": "Raipur", "lat": 30.3253, "lng": 78.0802, "type": "residential", "parking": True, "traffic_zone": "medium"},
-    {"name": "Robbers Cave", "lat": 30.3758, "lng": 78.0841, "type": "recreational", "parking": True, "traffic_zone": "low"},
-    {"name": "Sahastradhara", "lat": 30.3873, "lng": 78.1268, "type": "recreational", "parking": True, "traffic_zone": "medium"},
-    {"name": "Selaqui", "lat": 30.366160, "lng": 77.858086, "type": "industrial", "parking": True, "traffic_zone": "low"},
-    {"name": "Sahastradhara Road", "lat": 30.358394, "lng": 78.088158, "type": "transport", "parking": True, "traffic_zone": "medium"},
-    {"name": "Subhash Nagar", "lat": 30.2733, "lng": 77.9926, "type": "residential", "parking": True, "traffic_zone": "medium"},
-    {"name": "Survey Chowk", "lat": 30.3259, "lng": 78.0470, "type": "commercial", "parking": False, "traffic_zone": "high"},
-    {"name": "Tapovan", "lat": 30.3382, "lng": 78.0801, "type": "residential", "parking": True, "traffic_zone": "low"},
-    {"name": "Dharampur", "lat": 30.2991, "lng": 78.0571, "type": "residential", "parking": True, "traffic_zone": "medium"},
-], key=lambda x: x["name"])
+from typing import List, Dict, Any, Optional, Tuple
+import csv
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from .name_index import get_name_index
+from .traffic_model import ZONES
+
+# Landmarks / drop points, loaded from a data file (LOCATIONS_PATH: CSV, GeoJSON, Parquet, or a
+# directory of .npy columns written by `python -m app.locations <file> <dir>`, which is memory-mapped)
+# into a column store: NumPy arrays for lat/lng/parking and categorical codes for type and
+# traffic_zone. A LocationStore reads like a list of location dicts, so it can be passed
+# wherever a location list is expected.
+# The file is checked for changes every LOCATIONS_RELOAD_INTERVAL seconds and reloaded in
+# place of the old store in one swap. Caches built from a store (spatial and name indexes,
+# graph matrices) are keyed on the store object, so after a swap they rebuild on next use.
+
+DEFAULT_LOCATIONS_PATH = os.path.join(os.path.dirname(__file__), "data", "dehradun_locations.csv")
+LOCATIONS_PATH = os.environ.get("LOCATIONS_PATH") or DEFAULT_LOCATIONS_PATH
+LOCATIONS_RELOAD_INTERVAL = float(os.environ.get("LOCATIONS_RELOAD_INTERVAL", "5"))  # 0 disables the check
+
+REQUIRED_FIELDS = ("name", "lat", "lng", "type", "traffic_zone")
+COLUMNS = ("names", "lat", "lng", "type_codes", "types", "zone_codes", "parking")
+
+try:
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+class LocationStore:
+    def __init__(self, names, lat, lng, type_codes, types, zone_codes, parking, source: str = None):
+        self.names = names
+        self.lat = lat
+        self.lng = lng
+        self.type_codes = type_codes
+        self.types = list(types)
+        self.zone_codes = zone_codes
+        self.parking = parking
+        self.source = source
+        self.loaded_at = time.time()
+        self._records = None
+        self._positions = None
+        # Built on first use by get_location_index / get_name_index
+        self.grid_index = None
+        self.name_index = None
+        if not (len(names) == len(lat) == len(lng) == len(type_codes) == len(zone_codes) == len(parking)):
+            raise ValueError("Location columns differ in length")
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return {
+            "name": str(self.names[i]),
+            "lat": float(self.lat[i]),
+            "lng": float(self.lng[i]),
+            "type": self.types[self.type_codes[i]],
+            "parking": bool(self.parking[i]),
+            "traffic_zone": ZONES[self.zone_codes[i]],
+        }
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def records(self) -> List[Dict[str, Any]]:
+        """All rows as dicts (built once per store)."""
+        if self._records is None:
+            self._records = list(self)
+        return self._records
+
+    def index_of(self, name: str) -> Optional[int]:
+        """Row of the location with exactly this name, or None."""
+        if self._positions is None:
+            self._positions = {str(n): i for i, n in enumerate(self.names)}
+        return self._positions.get(name)
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], source: str = None) -> "LocationStore":
+        missing = [c for c in REQUIRED_FIELDS if records and c not in records[0]]
+        if missing:
+            raise ValueError(f"Location data is missing {', '.join(missing)}")
+        types = sorted({str(r["type"]) for r in records})
+        type_index = {t: i for i, t in enumerate(types)}
+        for r in records:
+            if r["traffic_zone"] not in ZONES:
+                raise ValueError(f"Unknown traffic_zone {r['traffic_zone']!r} for {r['name']!r}")
+        return cls(
+            np.array([str(r["name"]) for r in records], dtype=str),
+            np.array([float(r["lat"]) for r in records], dtype=float),
+            np.array([float(r["lng"]) for r in records], dtype=float),
+            np.array([type_index[str(r["type"])] for r in records], dtype=np.uint16),
+            types,
+            np.array([ZONES.index(r["traffic_zone"]) for r in records], dtype=np.uint8),
+            np.array([_parse_bool(r.get("parking", False)) for r in records], dtype=bool),
+            source,
+        )
+
+    @classmethod
+    def from_csv(cls, path: str) -> "LocationStore":
+        with open(path, newline="") as f:
+            return cls.from_records(list(csv.DictReader(f)), path)
+
+    @classmethod
+    def from_geojson(cls, path: str) -> "LocationStore":
+        """FeatureCollection of Point features; name, type, parking and traffic_zone come from properties."""
+        with open(path) as f:
+            features = json.load(f)["features"]
+        records = []
+        for feature in features:
+            lng, lat = feature["geometry"]["coordinates"][:2]
+            records.append({**feature["properties"], "lat": lat, "lng": lng})
+        return cls.from_records(records, path)
+
+    @classmethod
+    def from_parquet(cls, path: str) -> "LocationStore":
+        if not PARQUET_AVAILABLE:
+            raise ValueError("Reading Parquet location files requires pyarrow")
+        return cls.from_records(pq.read_table(path).to_pylist(), path)
+
+    def save_columns(self, path: str):
+        """Write the columns as .npy files in directory path (memory-mappable by load_columns)."""
+        os.makedirs(path, exist_ok=True)
+        for column in COLUMNS:
+            np.save(os.path.join(path, f"{column}.npy"), np.asarray(getattr(self, column)))
+
+    @classmethod
+    def load_columns(cls, path: str, mmap: bool = True) -> "LocationStore":
+        mode = "r" if mmap else None
+        columns = {column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode=mode) for column in COLUMNS}
+        columns["types"] = columns["types"].tolist()
+        return cls(**columns, source=path)
+
+    @classmethod
+    def load(cls, path: str) -> "LocationStore":
+        if os.path.isdir(path):
+            return cls.load_columns(path)
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".csv":
+            return cls.from_csv(path)
+        if ext in (".geojson", ".json"):
+            return cls.from_geojson(path)
+        if ext == ".parquet":
+            return cls.from_parquet(path)
+        raise ValueError(f"Unsupported location file: {path}")
+
+
+def bounding_box(path: str) -> Tuple[float, float, float, float]:
+    """
+    (min_lat, min_lng, max_lat, max_lng) of a location file, reading only its coordinates:
+    memory-mapped columns for a directory, one streamed pass for CSV.
+    """
+    if os.path.isdir(path):
+        lat = np.load(os.path.join(path, "lat.npy"), mmap_mode="r")
+        lng = np.load(os.path.join(path, "lng.npy"), mmap_mode="r")
+    elif os.path.splitext(path)[1].lower() == ".csv":
+        lat, lng = [], []
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                lat.append(float(row["lat"]))
+                lng.append(float(row["lng"]))
+    elif os.path.splitext(path)[1].lower() == ".parquet" and PARQUET_AVAILABLE:
+        table = pq.read_table(path, columns=["lat", "lng"])
+        lat, lng = table.column("lat").to_numpy(), table.column("lng").to_numpy()
+    else:
+        store = LocationStore.load(path)
+        lat, lng = store.lat, store.lng
+    if not len(lat):
+        raise ValueError(f"No locations in {path}")
+    return float(np.min(lat)), float(np.min(lng)), float(np.max(lat)), float(np.max(lng))
+
+
+_store = None
+_store_path = None
+_store_mtime = None
+_store_checked = 0.0
+_store_lock = threading.Lock()
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def reload_locations(path: str = None) -> LocationStore:
+    """Load the location file (default: the current source) and swap it in as the current store."""
+    global _store, _store_path, _store_mtime, _store_checked
+    with _store_lock:
+        path = path or _store_path or LOCATIONS_PATH
+        mtime = _mtime(path)
+        store = LocationStore.load(path)
+        if len(store) == 0:
+            raise ValueError(f"No locations in {path}")
+        _store, _store_path, _store_mtime = store, path, mtime
+        _store_checked = time.monotonic()
+        print(f"Loaded {len(store)} locations from {path}")
+        return store
+
+
+def get_location_store() -> LocationStore:
+    """Current location store, reloaded when its file changes (checked every LOCATIONS_RELOAD_INTERVAL seconds)."""
+    global _store_checked, _store_mtime
+    store = _store
+    if store is None:
+        return reload_locations()
+    if LOCATIONS_RELOAD_INTERVAL <= 0 or time.monotonic() - _store_checked < LOCATIONS_RELOAD_INTERVAL:
+        return store
+    with _store_lock:
+        _store_checked = time.monotonic()
+        mtime = _mtime(_store_path)
+        changed = mtime != _store_mtime
+    if changed:
+        try:
+            return reload_locations()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Keeping previous locations, reload of {_store_path} failed: {e}")
+            with _store_lock:
+                _store_mtime = mtime  # retry once the file changes again
+    return _store
+
 
 def get_all_locations() -> List[Dict[str, Any]]:
-    return DEHRADUN_LOCATIONS
+    return get_location_store().records()
 
 def get_location_by_name(name: str) -> Dict[str, Any]:
-    return next((loc for loc in DEHRADUN_LOCATIONS if loc["name"] == name), None)
\ No newline at end of file
+    """Landmark by name, ignoring case, punctuation and spacing (hash lookup)."""
+    return get_name_index().get(name)
+
+def match_landmark(name: str) -> Optional[str]:
+    """Canonical landmark name for user input, tolerating small typos; None if no unique match."""
+    loc = get_name_index().match(name)
+    return loc["name"] if loc else None
+
+def search_locations(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Landmarks whose name, or a word in it, starts with query (autocomplete)."""
+    return get_name_index().search(query, limit)
+
+
+if __name__ == "__main__":
+    # Compile a location file to memory-mappable columns: python -m app.locations in.csv out_dir
+    import sys
+    compiled = LocationStore.load(sys.argv[1])
+    compiled.save_columns(sys.argv[2])
+    print(f"Wrote {len(compiled)} locations to {sys.argv[2]}")
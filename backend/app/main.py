@@ -1,9 +1,9 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Form, Body
+from fastapi import FastAPI, Depends, HTTPException, status, Form, Body, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from datetime import timedelta, datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from pydantic import BaseModel
 
 from .database import engine, get_db
@@ -15,9 +15,16 @@ from .auth import (
     get_current_user,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
-from .locations import get_all_locations, get_location_by_name
-from .route_service import get_route, optimize_multi_stop_route, route_with_floyd_warshall, get_osrm_route, decode_polyline
-from .user_route_history import add_route_to_history, get_user_history
+from .locations import get_all_locations, get_location_by_name, match_landmark, search_locations, reload_locations
+from .route_service import get_route_async, get_routes_batch_async, optimize_multi_stop_route_async, optimize_fleet_routes_async, get_osrm_trip_legs_async, iter_trip_legs_async, stitch_segments, plan_landmark_tour, tour_schedule, route_landmarks, route_landmarks_at, get_isochrone, nearest_landmarks, nearest_road_nodes, snap_to_landmark, LANDMARK_SNAP_KM, get_landmark_coords, SHORTEST_PATH_ALGORITHMS
+from .route_geometry import format_path, GEOMETRY_FORMATS, SIMPLIFY_METHODS, MIN_ZOOM, MAX_ZOOM
+from .serialization import negotiated_response, streaming_response, STREAM_FORMATS
+from .provider_client import provider_client
+from .provider_cache import provider_cache
+from .circuit_breaker import breaker_stats
+from .traffic_model import VEHICLES
+from .regions import get_region_registry
+from .user_route_history import add_route_to_history, add_routes_to_history, get_user_history
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -35,6 +42,13 @@ app.add_middleware(
     max_age=600,  # Cache preflight requests for 10 minutes
 )
 
+@app.on_event("shutdown")
+async def close_provider_client():
+    # Release pooled provider connections
+    await provider_client.aclose()
+    # Commit provider responses still queued for the disk cache
+    provider_cache.flush()
+
 class UserCreate(BaseModel):
     username: str
     email: str
@@ -51,9 +65,40 @@ class RouteCreate(BaseModel):
     route_option: Optional[str] = None  # Optional parameter for selected route option
     user_weather: Optional[str] = None  # Optional parameter for user-specified weather
 
+class RoutePair(BaseModel):
+    start: Union[str, Dict[str, float]]  # landmark name or {lat, lng}
+    end: Union[str, Dict[str, float]]
+
+class BatchRouteRequest(BaseModel):
+    pairs: List[RoutePair]
+    vehicle_type: str
+    user_weather: Optional[str] = None
+
+MAX_BATCH_PAIRS = 500
+
 class OptimizeRouteRequest(BaseModel):
     stops: list  # List of {lat, lng} dicts
     vehicle_type: str = "car"
+    round_trip: bool = True  # return to the first stop
+    # VRP mode: set to a list of vehicles ({id, capacity, start, end, shift}, all optional)
+    # to assign stops across a fleet; stops may then carry demand, service_time and time_window
+    vehicles: Optional[list] = None
+    time_budget_s: float = 2.0  # VRP solver improvement budget
+    depart_at: Optional[datetime] = None  # VRP dispatch time for traffic (default now)
+
+def geometry_options(geometry: str = "coords", zoom: Optional[float] = None, simplify: str = "dp") -> Dict[str, Any]:
+    """
+    Opt-in compact geometry for endpoints that return paths: geometry=polyline returns
+    Google encoded polylines, zoom simplifies to about one pixel at that map zoom
+    (simplify=dp for Douglas-Peucker, vw for Visvalingam-Whyatt). Default is full resolution.
+    """
+    if geometry not in GEOMETRY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"geometry must be one of {', '.join(GEOMETRY_FORMATS)}")
+    if simplify not in SIMPLIFY_METHODS:
+        raise HTTPException(status_code=400, detail=f"simplify must be one of {', '.join(SIMPLIFY_METHODS)}")
+    if zoom is not None and not MIN_ZOOM <= zoom <= MAX_ZOOM:
+        raise HTTPException(status_code=400, detail=f"zoom must be between {MIN_ZOOM} and {MAX_ZOOM}")
+    return {"geometry": geometry, "zoom": zoom, "simplify_method": simplify}
 
 @app.post("/register")
 async def register_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -97,18 +142,73 @@ async def login(form_data: Token):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/locations")
-def get_locations() -> List[Dict[str, Any]]:
-    return get_all_locations()
+def get_locations(region: Optional[str] = None) -> List[Dict[str, Any]]:
+    if region is None:
+        return get_all_locations()
+    try:
+        return get_region_registry().locations(region).records()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/regions")
+def get_regions() -> Dict[str, Any]:
+    """Configured regions, which of them are loaded and the memory they hold."""
+    return get_region_registry().stats()
+
+@app.post("/locations/reload")
+def reload_location_file(current_user: User = Depends(get_current_user)) -> Dict[str, Any]:
+    """Reload the location file now instead of waiting for the periodic change check."""
+    try:
+        store = reload_locations()
+    except (OSError, ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not reload locations: {e}")
+    return {"count": len(store), "source": store.source, "loaded_at": store.loaded_at}
+
+@app.get("/locations/search")
+def search_location_names(q: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Autocomplete: landmarks whose name, or a word in it, starts with q (typo-tolerant if nothing does)."""
+    return search_locations(q, max(1, min(limit, 50)))
+
+MAX_NEAREST_K = 50
+
+@app.get("/locations/nearest")
+def get_nearest_locations(lat: float, lng: float, k: int = 1, max_km: Optional[float] = None,
+                          road_nodes: bool = False, vehicle_type: str = "car") -> Dict[str, Any]:
+    """
+    Reverse lookup: the k landmarks nearest to (lat, lng), optionally only within max_km.
+    road_nodes=true also returns the nearest local road-graph nodes usable by vehicle_type
+    (empty when no local road network is configured).
+    """
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise HTTPException(status_code=400, detail="lat/lng out of range")
+    if not 1 <= k <= MAX_NEAREST_K:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {MAX_NEAREST_K}")
+    result = {"lat": lat, "lng": lng, "landmarks": nearest_landmarks(lat, lng, k, max_km)}
+    if road_nodes:
+        result["road_nodes"] = nearest_road_nodes(lat, lng, k, vehicle_type)
+    return result
+
+@app.get("/cache/stats")
+def get_cache_stats() -> Dict[str, Any]:
+    """Provider-response cache counters (hits, misses, evictions) for sizing the cache."""
+    return provider_cache.stats()
+
+@app.get("/providers/health")
+def get_provider_health() -> Dict[str, Any]:
+    """Circuit-breaker state and call counters for each routing provider host."""
+    return breaker_stats()
 
 @app.post("/routes")
 async def create_route(
+    http_request: Request,
     route: RouteCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    geometry_opts: Dict[str, Any] = Depends(geometry_options)
 ):
     try:
         # Calculate route using route service, pass user weather if specified
-        result = get_route(
+        result = await get_route_async(
             route.start_location,
             route.end_location,
             route.vehicle_type,
@@ -154,7 +254,9 @@ async def create_route(
             "created_at": datetime.utcnow().isoformat()
         })
         
-        return result
+        for option in result["route_options"]:
+            option["path"] = format_path(option["path"], **geometry_opts)
+        return negotiated_response(http_request, result)
         
     except ValueError as e:
         raise HTTPException(
@@ -167,6 +269,77 @@ async def create_route(
             detail="Failed to calculate route"
         )
 
+@app.post("/routes/batch")
+async def create_routes_batch(
+    http_request: Request,
+    batch: BatchRouteRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    geometry_opts: Dict[str, Any] = Depends(geometry_options)
+):
+    """
+    Route many origin-destination pairs in one call. Identical pairs are computed once and
+    distinct pairs concurrently; history is written once for the whole batch.
+    Returns one entry per pair, in request order, with either "result" or "error".
+    """
+    if not batch.pairs:
+        raise HTTPException(status_code=400, detail="At least one pair required.")
+    if len(batch.pairs) > MAX_BATCH_PAIRS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_PAIRS} pairs per batch.")
+    outcomes = await get_routes_batch_async(
+        [(pair.start, pair.end) for pair in batch.pairs],
+        batch.vehicle_type,
+        batch.user_weather
+    )
+    db_routes = []
+    history = []
+    created_at = datetime.utcnow().isoformat()
+    for outcome in outcomes:
+        result = outcome.get("result")
+        if result is None:
+            continue
+        selected_route = result["route_options"][0]
+        db_routes.append(RouteHistory(
+            user_id=current_user.id,
+            start_location=result["start"]["name"],
+            end_location=result["end"]["name"],
+            vehicle_type=batch.vehicle_type,
+            distance=selected_route["distance"],
+            duration=selected_route["duration"],
+            weather_condition=result["weather"]["condition"],
+            traffic_condition=result["traffic"],
+            route_option=selected_route["option_name"]
+        ))
+        history.append({
+            "type": "batch",
+            "start_location": result["start"]["name"],
+            "end_location": result["end"]["name"],
+            "vehicle_type": batch.vehicle_type,
+            "route_option": selected_route["option_name"],
+            "weather_condition": result["weather"]["condition"],
+            "traffic_condition": result["traffic"],
+            "distance": selected_route["distance"],
+            "duration": selected_route["duration"],
+            "created_at": created_at
+        })
+    if db_routes:
+        db.add_all(db_routes)
+        db.commit()
+        add_routes_to_history(current_user.username, history)
+    # Duplicate pairs share one result object; format each path only once
+    formatted = set()
+    for outcome in outcomes:
+        result = outcome.get("result")
+        if result is not None and id(result) not in formatted:
+            formatted.add(id(result))
+            for option in result["route_options"]:
+                option["path"] = format_path(option["path"], **geometry_opts)
+    return negotiated_response(http_request, {
+        "results": outcomes,
+        "routed": sum(1 for outcome in outcomes if "result" in outcome),
+        "failed": sum(1 for outcome in outcomes if "error" in outcome)
+    })
+
 @app.get("/routes/history")
 def get_route_history(
     current_user: User = Depends(get_current_user),
@@ -194,10 +367,30 @@ def get_history(current_user: User = Depends(get_current_user)):
     return get_user_history(current_user.username)
 
 @app.post("/optimize-route")
-def optimize_route(request: OptimizeRouteRequest, current_user: User = Depends(get_current_user)):
+async def optimize_route(http_request: Request, request: OptimizeRouteRequest, current_user: User = Depends(get_current_user),
+                         geometry_opts: Dict[str, Any] = Depends(geometry_options)):
     if not request.stops or len(request.stops) < 2:
         raise HTTPException(status_code=400, detail="At least 2 stops required.")
-    result = optimize_multi_stop_route(request.stops, request.vehicle_type)
+    if request.vehicles:
+        if request.time_budget_s <= 0 or request.time_budget_s > 30:
+            raise HTTPException(status_code=400, detail="time_budget_s must be between 0 and 30 seconds.")
+        try:
+            result = await optimize_fleet_routes_async(request.stops, request.vehicles, request.vehicle_type,
+                                                       request.round_trip, request.time_budget_s, request.depart_at)
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid stops or vehicles: {e}")
+        add_route_to_history(current_user.username, {
+            "type": "multi-stop-vrp",
+            "stops": request.stops,
+            "vehicle_type": request.vehicle_type,
+            "vehicles": len(request.vehicles),
+            "unassigned": len(result["unassigned"]),
+            "distance": result["summary"]["distance"],
+            "duration": result["summary"]["duration"],
+            "created_at": datetime.utcnow().isoformat()
+        })
+        return negotiated_response(http_request, _format_route_geometries(result, geometry_opts))
+    result = await optimize_multi_stop_route_async(request.stops, request.vehicle_type, request.round_trip)
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
     # Save to user history
@@ -210,102 +403,214 @@ def optimize_route(request: OptimizeRouteRequest, current_user: User = Depends(g
         "duration": result.get("routes", [{}])[0].get("summary", {}).get("duration"),
         "created_at": datetime.utcnow().isoformat()
     })
+    return negotiated_response(http_request, _format_route_geometries(result, geometry_opts))
+
+def _format_route_geometries(result: Dict[str, Any], geometry_opts: Dict[str, Any]) -> Dict[str, Any]:
+    for route in result.get("routes", []):
+        route["geometry"]["coordinates"] = format_path(route["geometry"]["coordinates"], **geometry_opts)
     return result
 
 @app.get("/test-floyd-warshall")
-def test_floyd_warshall(start: str, end: str):
+async def test_floyd_warshall(http_request: Request, start: str, end: str, algorithm: str = "floyd_warshall",
+                              depart_at: Optional[datetime] = None, vehicle_type: str = "car",
+                              region: Optional[str] = None, end_region: Optional[str] = None,
+                              geometry_opts: Dict[str, Any] = Depends(geometry_options)):
     """
     Test endpoint to verify Floyd-Warshall algorithm.
     Returns path and distance, and a road-based route for the FW path.
+    algorithm selects the shortest-path backend (floyd_warshall, dijkstra, astar, ch).
+    depart_at (ISO datetime) instead finds the fastest path for that departure time with
+    time-dependent Dijkstra and adds the travel time and arrival.
+    region / end_region pick the regions of start and end (default: the default region);
+    routes between regions pass through their boundary landmarks.
     """
-    # Floyd-Warshall
-    fw_path, fw_dist = route_with_floyd_warshall(start, end)
-    # Build road-based route for FW path (segment by segment)
-    road_polyline = []
-    for i in range(len(fw_path) - 1):
-        lat1, lng1 = fw_path[i]
-        lat2, lng2 = fw_path[i+1]
-        osrm_result = get_osrm_route(lng1, lat1, lng2, lat2)
-        if osrm_result and osrm_result.get("routes"):
-            segment = decode_polyline(osrm_result["routes"][0]["geometry"])
-            if road_polyline and segment:
-                # Avoid duplicate point at join
-                road_polyline += segment[1:]
-            else:
-                road_polyline += segment
-    return {
+    if algorithm not in SHORTEST_PATH_ALGORITHMS:
+        raise HTTPException(status_code=400, detail=f"algorithm must be one of {', '.join(SHORTEST_PATH_ALGORITHMS)}")
+    if vehicle_type not in VEHICLES:
+        raise HTTPException(status_code=400, detail=f"vehicle_type must be one of {', '.join(VEHICLES)}")
+    timing = {}
+    extra_fields = {}
+    registry = get_region_registry()
+    if {region or registry.default, end_region or region or registry.default} != {registry.default}:
+        if depart_at is not None:
+            raise HTTPException(status_code=400, detail="depart_at is only supported within the default region.")
+        try:
+            fw_path, fw_dist, segments = registry.route(start, end, region, end_region or region, algorithm)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        extra_fields = {"region": region or registry.default, "end_region": end_region or region or registry.default,
+                        "segments": segments}
+    elif depart_at is None:
+        try:
+            fw_path, fw_dist = route_landmarks(start, end, algorithm)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        try:
+            fw_path, fw_dist, minutes = route_landmarks_at(start, end, depart_at, vehicle_type)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        algorithm = "time_dependent_dijkstra"
+        if fw_path:
+            timing = {"depart_at": depart_at, "arrive_at": depart_at + timedelta(seconds=round(minutes * 60)),
+                      "duration_min": round(minutes, 2)}
+    # Build road-based route for FW path (one multi-waypoint request for all segments)
+    road_polyline, _ = await get_osrm_trip_legs_async(fw_path)
+    return negotiated_response(http_request, {
         "start": start,
         "end": end,
+        "algorithm": algorithm,
+        **extra_fields,
         "floyd_warshall": {
             "distance_km": fw_dist,
-            "path_coords": fw_path
+            "path_coords": fw_path,
+            **timing
         },
-        "fw_road_polyline": road_polyline
-    }
+        "fw_road_polyline": format_path(road_polyline, **geometry_opts)
+    })
+
+MAX_ISOCHRONE_MINUTES = 180
+
+@app.get("/isochrone")
+async def isochrone(http_request: Request, origin: Optional[str] = None, lat: Optional[float] = None,
+                    lng: Optional[float] = None, vehicle_type: str = "car", minutes: float = 15,
+                    depart_at: Optional[datetime] = None):
+    """
+    Landmarks reachable within `minutes` from origin (a landmark name, or lat and lng) by
+    vehicle_type, leaving at depart_at (default now), plus an approximate reachability
+    polygon as a closed [lat, lng] ring. Answered from the precomputed hourly travel-time matrices.
+    """
+    if origin is None and (lat is None or lng is None):
+        raise HTTPException(status_code=400, detail="Provide an origin landmark or lat and lng.")
+    if vehicle_type not in VEHICLES:
+        raise HTTPException(status_code=400, detail=f"vehicle_type must be one of {', '.join(VEHICLES)}")
+    if not 0 < minutes <= MAX_ISOCHRONE_MINUTES:
+        raise HTTPException(status_code=400, detail=f"minutes must be between 0 and {MAX_ISOCHRONE_MINUTES}.")
+    result = get_isochrone(origin if origin is not None else {"lat": lat, "lng": lng}, vehicle_type, minutes, depart_at)
+    if result is None:
+        raise HTTPException(status_code=400, detail="Unknown origin")
+    return negotiated_response(http_request, result)
+
+def stream_format_option(stream: Optional[str] = None) -> Optional[str]:
+    """stream=ndjson or stream=sse returns multi-stop results incrementally instead of one response."""
+    if stream is not None and stream not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"stream must be one of {', '.join(STREAM_FORMATS)}")
+    return stream
+
+async def stream_multi_stop(order, legs, geometry_opts, on_complete, **order_fields):
+    """
+    Records for a streamed multi-stop response: the visiting order first, then one "leg"
+    record per leg as its road geometry resolves (in completion order), then a "summary".
+    legs: [(from, to, [lat, lng] points, distance_km or None to use the road distance)]
+    on_complete(stitched road polyline, total km) runs once every leg has been sent.
+    """
+    yield {"type": "order", "order": order, "legs": len(legs), **order_fields}
+    road_segments = [None] * len(legs)
+    leg_distances = [None] * len(legs)
+    failed = []
+    async for i, coords, road_km in iter_trip_legs_async([points for _, _, points, _ in legs]):
+        leg_from, leg_to, _, graph_km = legs[i]
+        distance = graph_km if graph_km is not None else road_km
+        road_segments[i], leg_distances[i] = coords, distance
+        if distance is None:
+            failed.append(i)
+            yield {"type": "leg", "index": i, "from": leg_from, "to": leg_to, "error": f"No route from {leg_from} to {leg_to}"}
+            continue
+        yield {"type": "leg", "index": i, "from": leg_from, "to": leg_to,
+               "path_coords": format_path(coords, **geometry_opts), "distance_km": distance}
+    if failed:
+        yield {"type": "summary", "order": order, "error": "One or more legs have no route", "failed_legs": failed}
+        return
+    total_dist = sum(leg_distances)
+    on_complete(stitch_segments(road_segments), total_dist)
+    yield {"type": "summary", "order": order, "total_distance_km": total_dist}
 
 @app.post("/multi-floyd-warshall")
-def multi_floyd_warshall(
-    start: str = Body(...),
-    destinations: List[str] = Body(..., embed=True),
-    current_user: User = Depends(get_current_user)
+async def multi_floyd_warshall(
+    http_request: Request,
+    start: Union[str, Dict[str, float]] = Body(...),
+    destinations: List[Union[str, Dict[str, float]]] = Body(..., embed=True),
+    algorithm: str = Body("floyd_warshall"),
+    round_trip: bool = Body(False),
+    depart_at: Optional[datetime] = Body(None),
+    vehicle_type: str = Body("car"),
+    current_user: User = Depends(get_current_user),
+    geometry_opts: Dict[str, Any] = Depends(geometry_options),
+    stream: Optional[str] = Depends(stream_format_option)
 ):
     """
-    Compute a greedy multi-destination path using Floyd-Warshall between landmarks.
-    Returns the visiting order, road-based path coordinates, and total distance.
+    Compute a multi-destination path between landmarks, ordering the stops with the local TSP solver.
+    algorithm selects the shortest-path backend (floyd_warshall, dijkstra, astar, ch).
+    round_trip returns to the start after the last destination.
+    depart_at (ISO datetime) plans for travel time at that departure instead of distance and
+    adds a per-leg schedule of departures and arrivals.
+    Stops may be {lat, lng} instead of names; each is snapped to the nearest landmark
+    (within LANDMARK_SNAP_KM) and the snaps are reported under "snapped". Stops resolving to
+    the same landmark are visited once.
+    Returns the visiting order, road-based path coordinates, and total distance
+    (or streams them leg by leg with stream=ndjson|sse).
     """
-    from .route_service import route_with_floyd_warshall, get_osrm_route, decode_polyline
-    from .locations import get_all_locations
     if not start or not destinations or not isinstance(destinations, list) or len(destinations) < 1:
         return {"error": "Provide a start and at least one destination."}
-    # Robustly match stop names to landmark names (case-insensitive, trimmed)
-    def match_landmark(name):
-        name = name.strip().lower()
-        for loc in get_all_locations():
-            if loc['name'].strip().lower() == name:
-                return loc['name']
-        return None
-    start_matched = match_landmark(start)
-    dests_matched = [match_landmark(d) for d in destinations]
+    if algorithm not in SHORTEST_PATH_ALGORITHMS:
+        return {"error": f"algorithm must be one of {', '.join(SHORTEST_PATH_ALGORITHMS)}"}
+    if vehicle_type not in VEHICLES:
+        return {"error": f"vehicle_type must be one of {', '.join(VEHICLES)}"}
+    # Match stop names to landmark names (case/spacing-insensitive, typo tolerant)
+    extra_fields = {}
+    snapped = []
+    def match_stop(stop):
+        if not isinstance(stop, dict):
+            return match_landmark(stop)
+        name, snap_km = snap_to_landmark(stop)
+        if name:
+            snapped.append({"input": stop, "landmark": name, "distance_km": snap_km})
+        return name
+    start_matched = match_stop(start)
+    dests_matched = [match_stop(d) for d in destinations]
     if not start_matched or any(d is None for d in dests_matched):
-        return {"error": "One or more stops do not match any known Dehradun landmark. Please select from the dropdown only."}
-    order = [start_matched]
-    remaining = dests_matched[:]
+        return {"error": f"One or more stops do not match any known Dehradun landmark or lie within {LANDMARK_SNAP_KM} km of one. Please select from the dropdown only."}
+    if snapped:
+        extra_fields["snapped"] = snapped
+    # Stops that resolve to the same landmark (e.g. a coordinate snapped onto another stop) are visited once
+    dests_matched = [d for d in dict.fromkeys(dests_matched) if d != start_matched]
+    if not dests_matched:
+        return {"error": f"All stops resolve to the same landmark ({start_matched})."}
+    # Backends (e.g. the all-pairs FW matrices) are built once and shared across requests
+    try:
+        order, legs = plan_landmark_tour([start_matched] + dests_matched, algorithm, round_trip,
+                                         depart_at=depart_at, vehicle_type=vehicle_type)
+    except ValueError as e:
+        return {"error": str(e)}
+    if depart_at is not None:
+        algorithm = "time_dependent_dijkstra"
+        extra_fields["schedule"] = tour_schedule(legs, depart_at, vehicle_type)
     fw_path_names = []
+    leg_paths = []
     total_dist = 0.0
-    curr = start_matched
-    while remaining:
-        # Find nearest next destination
-        best = None
-        best_dist = float('inf')
-        best_path = []
-        for dest in remaining:
-            path, dist = route_with_floyd_warshall(curr, dest)
-            if dist < best_dist:
-                best = dest
-                best_dist = dist
-                best_path = path
-        if not best_path:
-            return {"error": f"No path from {curr} to {best}"}
-        if fw_path_names and best_path:
-            fw_path_names += best_path[1:]
+    for leg_start, leg_end, names, dist in legs:
+        leg_path = [get_landmark_coords(n) for n in names]
+        if not leg_path:
+            return {"error": f"No path from {leg_start} to {leg_end}"}
+        leg_paths.append((leg_start, leg_end, leg_path, dist))
+        if fw_path_names:
+            fw_path_names += leg_path[1:]
         else:
-            fw_path_names += best_path
-        total_dist += best_dist
-        order.append(best)
-        curr = best
-        remaining.remove(best)
+            fw_path_names += leg_path
+        total_dist += dist
+    if stream:
+        def save_history(road_polyline, distance):
+            add_route_to_history(current_user.username, {
+                "type": "multi-stop-floyd-warshall",
+                "stops": [start] + destinations,
+                "order": order,
+                "distance": distance,
+                "path_coords": road_polyline,
+                "created_at": datetime.utcnow().isoformat()
+            })
+        return streaming_response(stream_multi_stop(order, leg_paths, geometry_opts, save_history, algorithm=algorithm, **extra_fields), stream)
     # Build road-based polyline for the full path
-    road_polyline = []
-    for i in range(len(fw_path_names) - 1):
-        lat1, lng1 = fw_path_names[i]
-        lat2, lng2 = fw_path_names[i+1]
-        osrm_result = get_osrm_route(lng1, lat1, lng2, lat2)
-        if osrm_result and osrm_result.get("routes"):
-            segment = decode_polyline(osrm_result["routes"][0]["geometry"])
-            if road_polyline and segment:
-                road_polyline += segment[1:]
-            else:
-                road_polyline += segment
+    road_polyline, _ = await get_osrm_trip_legs_async(fw_path_names)
     # Save to user history
     add_route_to_history(current_user.username, {
         "type": "multi-stop-floyd-warshall",
@@ -315,54 +620,53 @@ def multi_floyd_warshall(
         "path_coords": road_polyline,
         "created_at": datetime.utcnow().isoformat()
     })
-    return {
+    return negotiated_response(http_request, {
         "order": order,
-        "path_coords": road_polyline,
-        "total_distance_km": total_dist
-    }
+        "path_coords": format_path(road_polyline, **geometry_opts),
+        "total_distance_km": total_dist,
+        **extra_fields
+    })
 
 @app.post("/multi-direct-route")
-def multi_direct_route(
+async def multi_direct_route(
+    http_request: Request,
     start: str = Body(...),
     destinations: List[str] = Body(..., embed=True),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    geometry_opts: Dict[str, Any] = Depends(geometry_options),
+    stream: Optional[str] = Depends(stream_format_option)
 ):
     """
     Compute a direct multi-destination path (in user-selected order) using OSRM between landmarks.
-    Returns the visiting order, road-based path coordinates, and total distance.
+    Returns the visiting order, road-based path coordinates, and total distance
+    (or streams them leg by leg with stream=ndjson|sse).
     """
-    from .route_service import get_osrm_route, decode_polyline
-    from .locations import get_all_locations
     if not start or not destinations or not isinstance(destinations, list) or len(destinations) < 1:
         return {"error": "Provide a start and at least one destination."}
-    def match_landmark(name):
-        name = name.strip().lower()
-        for loc in get_all_locations():
-            if loc['name'].strip().lower() == name:
-                return loc['name']
-        return None
     all_stops = [start] + destinations
     matched_stops = [match_landmark(s) for s in all_stops]
     if any(s is None for s in matched_stops):
         return {"error": "One or more stops do not match any known Dehradun landmark. Please select from the dropdown only."}
     order = matched_stops
-    road_polyline = []
-    total_dist = 0.0
-    for i in range(len(order) - 1):
-        from_name = order[i]
-        to_name = order[i+1]
-        from_loc = next(l for l in get_all_locations() if l['name'] == from_name)
-        to_loc = next(l for l in get_all_locations() if l['name'] == to_name)
-        osrm_result = get_osrm_route(from_loc['lng'], from_loc['lat'], to_loc['lng'], to_loc['lat'])
-        if osrm_result and osrm_result.get("routes"):
-            segment = decode_polyline(osrm_result["routes"][0]["geometry"])
-            if road_polyline and segment:
-                road_polyline += segment[1:]
-            else:
-                road_polyline += segment
-            total_dist += osrm_result["routes"][0]["distance"] / 1000.0
-        else:
-            return {"error": f"No route from {from_name} to {to_name}"}
+    stop_coords = [get_landmark_coords(name) for name in order]
+    if stream:
+        def save_history(road_polyline, distance):
+            add_route_to_history(current_user.username, {
+                "type": "multi-stop-direct",
+                "stops": all_stops,
+                "order": order,
+                "distance": distance,
+                "path_coords": road_polyline,
+                "created_at": datetime.utcnow().isoformat()
+            })
+        legs = [(order[i], order[i + 1], stop_coords[i:i + 2], None) for i in range(len(order) - 1)]
+        return streaming_response(stream_multi_stop(order, legs, geometry_opts, save_history), stream)
+    # One multi-waypoint request for the whole trip (legs fetched concurrently as a fallback)
+    road_polyline, leg_distances = await get_osrm_trip_legs_async(stop_coords)
+    for i, leg_distance in enumerate(leg_distances):
+        if leg_distance is None:
+            return {"error": f"No route from {order[i]} to {order[i+1]}"}
+    total_dist = sum(leg_distances)
     # Save to user history
     add_route_to_history(current_user.username, {
         "type": "multi-stop-direct",
@@ -372,8 +676,8 @@ def multi_direct_route(
         "path_coords": road_polyline,
         "created_at": datetime.utcnow().isoformat()
     })
-    return {
+    return negotiated_response(http_request, {
         "order": order,
-        "path_coords": road_polyline,
+        "path_coords": format_path(road_polyline, **geometry_opts),
         "total_distance_km": total_dist
-    }
\ No newline at end of file
+    })
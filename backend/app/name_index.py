@@ -0,0 +1,168 @@
+from typing import Any, Dict, List, Optional
+import bisect
+import re
+import threading
+
+# Name lookups over a location list, built once per list:
+#  - exact lookups on a normalized name (case, punctuation and spacing ignored) are one dict hit;
+#  - prefix search (autocomplete) bisects a sorted array holding every name and every
+#    word-suffix of it ("clock tower", "tower"), so "tow" finds "Clock Tower";
+#  - typo-tolerant matching uses a symmetric-delete dict: every string reachable from a
+#    name by up to allowed_edits(name) deletions maps back to that name, so candidates for a
+#    misspelt query are found with hash lookups and then checked with an edit distance.
+#    A name never needs more deletions than it allows typos (a longer query allows at least
+#    as many, and the length difference is spent on the query's side). Only the first
+#    TYPO_PREFIX_LEN characters of names and queries are indexed, which keeps the variants
+#    per name bounded for long names (candidates are still checked on the full name), and
+#    the dict is only built on the first lookup that needs it.
+
+TYPO_MAX_EDITS = 2
+TYPO_PREFIX_LEN = 10
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", str(name).casefold()).split())
+
+
+def _deletes(key: str, max_edits: int) -> set:
+    """key and every string obtained from it by deleting up to max_edits characters."""
+    found = {key}
+    frontier = {key}
+    for _ in range(max_edits):
+        frontier = {s[:i] + s[i + 1:] for s in frontier for i in range(len(s))} - found
+        found |= frontier
+    return found
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance (insertions, deletions, substitutions, adjacent swaps)."""
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def allowed_edits(key: str) -> int:
+    """Typos tolerated for a query of this length (none for very short queries)."""
+    if len(key) <= 3:
+        return 0
+    return 1 if len(key) <= 6 else TYPO_MAX_EDITS
+
+
+class NameIndex:
+    def __init__(self, locations: List[Dict[str, Any]]):
+        self.locations = locations
+        names = getattr(locations, "names", None)
+        if names is None:
+            names = [loc["name"] for loc in locations]
+        self._keys = [normalize_name(name) for name in names]
+        self._by_key: Dict[str, int] = {}
+        self._deletes: Optional[Dict[str, List[int]]] = None
+        self._deletes_lock = threading.Lock()
+        prefix_entries = set()
+        for i, key in enumerate(self._keys):
+            self._by_key.setdefault(key, i)
+            for m in re.finditer(r"\b\w", key):
+                prefix_entries.add((key[m.start():], i))
+        prefix_entries = sorted(prefix_entries)
+        self._prefix_keys = [key for key, _ in prefix_entries]
+        self._prefix_ids = [i for _, i in prefix_entries]
+
+    def _delete_index(self) -> Dict[str, List[int]]:
+        if self._deletes is None:
+            with self._deletes_lock:
+                if self._deletes is None:
+                    deletes: Dict[str, List[int]] = {}
+                    for i, key in enumerate(self._keys):
+                        for variant in _deletes(key[:TYPO_PREFIX_LEN], allowed_edits(key)):
+                            deletes.setdefault(variant, []).append(i)
+                    self._deletes = deletes
+        return self._deletes
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Location whose normalized name equals normalize_name(name), or None."""
+        i = self._by_key.get(normalize_name(name))
+        return None if i is None else self.locations[i]
+
+    def match(self, name: str) -> Optional[Dict[str, Any]]:
+        """Exact (normalized) match, else the unique closest name within the allowed typos."""
+        key = normalize_name(name)
+        i = self._by_key.get(key)
+        if i is not None:
+            return self.locations[i]
+        max_edits = allowed_edits(key)
+        if max_edits == 0:
+            return None
+        deletes = self._delete_index()
+        candidates = set()
+        for variant in _deletes(key[:TYPO_PREFIX_LEN], max_edits):
+            candidates.update(deletes.get(variant, ()))
+        best, best_ids = max_edits + 1, []
+        for i in candidates:
+            d = edit_distance(key, self._keys[i])
+            if d > max_edits:
+                continue
+            if d < best:
+                best, best_ids = d, [i]
+            elif d == best:
+                best_ids.append(i)
+        # Ambiguous typos (two names equally close) are not guessed
+        return self.locations[best_ids[0]] if len(best_ids) == 1 else None
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Autocomplete: locations with a name or a word in it starting with query, names that
+        start with it first, then alphabetical. Falls back to a typo match when nothing matches.
+        """
+        key = normalize_name(query)
+        if not key:
+            return []
+        starts, words = set(), set()
+        pos = bisect.bisect_left(self._prefix_keys, key)
+        while pos < len(self._prefix_keys) and self._prefix_keys[pos].startswith(key):
+            i = self._prefix_ids[pos]
+            (starts if self._prefix_keys[pos] == self._keys[i] else words).add(i)
+            pos += 1
+        if not starts and not words:
+            fuzzy = self.match(query)
+            return [fuzzy] if fuzzy else []
+        by_name = lambda i: self.locations[i]["name"]
+        ranked = sorted(starts, key=by_name) + sorted(words - starts, key=by_name)
+        return [self.locations[i] for i in ranked[:limit]]
+
+
+_name_index = None
+_name_index_lock = threading.Lock()
+
+
+def get_name_index(locations: List[Dict[str, Any]] = None) -> NameIndex:
+    """
+    Shared NameIndex over a location list (default: the current location store). Every
+    LocationStore keeps its own index for as long as it lives; plain lists share one slot,
+    rebuilt when the list object changes.
+    """
+    global _name_index
+    if locations is None:
+        from .locations import get_location_store
+        locations = get_location_store()
+    if hasattr(locations, "names"):
+        # Cached on the store itself, so it lives and dies with it
+        index = locations.name_index
+        if index is not None:
+            return index
+        with _name_index_lock:
+            if locations.name_index is None:
+                locations.name_index = NameIndex(locations)
+            return locations.name_index
+    index = _name_index
+    if index is not None and index.locations is locations:
+        return index
+    with _name_index_lock:
+        if _name_index is None or _name_index.locations is not locations:
+            _name_index = NameIndex(locations)
+        return _name_index
@@ -0,0 +1,231 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Cache for routing-provider responses (OSRM, OpenRouteService).
+# Tier 1 is an in-memory LRU bounded by entry count with a TTL; tier 2 is a SQLite
+# file that survives restarts. Keys are built from the provider, profile,
+# coordinates rounded to COORD_PRECISION decimals (~1 m) and request options.
+# Cached values are shared between callers and must be treated as read-only.
+# Expired entries can still be read with get_stale (stale-while-revalidate).
+# Disk writes never block the caller: set() queues them and a background thread commits
+# each batch on its own connection, at most every PROVIDER_CACHE_FLUSH_INTERVAL seconds.
+# Disk rows are fresh for the memory TTL too; older ones only serve get_stale until purged.
+
+PROVIDER_CACHE_SIZE = int(os.environ.get("PROVIDER_CACHE_SIZE", "2048"))
+PROVIDER_CACHE_TTL = float(os.environ.get("PROVIDER_CACHE_TTL", str(24 * 3600)))
+PROVIDER_CACHE_DISK_TTL = float(os.environ.get("PROVIDER_CACHE_DISK_TTL", str(7 * 24 * 3600)))
+# Expired entries may still be served as stale while a provider is failing, up to this age
+PROVIDER_CACHE_STALE_TTL = float(os.environ.get("PROVIDER_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+# Empty disables the disk tier
+PROVIDER_CACHE_PATH = os.environ.get("PROVIDER_CACHE_PATH",
+                                     os.path.join(os.path.dirname(__file__), "data", "provider_cache.db"))
+PROVIDER_CACHE_FLUSH_INTERVAL = float(os.environ.get("PROVIDER_CACHE_FLUSH_INTERVAL", "1"))
+# How often the writer thread deletes disk entries past the disk/stale TTL
+PROVIDER_CACHE_PURGE_INTERVAL = float(os.environ.get("PROVIDER_CACHE_PURGE_INTERVAL", "3600"))
+COORD_PRECISION = 5
+
+
+class ProviderCache:
+    def __init__(self, max_entries: int = PROVIDER_CACHE_SIZE, ttl_seconds: float = PROVIDER_CACHE_TTL,
+                 disk_path: Optional[str] = PROVIDER_CACHE_PATH, disk_ttl_seconds: float = PROVIDER_CACHE_DISK_TTL,
+                 stale_ttl_seconds: float = PROVIDER_CACHE_STALE_TTL,
+                 flush_interval: float = PROVIDER_CACHE_FLUSH_INTERVAL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.flush_interval = flush_interval
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "stale_hits": 0,
+                          "disk_writes": 0, "disk_errors": 0}
+        self._disk = None
+        self._pending: Dict[str, Tuple[float, Any]] = {}  # queued disk writes, newest value per key
+        self._dirty = threading.Event()
+        self._write_lock = threading.Lock()
+        if disk_path:
+            try:
+                self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+                # WAL lets lookups read while the writer thread commits
+                self._disk.execute("PRAGMA journal_mode=WAL")
+                self._disk.execute("CREATE TABLE IF NOT EXISTS provider_cache "
+                                   "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)")
+                self._disk.commit()
+                self._writer_disk = sqlite3.connect(disk_path, check_same_thread=False)
+            except sqlite3.Error as e:
+                print(f"Provider cache disk tier disabled ({disk_path}): {e}")
+                self._disk = None
+            else:
+                threading.Thread(target=self._write_loop, name="provider-cache-writer", daemon=True).start()
+
+    @staticmethod
+    def make_key(provider: str, profile: str, coords: Iterable[Tuple[float, float]], options: Dict[str, Any] = None) -> str:
+        """Stable key for a provider request. coords are (lng, lat) pairs in request order."""
+        payload = {
+            "provider": provider,
+            "profile": profile,
+            "coords": [[round(float(x), COORD_PRECISION), round(float(y), COORD_PRECISION)] for x, y in coords],
+            "options": options or {},
+        }
+        return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                # Expired entries stay (LRU-bounded) so get_stale can still serve them
+                self._counters["expirations"] += 1
+            pending = self._pending.get(key)
+            if pending is not None and entry is None and now - pending[0] <= self.ttl_seconds:
+                self._put_memory(key, pending[1], pending[0])
+                self._counters["memory_hits"] += 1
+                return pending[1]
+            # An expired memory entry is at least as new as its disk row, so skip the read
+            if self._disk is not None and entry is None:
+                try:
+                    row = self._disk.execute("SELECT value, stored_at FROM provider_cache WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error:
+                    self._counters["disk_errors"] += 1
+                    row = None
+                if row is not None and now - row[1] <= max(self.disk_ttl_seconds, self.stale_ttl_seconds):
+                    value = json.loads(row[0])
+                    # Kept in memory with its original age, so later lookups skip the disk either way
+                    self._put_memory(key, value, row[1])
+                    if now - row[1] <= min(self.ttl_seconds, self.disk_ttl_seconds):
+                        self._counters["disk_hits"] += 1
+                        return value
+                    # Older than the TTL: only served through get_stale
+                    self._counters["expirations"] += 1
+            self._counters["misses"] += 1
+            return None
+
+    def get_stale(self, key: str) -> Optional[Any]:
+        """Value for key even if expired (up to the stale TTL), for use while a provider is down."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            entry = entry or self._pending.get(key)
+            if entry is not None and now - entry[0] <= self.stale_ttl_seconds:
+                self._counters["stale_hits"] += 1
+                return entry[1]
+            if self._disk is not None:
+                try:
+                    row = self._disk.execute("SELECT value, stored_at FROM provider_cache WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error:
+                    self._counters["disk_errors"] += 1
+                    row = None
+                if row is not None and now - row[1] <= self.stale_ttl_seconds:
+                    self._counters["stale_hits"] += 1
+                    return json.loads(row[0])
+            return None
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, value, now)
+            if self._disk is not None:
+                self._pending[key] = (now, value)
+                self._dirty.set()
+
+    def _write_loop(self):
+        self.purge_disk()
+        last_purge = time.monotonic()
+        while True:
+            self._dirty.wait(PROVIDER_CACHE_PURGE_INTERVAL)
+            if self._dirty.is_set():
+                time.sleep(self.flush_interval)  # let a batch accumulate
+                self._dirty.clear()
+                self.flush()
+            if time.monotonic() - last_purge >= PROVIDER_CACHE_PURGE_INTERVAL:
+                self.purge_disk()
+                last_purge = time.monotonic()
+
+    def flush(self) -> int:
+        """Commit the queued disk writes now. Returns the number written."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch or self._disk is None:
+            return 0
+        rows = []
+        errors = 0
+        for key, (stored_at, value) in batch.items():
+            try:
+                rows.append((key, json.dumps(value), stored_at))
+            except (TypeError, ValueError) as e:
+                print(f"Provider cache disk write failed: {e}")
+                errors += 1
+        with self._write_lock:
+            try:
+                self._writer_disk.executemany(
+                    "INSERT OR REPLACE INTO provider_cache (key, value, stored_at) VALUES (?, ?, ?)", rows)
+                self._writer_disk.commit()
+            except sqlite3.Error as e:
+                print(f"Provider cache disk write failed: {e}")
+                errors += len(rows)
+                rows = []
+        with self._lock:
+            self._counters["disk_writes"] += len(rows)
+            self._counters["disk_errors"] += errors
+        return len(rows)
+
+    def _put_memory(self, key: str, value: Any, stored_at: float):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def purge_disk(self) -> int:
+        """Delete disk entries too old to be served even as stale. Returns the number removed."""
+        if self._disk is None:
+            return 0
+        max_age = max(self.disk_ttl_seconds, self.stale_ttl_seconds)
+        with self._write_lock:
+            try:
+                cur = self._writer_disk.execute("DELETE FROM provider_cache WHERE stored_at < ?", (time.time() - max_age,))
+                self._writer_disk.commit()
+            except sqlite3.Error as e:
+                print(f"Provider cache disk purge failed: {e}")
+                return 0
+            return cur.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._pending.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM provider_cache")
+                self._disk.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            stats["max_entries"] = self.max_entries
+            stats["ttl_seconds"] = self.ttl_seconds
+            stats["disk_enabled"] = self._disk is not None
+            stats["pending_writes"] = len(self._pending)
+            if self._disk is not None:
+                try:
+                    stats["disk_entries"] = self._disk.execute("SELECT COUNT(*) FROM provider_cache").fetchone()[0]
+                except sqlite3.Error:
+                    stats["disk_entries"] = None
+            return stats
+
+
+provider_cache = ProviderCache()
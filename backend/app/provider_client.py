@@ -0,0 +1,88 @@
+from typing import Dict, Optional
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from .circuit_breaker import get_breaker, is_failure_status
+
+# Shared HTTP client for the routing providers (OSRM, OpenRouteService).
+# Connections are pooled and kept alive across requests (HTTP/2 where the provider
+# negotiates it, via httpx[http2]), every call has explicit
+# connect/read timeouts, and concurrent requests to one host are capped. Every call
+# goes through the host's circuit breaker; while it is open calls fail immediately
+# with CircuitOpenError instead of waiting out timeouts.
+
+PROVIDER_CONNECT_TIMEOUT = float(os.environ.get("PROVIDER_CONNECT_TIMEOUT", "3"))
+PROVIDER_READ_TIMEOUT = float(os.environ.get("PROVIDER_READ_TIMEOUT", "15"))
+PROVIDER_MAX_CONNECTIONS = int(os.environ.get("PROVIDER_MAX_CONNECTIONS", "50"))
+PROVIDER_PER_HOST_CONCURRENCY = int(os.environ.get("PROVIDER_PER_HOST_CONCURRENCY", "10"))
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised by ProviderClient instead of calling a provider whose breaker is open."""
+
+
+class ProviderClient:
+    """
+    Async provider client: one pooled httpx.AsyncClient per event loop plus a
+    semaphore per host limiting in-flight requests.
+    """
+
+    def __init__(self, per_host_concurrency: int = PROVIDER_PER_HOST_CONCURRENCY):
+        self.per_host_concurrency = per_host_concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop or self._client.is_closed:
+            # Pools and semaphores belong to the loop that created them
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(PROVIDER_READ_TIMEOUT, connect=PROVIDER_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=PROVIDER_MAX_CONNECTIONS,
+                                    max_keepalive_connections=PROVIDER_MAX_CONNECTIONS),
+            )
+            self._loop = loop
+            self._host_limits = {}
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        client = self._get_client()
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        breaker = get_breaker(url)
+        async with limit:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {breaker.name}")
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                breaker.record(False, time.perf_counter() - started)
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record(not is_failure_status(response.status_code), time.perf_counter() - started)
+            return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+provider_client = ProviderClient()
@@ -0,0 +1,384 @@
+from typing import Any, Dict, List, Optional, Tuple
+import heapq
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from .locations import LocationStore, bounding_box, get_location_store
+from .spatial_index import GridIndex, KM_PER_DEG_LAT
+from .route_service import FW_MAX_EDGE_KM, build_shortest_path_backend, get_shortest_path_backend
+
+# Region sharding: every city / district is a region with its own location file, landmark
+# graph and shortest-path matrices. Regions are listed in REGIONS_PATH (JSON:
+# {"default": name, "regions": [{"name", "path", "bbox": [min_lat, min_lng, max_lat, max_lng]}]},
+# paths relative to that file; without a bbox only the file's coordinates are read to find it).
+# The default region is the hot-reloaded location store (LOCATIONS_PATH) and stays resident;
+# other regions are read on first use and the least recently used are evicted when their data
+# exceeds REGION_MEMORY_BUDGET_MB, so startup and memory do not grow with the number of regions
+# configured. Spatial and name indexes are cached per location store, so regions never evict
+# each other's (or the default region's).
+# Routes between regions go through boundary nodes: landmarks within REGION_LINK_KM of a
+# landmark in a neighbouring region. Each region keeps a small transit table (shortest distances
+# between its boundary nodes) after eviction, so a route crossing a region only reloads that
+# region's matrices to expand its leg into a path.
+
+REGIONS_PATH = os.environ.get("REGIONS_PATH") or os.path.join(os.path.dirname(__file__), "data", "regions.json")
+REGION_MEMORY_BUDGET_MB = float(os.environ.get("REGION_MEMORY_BUDGET_MB", "512"))
+REGION_LINK_KM = float(os.environ.get("REGION_LINK_KM", str(FW_MAX_EDGE_KM)))
+
+INF = float('inf')
+# Rough CPython cost of a dict key (slot, key object) and of an adjacency entry ((name, km)
+# tuple or dict slot plus float) in the dict-based backends, measured with tracemalloc
+GRAPH_KEY_BYTES = 100
+GRAPH_ENTRY_BYTES = 80
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _array_bytes(obj) -> int:
+    """Bytes held by the NumPy arrays among an object's attributes."""
+    return sum(value.nbytes for value in vars(obj).values() if isinstance(value, np.ndarray))
+
+
+def _graph_bytes(obj) -> int:
+    """
+    Estimated bytes held by the dicts and lists among an object's attributes (adjacency lists,
+    edge maps, indexes).
+    """
+    total = 0
+    for value in vars(obj).values():
+        if isinstance(value, dict):
+            total += GRAPH_KEY_BYTES * len(value)
+            total += GRAPH_ENTRY_BYTES * sum(len(v) for v in value.values() if isinstance(v, (list, dict)))
+        elif isinstance(value, list):
+            total += GRAPH_ENTRY_BYTES * len(value)
+    return total
+
+
+class Region:
+    def __init__(self, name: str, path: Optional[str] = None, bbox=None):
+        self.name = name
+        self.path = path  # None: the default location store
+        self.bbox = tuple(bbox) if bbox else None  # (min_lat, min_lng, max_lat, max_lng)
+        self._fixed_bbox = bool(bbox)
+        self._bbox_version = None  # version a computed bbox was read at
+        self.last_used = 0.0
+        self.transit = None  # (version, boundary names, distance matrix)
+        self._store = None
+        self._store_version = None
+        self._backends = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_default(self) -> bool:
+        return self.path is None
+
+    @property
+    def loaded(self) -> bool:
+        return self.is_default or self._store is not None
+
+    def version(self):
+        """Changes whenever the region's locations do (the store object, or the file's mtime)."""
+        return get_location_store() if self.is_default else _mtime(self.path)
+
+    def locations(self) -> LocationStore:
+        self.last_used = time.monotonic()
+        if self.is_default:
+            store = get_location_store()
+        else:
+            with self._lock:
+                version = _mtime(self.path)
+                if self._store is None or self._store_version != version:
+                    self._store = LocationStore.load(self.path)
+                    self._store_version = version
+                    self._backends = {}
+                    print(f"Loaded region {self.name}: {len(self._store)} locations from {self.path}")
+                store = self._store
+        return store
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """
+        Configured bbox, else the one of the region's locations, read from the coordinates
+        alone (the region is not loaded) and re-read when the locations change.
+        """
+        if self._fixed_bbox:
+            return self.bbox
+        version = self.version()
+        if self.bbox is None or self._bbox_version != version:
+            if self.is_default:
+                store = get_location_store()
+                self.bbox = (float(np.min(store.lat)), float(np.min(store.lng)),
+                             float(np.max(store.lat)), float(np.max(store.lng)))
+            else:
+                self.bbox = bounding_box(self.path)
+            self._bbox_version = version
+        return self.bbox
+
+    def backend(self, algorithm: str = "floyd_warshall", max_edge_km: float = FW_MAX_EDGE_KM):
+        """Shortest-path backend for this region (the shared ones for the default region)."""
+        if self.is_default:
+            self.last_used = time.monotonic()
+            return get_shortest_path_backend(algorithm, max_edge_km=max_edge_km)
+        locations = self.locations()
+        with self._lock:
+            backend = self._backends.get((algorithm, max_edge_km))
+            if backend is None:
+                backend = build_shortest_path_backend(algorithm, locations, max_edge_km)
+                self._backends[(algorithm, max_edge_km)] = backend
+            return backend
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the region's columns, name index, matrices and graphs
+        (0 for the default region).
+        """
+        if self.is_default or self._store is None:
+            return 0
+        with self._lock:
+            total = _array_bytes(self._store) + sum(_array_bytes(b) + _graph_bytes(b) for b in self._backends.values())
+            if self._store.name_index is not None:
+                # Includes the typo dict once a misspelt lookup has built it
+                total += _graph_bytes(self._store.name_index)
+            return total
+
+    def stats(self) -> Dict[str, Any]:
+        store = get_location_store() if self.is_default else self._store
+        return {
+            "name": self.name,
+            "loaded": self.loaded,
+            "locations": len(store) if store is not None else None,
+            "bbox": self.bbox,
+            "memory_mb": round(self.nbytes() / 2 ** 20, 3),
+            "transit_nodes": len(self.transit[1]) if self.transit else 0,
+        }
+
+    def evict(self):
+        with self._lock:
+            self._store = None
+            self._store_version = None
+            self._backends = {}
+
+
+class RegionRegistry:
+    def __init__(self, regions: List[Region], default: str, budget_mb: float = REGION_MEMORY_BUDGET_MB,
+                 link_km: float = REGION_LINK_KM):
+        self.regions = {region.name: region for region in regions}
+        if default not in self.regions:
+            raise ValueError(f"Default region {default!r} is not configured")
+        self.default = default
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.link_km = link_km
+        self._links = {}  # (region, region) -> (versions, [(name, name, km), ...])
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, path: str = REGIONS_PATH) -> "RegionRegistry":
+        """Registry from a regions JSON file; without one, just the default location store."""
+        if not os.path.exists(path):
+            return cls([Region("default")], "default")
+        with open(path) as f:
+            config = json.load(f)
+        base = os.path.dirname(path)
+        default = config["default"]
+        regions = []
+        for entry in config["regions"]:
+            region_path = None
+            if entry["name"] != default:
+                region_path = os.path.join(base, entry["path"])
+            regions.append(Region(entry["name"], region_path, entry.get("bbox")))
+        return cls(regions, default)
+
+    def get(self, name: Optional[str] = None) -> Region:
+        region = self.regions.get(name or self.default)
+        if region is None:
+            raise ValueError(f"Unknown region: {name}")
+        return region
+
+    def locations(self, name: Optional[str] = None) -> LocationStore:
+        region = self.get(name)
+        store = region.locations()
+        self._enforce_budget(region)
+        return store
+
+    def backend(self, name: Optional[str] = None, algorithm: str = "floyd_warshall"):
+        region = self.get(name)
+        backend = region.backend(algorithm)
+        self._enforce_budget(region)
+        return backend
+
+    def _enforce_budget(self, keep: Region):
+        """Evict least recently used regions (never keep or the default) while over the budget."""
+        with self._lock:
+            loaded = [r for r in self.regions.values() if not r.is_default and r.loaded]
+            total = sum(r.nbytes() for r in loaded)
+            for region in sorted(loaded, key=lambda r: r.last_used):
+                if total <= self.budget_bytes:
+                    break
+                if region is keep:
+                    continue
+                total -= region.nbytes()
+                region.evict()
+                print(f"Evicted region {region.name} (memory budget {self.budget_bytes / 2 ** 20:.0f} MB)")
+
+    # --- Boundary nodes and cross-region routing ---
+
+    def neighbours(self, region: Region) -> List[Region]:
+        """Regions whose bounding box lies within link_km of this one's."""
+        min_lat, min_lng, max_lat, max_lng = region.bounds()
+        pad_lat = self.link_km / KM_PER_DEG_LAT
+        pad_lng = pad_lat / max(np.cos(np.radians(max(abs(min_lat), abs(max_lat)))), 1e-6)
+        found = []
+        for other in self.regions.values():
+            if other is region:
+                continue
+            o_min_lat, o_min_lng, o_max_lat, o_max_lng = other.bounds()
+            if (o_min_lat <= max_lat + pad_lat and o_max_lat >= min_lat - pad_lat
+                    and o_min_lng <= max_lng + pad_lng and o_max_lng >= min_lng - pad_lng):
+                found.append(other)
+        return found
+
+    def links(self, a: Region, b: Region) -> List[Tuple[str, str, float]]:
+        """(landmark in a, landmark in b, km) for every pair within link_km, cached per location version."""
+        versions = (a.version(), b.version())
+        with self._lock:
+            cached = self._links.get((a.name, b.name))
+            if cached is not None and cached[0] == versions:
+                return cached[1]
+        store_a, store_b = self.locations(a.name), self.locations(b.name)
+        index_b = GridIndex(store_b.lat, store_b.lng, cell_km=self.link_km)
+        found = []
+        for i in range(len(store_a)):
+            for j, km in zip(*index_b.query_radius(float(store_a.lat[i]), float(store_a.lng[i]), self.link_km)):
+                found.append((str(store_a.names[i]), str(store_b.names[j]), float(km)))
+        with self._lock:
+            self._links[(a.name, b.name)] = (versions, found)
+            self._links[(b.name, a.name)] = (versions[::-1], [(y, x, km) for x, y, km in found])
+        return found
+
+    def boundary(self, region: Region) -> Dict[str, List[Tuple[str, str, float]]]:
+        """Boundary landmarks of region -> their links [(other region, landmark, km), ...]."""
+        nodes = {}
+        for other in self.neighbours(region):
+            for x, y, km in self.links(region, other):
+                nodes.setdefault(x, []).append((other.name, y, km))
+        return nodes
+
+    def transit(self, region: Region, boundary_names: List[str]) -> Tuple[Dict[str, int], np.ndarray]:
+        """Shortest distances between the region's boundary nodes (kept when the region is evicted)."""
+        version = region.version()
+        cached = region.transit
+        if cached is None or cached[0] != version or cached[1] != boundary_names:
+            engine = self.backend(region.name)
+            idx = [engine.index[n] for n in boundary_names]
+            region.transit = (version, boundary_names, engine.dist[np.ix_(idx, idx)].copy())
+        _, names, matrix = region.transit
+        return {n: i for i, n in enumerate(names)}, matrix
+
+    def route(self, start: str, end: str, start_region: Optional[str] = None, end_region: Optional[str] = None,
+              algorithm: str = "floyd_warshall") -> Tuple[List[Tuple[float, float]], float, List[Dict[str, Any]]]:
+        """
+        Shortest landmark route from start (in start_region) to end (in end_region).
+        Within one region the selected backend is used; across regions a Dijkstra search over
+        boundary nodes joins the Floyd-Warshall matrices of the regions it passes through.
+        Returns: path (list of [lat, lng]), total distance (km), segments per region
+        """
+        a, b = self.get(start_region), self.get(end_region)
+        for region, name in ((a, start), (b, end)):
+            if self.locations(region.name).index_of(name) is None:
+                raise ValueError(f"Unknown landmark {name!r} in region {region.name}")
+        if a is b:
+            backend = self.backend(a.name, algorithm)
+            path_names, km = backend.shortest_path(start, end)
+            return (self._path_coords(a, path_names), km,
+                    [{"region": a.name, "from": start, "to": end, "distance_km": km}] if path_names else [])
+
+        engines = {a.name: self.backend(a.name), b.name: self.backend(b.name)}
+        boundaries = {}
+        source, target = (a.name, start), (b.name, end)
+        dist = {source: 0.0}
+        prev = {source: None}
+        heap = [(0.0, a.name, start)]
+        while heap:
+            d, region_name, node = heapq.heappop(heap)
+            if d > dist[(region_name, node)]:
+                continue
+            if (region_name, node) == target:
+                break
+            region = self.regions[region_name]
+            if region_name not in boundaries:
+                boundaries[region_name] = self.boundary(region)
+            boundary = boundaries[region_name]
+            moves = []
+            if region_name in engines:
+                # Source / target region: exact distances from the region's matrices
+                engine = engines[region_name]
+                moves += [(region_name, x, engine.distance(node, x)) for x in boundary]
+                if region is b:
+                    moves.append((region_name, end, engine.distance(node, end)))
+            elif node in boundary:
+                index, matrix = self.transit(region, sorted(boundary))
+                row = matrix[index[node]]
+                moves += [(region_name, x, float(row[i])) for x, i in index.items()]
+            moves += boundary.get(node, [])
+            for next_region, next_node, km in moves:
+                key = (next_region, next_node)
+                if key == (region_name, node) or not np.isfinite(km):
+                    continue
+                if d + km < dist.get(key, INF):
+                    dist[key] = d + km
+                    prev[key] = (region_name, node)
+                    heapq.heappush(heap, (d + km, next_region, next_node))
+        if target not in prev:
+            return [], INF, []
+
+        hops = [target]
+        while prev[hops[-1]] is not None:
+            hops.append(prev[hops[-1]])
+        hops.reverse()
+        path, segments = [], []
+        for (r1, n1), (r2, n2) in zip(hops, hops[1:]):
+            if r1 == r2:
+                engine = self.backend(r1)
+                coords = [tuple(c) for c in engine.path_coords(n1, n2)]
+                segments.append({"region": r1, "from": n1, "to": n2, "distance_km": engine.distance(n1, n2)})
+            else:
+                coords = [self._coords(self.regions[r1], n1), self._coords(self.regions[r2], n2)]
+                segments.append({"region": None, "from": n1, "to": n2, "distance_km": dist[(r2, n2)] - dist[(r1, n1)]})
+            path += coords[1:] if path and coords and path[-1] == coords[0] else coords
+        return path, dist[target], segments
+
+    def _coords(self, region: Region, name: str) -> Tuple[float, float]:
+        store = self.locations(region.name)
+        i = store.index_of(name)
+        return float(store.lat[i]), float(store.lng[i])
+
+    def _path_coords(self, region: Region, names: List[str]) -> List[Tuple[float, float]]:
+        return [self._coords(region, n) for n in names]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "default": self.default,
+            "memory_budget_mb": self.budget_bytes / 2 ** 20,
+            "regions": [region.stats() for region in self.regions.values()],
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_region_registry() -> RegionRegistry:
+    """Shared RegionRegistry from REGIONS_PATH (read once; regions themselves load lazily)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = RegionRegistry.from_config(REGIONS_PATH)
+        return _registry
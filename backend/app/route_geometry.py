@@ -0,0 +1,147 @@
+from typing import List, Optional, Union
+import heapq
+import numpy as np
+from .spatial_index import KM_PER_DEG_LAT
+
+# Compact geometry for API responses: Google encoded polylines plus Douglas-Peucker and
+# Visvalingam-Whyatt simplification at a map zoom level. Paths are lists of [lat, lng];
+# full resolution stays the default and is returned unless a caller opts in.
+
+GEOMETRY_FORMATS = ("coords", "polyline")
+SIMPLIFY_METHODS = ("dp", "vw")
+POLYLINE_PRECISION = 5
+# Ground resolution of a 256px Web Mercator tile at zoom 0, metres per pixel at the equator
+METRES_PER_PIXEL_Z0 = 156543.03392
+MIN_ZOOM, MAX_ZOOM = 0, 22
+
+
+def zoom_tolerance_m(zoom: float, lat: float) -> float:
+    """Length of one screen pixel (m) at the given zoom and latitude."""
+    return METRES_PER_PIXEL_Z0 * np.cos(np.radians(lat)) / (2 ** zoom)
+
+
+def _project_m(c: np.ndarray) -> np.ndarray:
+    """Local equirectangular projection to metres around the path's mean latitude."""
+    scale = KM_PER_DEG_LAT * 1000
+    return np.column_stack([c[:, 0] * scale, c[:, 1] * scale * np.cos(np.radians(c[:, 0].mean()))])
+
+
+def _segment_distances_m(p: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Distance of each point in p to the segment a-b (projected metres)."""
+    ab = b - a
+    denom = float(ab @ ab)
+    if denom == 0:
+        return np.hypot(*(p - a).T)
+    t = np.clip((p - a) @ ab / denom, 0.0, 1.0)
+    return np.hypot(*(p - (a + t[:, None] * ab)).T)
+
+
+def douglas_peucker(coords, tolerance_m: float) -> np.ndarray:
+    """Indexes of the vertices kept by Douglas-Peucker simplification (always includes both ends)."""
+    c = np.asarray(coords, dtype=float).reshape(-1, 2)
+    n = len(c)
+    if n < 3:
+        return np.arange(n)
+    xy = _project_m(c)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, n - 1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        d = _segment_distances_m(xy[i + 1:j], xy[i], xy[j])
+        k = int(np.argmax(d))
+        if d[k] > tolerance_m:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+    return np.flatnonzero(keep)
+
+
+def visvalingam_whyatt(coords, tolerance_m: float) -> np.ndarray:
+    """
+    Indexes of the vertices kept by Visvalingam-Whyatt simplification: vertices are removed
+    smallest effective area first until every remaining triangle exceeds tolerance_m ** 2.
+    """
+    c = np.asarray(coords, dtype=float).reshape(-1, 2)
+    n = len(c)
+    if n < 3:
+        return np.arange(n)
+    xy = _project_m(c)
+    min_area = tolerance_m ** 2
+
+    def area(i, j, k):
+        return abs((xy[j, 0] - xy[i, 0]) * (xy[k, 1] - xy[i, 1]) - (xy[k, 0] - xy[i, 0]) * (xy[j, 1] - xy[i, 1])) / 2
+
+    prev = np.arange(-1, n - 1)
+    nxt = np.arange(1, n + 1)
+    # Initial areas for all interior vertices at once
+    u, w = xy[1:-1] - xy[:-2], xy[2:] - xy[:-2]
+    areas = np.abs(u[:, 0] * w[:, 1] - u[:, 1] * w[:, 0]) / 2
+    heap = [(float(a), i + 1) for i, a in enumerate(areas)]
+    heapq.heapify(heap)
+    current = np.full(n, np.inf)
+    current[1:-1] = areas
+    removed = np.zeros(n, dtype=bool)
+    last_area = 0.0
+    while heap:
+        a, j = heapq.heappop(heap)
+        if removed[j] or a != current[j]:
+            continue  # stale entry
+        if a >= min_area:
+            break
+        removed[j] = True
+        # Never let a neighbour's area drop below the one just removed (keeps removal order monotone)
+        last_area = max(last_area, a)
+        p, q = prev[j], nxt[j]
+        nxt[p], prev[q] = q, p
+        for v in (p, q):
+            if 0 < v < n - 1:
+                current[v] = max(area(prev[v], v, nxt[v]), last_area)
+                heapq.heappush(heap, (current[v], v))
+    return np.flatnonzero(~removed)
+
+
+def simplify(coords, tolerance_m: float, method: str = "dp") -> List[List[float]]:
+    c = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if tolerance_m <= 0 or len(c) < 3:
+        return c.tolist()
+    kept = visvalingam_whyatt(c, tolerance_m) if method == "vw" else douglas_peucker(c, tolerance_m)
+    return c[kept].tolist()
+
+
+def encode_polyline(coords, precision: int = POLYLINE_PRECISION) -> str:
+    """Google encoded polyline of [lat, lng] pairs (same output as polyline.encode)."""
+    c = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if not len(c):
+        return ""
+    scaled = c * 10 ** precision
+    ints = (np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)).astype(np.int64)
+    deltas = np.diff(ints, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    # Split every value into 5-bit chunks, low bits first; all but the last get the 0x20 flag
+    shifts = np.arange(0, 40, 5)
+    chunks = (values[:, None] >> shifts) & 0x1F
+    n_chunks = np.maximum(1, ((values[:, None] >> shifts) > 0).sum(axis=1))
+    position = np.arange(len(shifts))
+    chars = chunks + 63 + np.where(position < (n_chunks - 1)[:, None], 0x20, 0)
+    return chars[position < n_chunks[:, None]].astype(np.uint8).tobytes().decode("ascii")
+
+
+def format_path(coords, geometry: str = "coords", zoom: Optional[float] = None,
+                simplify_method: str = "dp") -> Union[List[List[float]], str]:
+    """
+    Response form of a [lat, lng] path: simplified to about one pixel at zoom (if given),
+    then either left as coordinates or encoded as a polyline string.
+    """
+    if not coords or isinstance(coords, str):
+        return coords
+    path = coords
+    if zoom is not None and len(path) > 2:
+        c = np.asarray(path, dtype=float).reshape(-1, 2)
+        path = simplify(c, zoom_tolerance_m(zoom, float(c[:, 0].mean())), simplify_method)
+    if geometry == "polyline":
+        return encode_polyline(path)
+    return path
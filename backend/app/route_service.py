@@ -1,14 +1,53 @@
 from typing import List, Dict, Any, Tuple
 import math
-import requests
 import random
 import datetime
 import os
 import polyline
-from .locations import DEHRADUN_LOCATIONS, get_location_by_name
+import threading
+import asyncio
+import httpx
+import numpy as np
+from .geo import cumulative_lengths, segment_bearings, distance_matrix
+from .locations import get_location_store, get_location_by_name
+from .graph_engine import FloydWarshallEngine
+from .shortest_path import DijkstraBackend, AStarBackend, ContractionHierarchyBackend
+from .spatial_index import get_location_index
+from .name_index import get_name_index
+from .local_router import get_local_router, PROFILE_MODES
+from .provider_client import provider_client
+from .provider_cache import provider_cache
+from .circuit_breaker import get_breaker, CLOSED
+from .route_similarity import RouteShape, shapes_similar, distinct_indices, SIMILARITY_THRESHOLD_KM
+from .tsp import solve_tsp
+from .traffic_model import get_traffic_model, zone_indices, traffic_labels, hour_of_week, local_time, VEHICLES, WEATHER_MULTIPLIERS
+from .time_dependent import TimeDependentGraph
+from .isochrone import reachability_polygon
+from .vrp import solve_vrp, DEFAULT_TIME_BUDGET_S as VRP_TIME_BUDGET_S
 
 OPENROUTESERVICE_API_KEY = os.environ.get("ORS_API_KEY", "5b3ce3597851110001cf6248216b7bd858544b6e9011fc6c183d49b7")
 
+# Primary road-routing provider: "ors" (OpenRouteService/OSRM over the network) or
+# "local" (in-process router over the OSM extract at LOCAL_OSM_PATH, no network needed).
+# The network providers remain the fallback when the local router has no answer.
+ROUTING_PROVIDER = os.environ.get("ROUTING_PROVIDER", "ors")
+
+# Use the OSRM demo server - for production, you should host your own OSRM instance
+OSRM_BASE_URL = "https://router.project-osrm.org"
+OSRM_ROUTE_PARAMS = {"overview": "full", "geometries": "geojson"}
+# Multi-waypoint trips may turn around at a stop, as the per-leg requests they replace do
+OSRM_MULTI_ROUTE_PARAMS = {**OSRM_ROUTE_PARAMS, "continue_straight": "false"}
+OSRM_ALTERNATE_PROFILES = {"driving": "car", "cycling": "bike", "walking": "foot"}
+OSRM_ALTERNATIVES_DEADLINE = float(os.environ.get("OSRM_ALTERNATIVES_DEADLINE", "8"))
+
+# Straight-line estimates: typical road path is 30% longer than direct
+ROAD_DETOUR_FACTOR = 1.3
+AVG_SPEED_KMH = {"car": 35, "bike": 15, "walk": 5}
+DEFAULT_SERVICE_S = 300  # seconds spent at each delivery stop
+ROUTE_BATCH_CONCURRENCY = int(os.environ.get("ROUTE_BATCH_CONCURRENCY", "16"))
+# Coordinates within this distance of a landmark may use the landmark graph in its place
+LANDMARK_SNAP_KM = float(os.environ.get("LANDMARK_SNAP_KM", "2.5"))
+
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two points using Haversine formula."""
     R = 6371  # Earth's radius in kilometers
@@ -27,24 +66,88 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 
     return distance
 
-def get_osrm_route(start_lng: float, start_lat: float, end_lng: float, end_lat: float, profile: str = "driving") -> Dict[str, Any]:
-    """Get route from OSRM service with additional error handling and logging."""
-    # Use the OSRM demo server - for production, you should host your own OSRM instance
-    base_url = "https://router.project-osrm.org"
-    
+def _osrm_route_url(start_lng: float, start_lat: float, end_lng: float, end_lat: float, profile: str) -> str:
     # Format coordinates with proper precision and no spaces
     coord_str = f"{start_lng:.6f},{start_lat:.6f};{end_lng:.6f},{end_lat:.6f}"
-    url = f"{base_url}/route/v1/{profile}/{coord_str}"
-    
-    # Use simpler params first
-    params = {
-        "overview": "full",
-        "geometries": "geojson"
-    }
+    return f"{OSRM_BASE_URL}/route/v1/{profile}/{coord_str}"
+
+def _osrm_has_routes(data: Dict[str, Any]) -> bool:
+    return data.get("code") == "Ok" and "routes" in data and bool(data["routes"])
+
+# Stale-while-revalidate: while a provider's circuit breaker is not closed, expired
+# cache entries are served immediately and refreshed in the background (at most one
+# refresh per key at a time), so callers never wait on a failing provider.
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_refresh_tasks = set()  # keeps in-flight async refreshes referenced until they finish
+
+def _claim_refresh(cache_key: str) -> bool:
+    with _refreshing_lock:
+        if cache_key in _refreshing:
+            return False
+        _refreshing.add(cache_key)
+        return True
+
+def _release_refresh(cache_key: str):
+    with _refreshing_lock:
+        _refreshing.discard(cache_key)
+
+def _refresh_in_background_async(cache_key: str, fetch):
+    if not _claim_refresh(cache_key):
+        return
+    async def run():
+        try:
+            await fetch()
+        except Exception as e:
+            print(f"Background refresh failed: {e}")
+        finally:
+            _release_refresh(cache_key)
+    task = asyncio.get_running_loop().create_task(run())
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+def _stale_while_tripped(cache_key: str, url: str):
+    """Stale cache entry for cache_key if url's provider breaker is open or half-open, else None."""
+    if get_breaker(url).state == CLOSED:
+        return None
+    return provider_cache.get_stale(cache_key)
+
+async def _cached_fetch_async(cache_key: str, url: str, fetch):
+    """
+    Cached provider response: fresh from the cache, else stale (refreshed in the background)
+    while the provider's breaker is tripped, else await fetch(). fetch caches its own result;
+    if it comes back empty a stale entry is preferred over nothing.
+    """
+    cached = provider_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    stale = _stale_while_tripped(cache_key, url)
+    if stale is not None:
+        _refresh_in_background_async(cache_key, fetch)
+        return stale
+    result = await fetch()
+    if not result:
+        stale = provider_cache.get_stale(cache_key)
+        if stale is not None:
+            return stale
+    return result
+
+async def get_osrm_route_async(start_lng: float, start_lat: float, end_lng: float, end_lat: float, profile: str = "driving") -> Dict[str, Any]:
+    """Get route from OSRM service (or the local router) using the shared pooled provider client."""
+    if ROUTING_PROVIDER == "local":
+        local_routes = await asyncio.to_thread(get_local_alternatives, start_lat, start_lng, end_lat, end_lng, profile, 1)
+        if local_routes:
+            return {"code": "Ok", "routes": local_routes}
+    cache_key = provider_cache.make_key("osrm", profile, [(start_lng, start_lat), (end_lng, end_lat)])
+    url = _osrm_route_url(start_lng, start_lat, end_lng, end_lat, profile)
+    return await _cached_fetch_async(cache_key, url, lambda: _fetch_osrm_route_async(url, cache_key))
+
+async def _fetch_osrm_route_async(url: str, cache_key: str) -> Dict[str, Any]:
+    params = dict(OSRM_ROUTE_PARAMS)
     
     try:
         print(f"Making OSRM request to: {url} with params: {params}")
-        response = requests.get(url, params=params)
+        response = await provider_client.get(url, params=params)
         
         if response.status_code != 200:
             print(f"OSRM request failed with status {response.status_code}: {response.text}")
@@ -52,138 +155,244 @@ def get_osrm_route(start_lng: float, start_lat: float, end_lng: float, end_lat:
             
         data = response.json()
         
-        # Check if we got valid routes
-        if data.get("code") == "Ok" and "routes" in data and data["routes"]:
-            print(f"OSRM request successful, got {len(data['routes'])} routes")
-            
-            # Try to get alternatives if the basic query works
-            if len(data["routes"]) < 2:
-                # Try again with alternatives
-                alt_params = params.copy()
-                alt_params["alternatives"] = "true"
-                
-                try:
-                    alt_response = requests.get(url, params=alt_params)
-                    if alt_response.status_code == 200:
-                        alt_data = alt_response.json()
-                        if alt_data.get("code") == "Ok" and "routes" in alt_data and len(alt_data["routes"]) > len(data["routes"]):
-                            print(f"Got {len(alt_data['routes'])} alternative routes")
-                            data = alt_data
-                except Exception as e:
-                    print(f"Alternative routes request failed: {e}")
-            
-            return data
-        else:
+        if not _osrm_has_routes(data):
             print(f"OSRM request returned no routes: {url}")
             return None
+        print(f"OSRM request successful, got {len(data['routes'])} routes")
+        
+        # Try to get alternatives if the basic query works
+        if len(data["routes"]) < 2:
+            try:
+                alt_response = await provider_client.get(url, params={**params, "alternatives": "true"})
+                if alt_response.status_code == 200:
+                    alt_data = alt_response.json()
+                    if alt_data.get("code") == "Ok" and "routes" in alt_data and len(alt_data["routes"]) > len(data["routes"]):
+                        print(f"Got {len(alt_data['routes'])} alternative routes")
+                        data = alt_data
+            except (httpx.HTTPError, ValueError) as e:
+                print(f"Alternative routes request failed: {e}")
+        
+        provider_cache.set(cache_key, data)
+        return data
             
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, ValueError) as e:
         print(f"OSRM request failed: {e}")
         # If OSRM service fails, return None to fall back to alternative routing
         return None
 
-def get_osrm_alternatives(start_lng: float, start_lat: float, end_lng: float, end_lat: float, profile: str = "driving") -> List[Dict[str, Any]]:
-    """Try multiple approaches to get route options from OSRM with real roads."""
-    results = []
-    
-    # Try multiple profile types to get diverse routes
-    profiles_to_try = [profile]
-    
-    # Add additional profiles based on the primary profile
-    if profile == "driving":
-        profiles_to_try.extend(["car"])
-    elif profile == "cycling":
-        profiles_to_try.extend(["bike"])
-    elif profile == "walking":
-        profiles_to_try.extend(["foot"])
-    
-    # Try to get routes with the primary profile first
-    standard_result = get_osrm_route(start_lng, start_lat, end_lng, end_lat, profiles_to_try[0])
-    if standard_result and "routes" in standard_result and standard_result["routes"]:
-        results.extend(standard_result["routes"])
-    
-    # If we don't have enough routes, try alternative approaches
-    if len(results) < 2 and len(profiles_to_try) > 1:
-        # Try with alternate profile
-        alt_result = get_osrm_route(start_lng, start_lat, end_lng, end_lat, profiles_to_try[1])
-        if alt_result and "routes" in alt_result and alt_result["routes"]:
-            # Only add routes that are different
-            for route in alt_result["routes"]:
-                if not any(is_similar_route(route, existing) for existing in results):
-                    results.append(route)
-    
-    # Try using waypoints to force different routes
-    if len(results) < 2:
-        # Calculate midpoint with slight offset
-        mid_lat = (start_lat + end_lat) / 2
-        mid_lng = (start_lng + end_lng) / 2
-        
-        # Add slight offset
-        offset = 0.005  # ~500m
-        mid_lat += offset
-        mid_lng += offset
-        
-        # Format waypoint coordinates
-        waypoint_coords = f"{start_lng:.6f},{start_lat:.6f};{mid_lng:.6f},{mid_lat:.6f};{end_lng:.6f},{end_lat:.6f}"
-        waypoint_url = f"https://router.project-osrm.org/route/v1/{profiles_to_try[0]}/{waypoint_coords}"
-        
-        try:
-            print(f"Trying waypoint route: {waypoint_url}")
-            params = {"overview": "full", "geometries": "geojson"}
-            response = requests.get(waypoint_url, params=params)
-            
-            if response.status_code == 200:
-                waypoint_result = response.json()
-                if waypoint_result.get("code") == "Ok" and "routes" in waypoint_result and waypoint_result["routes"]:
-                    # Only add if this route is genuinely different
-                    new_route = waypoint_result["routes"][0]
-                    if not any(is_similar_route(new_route, existing_route) for existing_route in results):
-                        results.append(new_route)
-        except Exception as e:
-            print(f"OSRM waypoint request failed: {e}")
-    
-    # Return all unique routes found
-    return results
+async def get_osrm_multi_route_async(points: List[List[float]], profile: str = "driving") -> Dict[str, Any]:
+    """
+    One OSRM route request through all [lat, lng] points in order (one leg per consecutive pair).
+    Returns the OSRM response, or None if the provider has no route (or routing is local).
+    """
+    if ROUTING_PROVIDER == "local" or len(points) < 2:
+        return None
+    cache_key = provider_cache.make_key("osrm", profile, [(lng, lat) for lat, lng in points], {"multi": True, "continue_straight": False})
+    coord_str = ";".join(f"{lng:.6f},{lat:.6f}" for lat, lng in points)
+    url = f"{OSRM_BASE_URL}/route/v1/{profile}/{coord_str}"
+    return await _cached_fetch_async(cache_key, url, lambda: _fetch_osrm_multi_route_async(url, cache_key, points))
 
-def is_similar_route(route1: Dict[str, Any], route2: Dict[str, Any], threshold: float = 0.8) -> bool:
-    """Check if two routes are significantly similar based on their geometries."""
-    if "geometry" not in route1 or "geometry" not in route2:
-        return False
-    
-    coords1 = route1["geometry"]["coordinates"]
-    coords2 = route2["geometry"]["coordinates"]
-    
-    # If routes are very different in length, they're different routes
-    if len(coords1) == 0 or len(coords2) == 0:
-        return False
-    
-    if abs(len(coords1) - len(coords2)) / max(len(coords1), len(coords2)) > 0.5:
+async def _fetch_osrm_multi_route_async(url: str, cache_key: str, points: List[List[float]]) -> Dict[str, Any]:
+    try:
+        print(f"Making OSRM multi-waypoint request with {len(points)} points")
+        response = await provider_client.get(url, params=dict(OSRM_MULTI_ROUTE_PARAMS))
+        if response.status_code != 200:
+            print(f"OSRM multi-waypoint request failed with status {response.status_code}: {response.text}")
+            return None
+        data = response.json()
+        if not _osrm_has_routes(data) or len(data["routes"][0].get("legs", [])) != len(points) - 1:
+            print("OSRM multi-waypoint request returned no usable route")
+            return None
+        provider_cache.set(cache_key, data)
+        return data
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"OSRM multi-waypoint request failed: {e}")
+        return None
+
+async def get_osrm_table_async(points: List[List[float]], profile: str = "driving") -> np.ndarray:
+    """
+    Road distances in km between all [lat, lng] points from one OSRM table request
+    (inf where OSRM has no route), or None if the provider has no answer (or routing is local).
+    """
+    if ROUTING_PROVIDER == "local" or len(points) < 2:
+        return None
+    cache_key = provider_cache.make_key("osrm-table", profile, [(lng, lat) for lat, lng in points])
+    coord_str = ";".join(f"{lng:.6f},{lat:.6f}" for lat, lng in points)
+    url = f"{OSRM_BASE_URL}/table/v1/{profile}/{coord_str}"
+    data = await _cached_fetch_async(cache_key, url, lambda: _fetch_osrm_table_async(url, cache_key, len(points)))
+    if not data:
+        return None
+    return np.array([[np.inf if d is None else d / 1000.0 for d in row] for row in data["distances"]], dtype=float)
+
+async def _fetch_osrm_table_async(url: str, cache_key: str, n: int) -> Dict[str, Any]:
+    try:
+        print(f"Making OSRM table request with {n} points")
+        response = await provider_client.get(url, params={"annotations": "distance"})
+        if response.status_code != 200:
+            print(f"OSRM table request failed with status {response.status_code}: {response.text}")
+            return None
+        data = response.json()
+        distances = data.get("distances")
+        if data.get("code") != "Ok" or not distances or len(distances) != n or any(len(row) != n for row in distances):
+            print("OSRM table request returned no usable matrix")
+            return None
+        provider_cache.set(cache_key, data)
+        return data
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"OSRM table request failed: {e}")
+        return None
+
+def stitch_segments(segments: List[List[List[float]]]) -> List[List[float]]:
+    """Concatenate leg polylines, dropping the duplicate point at each join."""
+    road_polyline = []
+    for segment in segments:
+        if road_polyline and segment:
+            # Avoid duplicate point at join
+            road_polyline += segment[1:]
+        else:
+            road_polyline += segment
+    return road_polyline
+
+async def get_osrm_trip_legs_async(points: List[List[float]], profile: str = "driving"):
+    """
+    Road geometry for a trip through consecutive [lat, lng] points.
+    Issues a single multi-waypoint request; if that fails the legs are fetched
+    concurrently instead of one after another.
+    Returns: stitched [lat, lng] polyline, per-leg distances in km (None for a leg with no route)
+    """
+    if len(points) < 2:
+        return [], []
+    if len(points) > 2:
+        data = await get_osrm_multi_route_async(points, profile)
+        if data:
+            route = data["routes"][0]
+            return decode_polyline(route["geometry"]), [leg["distance"] / 1000.0 for leg in route["legs"]]
+    results = await asyncio.gather(*(
+        get_osrm_route_async(lng1, lat1, lng2, lat2, profile)
+        for (lat1, lng1), (lat2, lng2) in zip(points, points[1:])
+    ))
+    segments = []
+    leg_distances = []
+    for osrm_result in results:
+        if osrm_result and osrm_result.get("routes"):
+            segments.append(decode_polyline(osrm_result["routes"][0]["geometry"]))
+            leg_distances.append(osrm_result["routes"][0]["distance"] / 1000.0)
+        else:
+            leg_distances.append(None)
+    return stitch_segments(segments), leg_distances
+
+def _osrm_alternative_requests(start_lng: float, start_lat: float, end_lng: float, end_lat: float, profile: str):
+    """
+    The strategies get_osrm_alternatives_async races, in order of preference:
+    primary profile, primary with alternatives, alternate profile with alternatives,
+    and a midpoint waypoint (offset ~500m) to force a different route.
+    Returns: list of (url, params)
+    """
+    params = dict(OSRM_ROUTE_PARAMS)
+    alt_params = {**params, "alternatives": "true"}
+    url = _osrm_route_url(start_lng, start_lat, end_lng, end_lat, profile)
+    requests_to_try = [(url, params), (url, alt_params)]
+    alternate_profile = OSRM_ALTERNATE_PROFILES.get(profile)
+    if alternate_profile:
+        requests_to_try.append((_osrm_route_url(start_lng, start_lat, end_lng, end_lat, alternate_profile), alt_params))
+    offset = 0.005  # ~500m
+    mid_lat = (start_lat + end_lat) / 2 + offset
+    mid_lng = (start_lng + end_lng) / 2 + offset
+    waypoint_coords = f"{start_lng:.6f},{start_lat:.6f};{mid_lng:.6f},{mid_lat:.6f};{end_lng:.6f},{end_lat:.6f}"
+    requests_to_try.append((f"{OSRM_BASE_URL}/route/v1/{profile}/{waypoint_coords}", params))
+    return requests_to_try
+
+def _merge_alternatives(responses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Distinct routes from the strategy responses received so far, in strategy order."""
+    routes = [route for data in responses if data for route in data["routes"]]
+    shapes = [RouteShape.from_geojson(route.get("geometry")) for route in routes]
+    return [routes[i] for i in distinct_indices(shapes)]
+
+async def _osrm_fetch_async(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    cache_key = provider_cache.make_key("osrm-url", url, [], params)
+    return await _cached_fetch_async(cache_key, url, lambda: _osrm_request_async(url, params, cache_key))
+
+async def _osrm_request_async(url: str, params: Dict[str, Any], cache_key: str) -> Dict[str, Any]:
+    try:
+        response = await provider_client.get(url, params=params)
+        if response.status_code != 200:
+            print(f"OSRM request failed with status {response.status_code}: {url}")
+            return None
+        data = response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"OSRM request failed: {e}")
+        return None
+    if not _osrm_has_routes(data):
+        return None
+    provider_cache.set(cache_key, data)
+    return data
+
+async def iter_trip_legs_async(legs: List[List[List[float]]], profile: str = "driving"):
+    """
+    Road geometry for several independent legs (each a list of [lat, lng] points), fetched
+    concurrently and yielded as each one resolves.
+    Yields: (leg index, [lat, lng] polyline, road distance in km or None if no route)
+    """
+    async def fetch(i, points):
+        coords, leg_distances = await get_osrm_trip_legs_async(points, profile)
+        distance = sum(leg_distances) if leg_distances and None not in leg_distances else None
+        return i, coords, distance
+
+    tasks = [asyncio.ensure_future(fetch(i, points)) for i, points in enumerate(legs)]
+    try:
+        for next_leg in asyncio.as_completed(tasks):
+            yield await next_leg
+    finally:
+        # The consumer may stop early (e.g. the client disconnected)
+        for task in tasks:
+            task.cancel()
+
+async def get_osrm_alternatives_async(start_lng: float, start_lat: float, end_lng: float, end_lat: float, profile: str = "driving",
+                                      min_routes: int = 2, deadline_s: float = OSRM_ALTERNATIVES_DEADLINE) -> List[Dict[str, Any]]:
+    """
+    Try multiple approaches to get route options from OSRM with real roads.
+    All strategies are requested concurrently; returns as soon as min_routes distinct
+    routes are in hand (or deadline_s passes) and cancels the outstanding requests.
+    """
+    if ROUTING_PROVIDER == "local":
+        return await asyncio.to_thread(get_local_alternatives, start_lat, start_lng, end_lat, end_lng, profile, 3)
+    requests_to_try = _osrm_alternative_requests(start_lng, start_lat, end_lng, end_lat, profile)
+    responses = [None] * len(requests_to_try)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_s
+    pending = {asyncio.ensure_future(_osrm_fetch_async(url, params)): i for i, (url, params) in enumerate(requests_to_try)}
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                print("OSRM alternatives deadline reached")
+                break
+            for task in done:
+                responses[pending.pop(task)] = task.result()
+            if len(_merge_alternatives(responses)) >= min_routes:
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+    return _merge_alternatives(responses)
+
+def _osrm_route_options(routes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """OSRM routes in the shape get_ors_alternatives_async returns (OSRM steps are not requested)."""
+    return [{
+        "geometry": route["geometry"],
+        "distance": route["distance"],
+        "duration": route["duration"],
+        "segments": [],
+        "option_name": f"Route {i+1}: {'Fast (Shortest)' if i==0 else 'Alternate'}"
+    } for i, route in enumerate(routes)]
+
+def is_similar_route(route1: Dict[str, Any], route2: Dict[str, Any], threshold_km: float = SIMILARITY_THRESHOLD_KM) -> bool:
+    """Check if two routes (GeoJSON geometries) stay within threshold_km of each other along their whole length."""
+    shape1 = RouteShape.from_geojson(route1.get("geometry"))
+    shape2 = RouteShape.from_geojson(route2.get("geometry"))
+    if shape1 is None or shape2 is None:
         return False
-        
-    # Sample some points to compare
-    num_samples = min(10, min(len(coords1), len(coords2)))
-    step1 = max(1, len(coords1) // num_samples)
-    step2 = max(1, len(coords2) // num_samples)
-    
-    # Check distance between sample points
-    similar_points = 0
-    for i in range(0, num_samples):
-        idx1 = min(i * step1, len(coords1) - 1)
-        idx2 = min(i * step2, len(coords2) - 1)
-        
-        # Calculate distance between corresponding points
-        point1 = coords1[idx1]
-        point2 = coords2[idx2]
-        
-        # Haversine distance between points
-        dist = calculate_distance(point1[1], point1[0], point2[1], point2[0])
-        
-        # If points are within 200m, consider them similar
-        if dist < 0.2:
-            similar_points += 1
-    
-    similarity = similar_points / num_samples
-    return similarity > threshold
+    return shapes_similar(shape1, shape2, threshold_km)
 
 def decode_polyline(route_geometry):
     """Extract coordinates from GeoJSON geometry."""
@@ -193,11 +402,15 @@ def decode_polyline(route_geometry):
     # GeoJSON coordinates are in [lng, lat] format, we need [lat, lng] for leaflet
     return [[coord[1], coord[0]] for coord in route_geometry["coordinates"]]
 
-def get_seasonal_weather() -> Dict[str, Any]:
-    """Get realistic weather condition based on current season in Dehradun."""
-    # Get current date
-    now = datetime.datetime.now()
+def get_seasonal_weather(when: datetime.datetime = None) -> Dict[str, Any]:
+    """
+    Get realistic weather condition based on the season in Dehradun at `when` (default now).
+    The draw is seeded with the local date and hour, so like the traffic model it only
+    changes when the hour bucket does and repeated requests get the same durations.
+    """
+    now = local_time(when)
     month = now.month
+    rng = random.Random(now.strftime("%Y-%m-%d %H"))
     
     # Determine season in Dehradun
     # Winter: November to February
@@ -213,19 +426,19 @@ def get_seasonal_weather() -> Dict[str, Any]:
     # Define seasonal weather probabilities
     weather_options = {
         "winter": [
-            {"condition": "sunny", "temperature": random.randint(15, 22), "precipitation": 0, "weight": 40},
-            {"condition": "cloudy", "temperature": random.randint(10, 18), "precipitation": 10, "weight": 35},
-            {"condition": "foggy", "temperature": random.randint(5, 12), "precipitation": 0, "weight": 25}
+            {"condition": "sunny", "temperature": rng.randint(15, 22), "precipitation": 0, "weight": 40},
+            {"condition": "cloudy", "temperature": rng.randint(10, 18), "precipitation": 10, "weight": 35},
+            {"condition": "foggy", "temperature": rng.randint(5, 12), "precipitation": 0, "weight": 25}
         ],
         "summer": [
-            {"condition": "sunny", "temperature": random.randint(28, 38), "precipitation": 0, "weight": 70},
-            {"condition": "cloudy", "temperature": random.randint(25, 32), "precipitation": 10, "weight": 25},
-            {"condition": "rainy", "temperature": random.randint(23, 30), "precipitation": random.randint(20, 40), "weight": 5}
+            {"condition": "sunny", "temperature": rng.randint(28, 38), "precipitation": 0, "weight": 70},
+            {"condition": "cloudy", "temperature": rng.randint(25, 32), "precipitation": 10, "weight": 25},
+            {"condition": "rainy", "temperature": rng.randint(23, 30), "precipitation": rng.randint(20, 40), "weight": 5}
         ],
         "monsoon": [
-            {"condition": "rainy", "temperature": random.randint(24, 30), "precipitation": random.randint(40, 90), "weight": 60},
-            {"condition": "cloudy", "temperature": random.randint(22, 28), "precipitation": 20, "weight": 30},
-            {"condition": "sunny", "temperature": random.randint(26, 32), "precipitation": 0, "weight": 10}
+            {"condition": "rainy", "temperature": rng.randint(24, 30), "precipitation": rng.randint(40, 90), "weight": 60},
+            {"condition": "cloudy", "temperature": rng.randint(22, 28), "precipitation": 20, "weight": 30},
+            {"condition": "sunny", "temperature": rng.randint(26, 32), "precipitation": 0, "weight": 10}
         ]
     }
     
@@ -237,61 +450,68 @@ def get_seasonal_weather() -> Dict[str, Any]:
     # Normalize weights to probabilities
     probabilities = [w/total_weight for w in weights]
     
-    # Select weather using weighted random choice
-    selected_weather = random.choices(season_options, weights=probabilities, k=1)[0]
+    # Select weather using weighted random choice (deterministic within the hour)
+    selected_weather = rng.choices(season_options, weights=probabilities, k=1)[0]
     
     # Remove weight from result
     selected_weather.pop("weight", None)
     
     return selected_weather
 
-def get_traffic_condition(start_traffic_zone: str, end_traffic_zone: str) -> str:
-    """Determine traffic condition based on zones, time of day, and random factors."""
-    # Get current time
-    now = datetime.datetime.now()
-    hour = now.hour
-    
-    # Rush hour periods (8-10 AM and 5-7 PM typically have higher traffic)
-    is_rush_hour = (8 <= hour <= 10) or (17 <= hour <= 19)
-    is_weekend = now.weekday() >= 5  # Saturday or Sunday
-    
-    # Base traffic probabilities determined by zones
-    if start_traffic_zone == "high" or end_traffic_zone == "high":
-        base_probs = {"light": 10, "moderate": 30, "heavy": 60}
-    elif start_traffic_zone == "medium" or end_traffic_zone == "medium":
-        base_probs = {"light": 30, "moderate": 50, "heavy": 20}
-    else:
-        base_probs = {"light": 60, "moderate": 30, "heavy": 10}
-    
-    # Adjust for time factors
-    if is_rush_hour and not is_weekend:
-        # Increase heavy traffic during weekday rush hours
-        base_probs["heavy"] += 30
-        base_probs["moderate"] += 10
-        base_probs["light"] -= 40
-    elif is_weekend:
-        # Less traffic on weekends, especially in commercial areas
-        base_probs["heavy"] -= 20
-        base_probs["light"] += 20
-    
-    # Ensure probabilities are non-negative
-    for key in base_probs:
-        base_probs[key] = max(0, base_probs[key])
-    
-    # Normalize to sum to 100
-    total = sum(base_probs.values())
-    normalized_probs = {k: v/total*100 for k, v in base_probs.items()}
-    
-    # Select traffic condition based on probabilities
-    r = random.randint(1, 100)
-    cumulative = 0
-    for cond, prob in normalized_probs.items():
-        cumulative += prob
-        if r <= cumulative:
-            return cond
-    
-    # Fallback
-    return "moderate"
+def get_traffic_condition(start_traffic_zone: str, end_traffic_zone: str, when: datetime.datetime = None) -> str:
+    """Traffic level between two zones at the hour of `when` (default now), from the traffic model."""
+    return get_traffic_model().traffic_label(zone_indices([start_traffic_zone, end_traffic_zone]), when)
+
+def _adjust_travel_times(route_options: List[Dict[str, Any]], vehicle_type: str, weather: Dict[str, Any],
+                         when: datetime.datetime = None):
+    """
+    Set "duration" (and step durations) of every route option from its free-flow
+    "original_duration", the traffic model and the weather, in one pass over all options.
+    Each path vertex takes the multiplier of its nearest landmark's zone; an option uses the
+    length-weighted mean along its path and a step the multiplier at its midpoint.
+    Also labels each option's "traffic".
+    """
+    model = get_traffic_model()
+    paths = [np.asarray(option["path"], dtype=float).reshape(-1, 2) for option in route_options]
+    offsets = np.cumsum([0] + [len(path) for path in paths])
+    zones = model.zones_along(np.concatenate(paths))
+    vehicle_m = model.duration_multipliers(zones, vehicle_type, when)
+    car_m = model.duration_multipliers(zones, "car", when)
+
+    option_m = np.ones(len(paths))
+    option_car_m = np.ones(len(paths))
+    step_m = []
+    for i, path in enumerate(paths):
+        m, cm = vehicle_m[offsets[i]:offsets[i + 1]], car_m[offsets[i]:offsets[i + 1]]
+        steps = route_options[i]["steps"]
+        if len(path) == 0:
+            step_m.append(np.ones(len(steps)))
+            continue
+        along = cumulative_lengths(path)
+        seg = np.diff(along)
+        if seg.sum() > 0:
+            option_m[i] = np.average((m[:-1] + m[1:]) / 2, weights=seg)
+            option_car_m[i] = np.average((cm[:-1] + cm[1:]) / 2, weights=seg)
+        else:
+            option_m[i], option_car_m[i] = m.mean(), cm.mean()
+        step_km = np.array([step.get("distance", 0) for step in steps], dtype=float) / 1000
+        midpoints = np.cumsum(step_km) - step_km / 2
+        if step_km.sum() > 0:
+            # Provider step distances need not add up to the polyline length exactly
+            midpoints *= along[-1] / step_km.sum()
+        step_m.append(m[np.clip(np.searchsorted(along, midpoints), 0, len(path) - 1)])
+
+    weather_m = WEATHER_MULTIPLIERS.get(weather.get("condition"), 1.0)
+    durations = np.array([option["original_duration"] for option in route_options], dtype=float) * option_m * weather_m
+    all_steps = [step for option in route_options for step in option["steps"]]
+    step_durations = np.array([step.get("duration", 0) for step in all_steps], dtype=float)
+    if all_steps:
+        step_durations *= np.concatenate(step_m) * weather_m
+    for option, duration, label in zip(route_options, durations.round(2).tolist(), traffic_labels(option_car_m).tolist()):
+        option["duration"] = duration
+        option["traffic"] = label
+    for step, duration in zip(all_steps, step_durations.round(1).tolist()):
+        step["duration"] = duration
 
 def generate_realistic_road_path(start_lat: float, start_lng: float, end_lat: float, end_lng: float, num_points: int = 20) -> List[List[float]]:
     """Generate a more realistic path that simulates road-like navigation with curves and turns."""
@@ -346,9 +566,10 @@ def generate_realistic_road_path(start_lat: float, start_lng: float, end_lat: fl
     
     return path
 
-def get_ors_alternatives(start_lat, start_lng, end_lat, end_lng, profile="driving-car", alternatives=3):
-    """Get alternative routes from OpenRouteService API."""
-    url = f"https://api.openrouteservice.org/v2/directions/{profile}/geojson"
+ORS_BASE_URL = "https://api.openrouteservice.org"
+
+def _ors_alternatives_request(start_lat, start_lng, end_lat, end_lng, profile, alternatives):
+    url = f"{ORS_BASE_URL}/v2/directions/{profile}/geojson"
     headers = {"Authorization": OPENROUTESERVICE_API_KEY, "Content-Type": "application/json"}
     body = {
         "coordinates": [
@@ -362,42 +583,131 @@ def get_ors_alternatives(start_lat, start_lng, end_lat, end_lng, profile="drivin
         },
         "instructions": True
     }
+    return url, headers, body
+
+def _parse_ors_alternatives(data):
+    # Each feature is a route
+    features = data.get("features", [])
+    # Drop alternatives that retrace an earlier route
+    shapes = [RouteShape.from_geojson(feat.get("geometry")) for feat in features]
+    features = [features[i] for i in distinct_indices(shapes)]
+    routes = []
+    for i, feat in enumerate(features):
+        props = feat.get("properties", {})
+        geometry = feat.get("geometry", {})
+        routes.append({
+            "geometry": geometry,
+            "distance": props.get("summary", {}).get("distance", 0),
+            "duration": props.get("summary", {}).get("duration", 0),
+            "segments": props.get("segments", []),
+            "option_name": f"Route {i+1}: {'Fast (Shortest)' if i==0 else 'Alternate'}"
+        })
+    return routes
+
+def _ors_cache_key(start_lat, start_lng, end_lat, end_lng, profile, alternatives):
+    return provider_cache.make_key("ors", profile, [(start_lng, start_lat), (end_lng, end_lat)], {"alternatives": alternatives})
+
+async def get_ors_alternatives_async(start_lat, start_lng, end_lat, end_lng, profile="driving-car", alternatives=3):
+    """Get alternative routes from OpenRouteService API using the shared pooled provider client."""
+    cache_key = _ors_cache_key(start_lat, start_lng, end_lat, end_lng, profile, alternatives)
+    url, headers, body = _ors_alternatives_request(start_lat, start_lng, end_lat, end_lng, profile, alternatives)
+    return await _cached_fetch_async(cache_key, url, lambda: _fetch_ors_alternatives_async(url, headers, body, cache_key))
+
+async def _fetch_ors_alternatives_async(url, headers, body, cache_key):
     try:
-        resp = requests.post(url, json=body, headers=headers, timeout=15)
+        resp = await provider_client.post(url, json=body, headers=headers)
         if resp.status_code == 200:
-            data = resp.json()
-            # Each feature is a route
-            features = data.get("features", [])
-            routes = []
-            for i, feat in enumerate(features):
-                props = feat.get("properties", {})
-                geometry = feat.get("geometry", {})
-                routes.append({
-                    "geometry": geometry,
-                    "distance": props.get("summary", {}).get("distance", 0),
-                    "duration": props.get("summary", {}).get("duration", 0),
-                    "segments": props.get("segments", []),
-                    "option_name": f"Route {i+1}: {'Fast (Shortest)' if i==0 else 'Alternate'}"
-                })
+            routes = _parse_ors_alternatives(resp.json())
+            if routes:
+                provider_cache.set(cache_key, routes)
             return routes
-        else:
-            print(f"ORS error: {resp.status_code} {resp.text}")
-            return []
-    except Exception as e:
+        print(f"ORS error: {resp.status_code} {resp.text}")
+        return []
+    except (httpx.HTTPError, ValueError) as e:
         print(f"ORS request failed: {e}")
         return []
 
-def get_route(start_location: str, end_location: str, vehicle_type: str, user_weather: str = None) -> Dict[str, Any]:
-    """Calculate multiple route options between two locations using OSRM for real road-based routes.
-    
-    Args:
-        start_location: Starting location name
-        end_location: Destination location name
-        vehicle_type: Type of vehicle (car, bike, walk)
-        user_weather: Optional user-specified weather condition
+def get_local_alternatives(start_lat, start_lng, end_lat, end_lng, profile="driving-car", alternatives=3):
+    """Get routes from the in-process OSM router, in the same shape as get_ors_alternatives_async."""
+    router = get_local_router()
+    if router is None:
+        return []
+    try:
+        return router.route(start_lat, start_lng, end_lat, end_lng, profile, alternatives)
+    except Exception as e:
+        print(f"Local routing failed: {e}")
+        return []
+
+def _coordinates(location):
+    """(lat, lng) of a {lat, lng} dict, or None if missing or out of range."""
+    try:
+        lat, lng = float(location["lat"]), float(location["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+def nearest_landmarks(lat: float, lng: float, k: int = 1, max_km: float = None, locations=None) -> List[Dict[str, Any]]:
+    """
+    The k landmarks closest to (lat, lng), nearest first, from the shared spatial index.
+    Each is the landmark dict plus "distance_km"; landmarks beyond max_km are left out.
+    """
+    if locations is None:
+        locations = get_location_store()
+    idx, dists = get_location_index(locations).nearest(lat, lng, k)
+    return [{**locations[i], "distance_km": round(float(d), 4)}
+            for i, d in zip(idx.tolist(), dists.tolist()) if max_km is None or d <= max_km]
+
+def snap_to_landmark(location, max_km: float = LANDMARK_SNAP_KM, locations=None):
+    """
+    Landmark name for a landmark name, or for a {lat, lng} dict the nearest landmark within
+    max_km, so arbitrary stops can use the precomputed landmark graph.
+    Returns: (name or None, snap distance in km)
+    """
+    if not isinstance(location, dict):
+        loc = get_location_by_name(location)
+        return (loc["name"], 0.0) if loc else (None, float('inf'))
+    coords = _coordinates(location)
+    if coords is None:
+        return None, float('inf')
+    nearest = nearest_landmarks(*coords, k=1, max_km=max_km, locations=locations)
+    if not nearest:
+        return None, float('inf')
+    return nearest[0]["name"], nearest[0]["distance_km"]
+
+def nearest_road_nodes(lat: float, lng: float, k: int = 1, vehicle_type: str = "car") -> List[Dict[str, Any]]:
+    """The k local road-graph nodes usable by vehicle_type closest to (lat, lng); [] without a local road network."""
+    router = get_local_router()
+    if router is None:
+        return []
+    nodes, dists = router.nearest_nodes(lat, lng, k, PROFILE_MODES.get(PROFILE_MAP.get(vehicle_type, "driving-car"), "car"))
+    return [{"node": node, "lat": float(router.node_lat[node]), "lng": float(router.node_lng[node]),
+             "distance_km": round(d, 4)}
+            for node, d in zip(nodes.tolist(), dists.tolist())]
+
+def resolve_location(location):
     """
-    start = get_location_by_name(start_location)
-    end = get_location_by_name(end_location)
+    Landmark dict for a landmark name, or an ad-hoc location for a {lat, lng} dict
+    (traffic zone taken from the nearest landmark). None if it cannot be resolved.
+    """
+    if isinstance(location, dict):
+        coords = _coordinates(location)
+        if coords is None:
+            return None
+        lat, lng = coords
+        return {
+            "name": location.get("name") or f"{lat:.5f},{lng:.5f}",
+            "lat": lat,
+            "lng": lng,
+            "traffic_zone": nearest_landmarks(lat, lng)[0]["traffic_zone"],
+        }
+    return get_location_by_name(location)
+
+def _route_context(start_location, end_location, vehicle_type: str, user_weather: str = None):
+    """Resolve endpoints, provider profile, weather and traffic for a route request."""
+    start = resolve_location(start_location)
+    end = resolve_location(end_location)
     
     if not start or not end:
         raise ValueError("Invalid location names")
@@ -412,10 +722,74 @@ def get_route(start_location: str, end_location: str, vehicle_type: str, user_we
     
     weather = get_seasonal_weather() if not user_weather else {"condition": user_weather}
     traffic = get_traffic_condition(start["traffic_zone"], end["traffic_zone"])
+    return start, end, profile, weather, traffic
+
+async def get_route_async(start_location: str, end_location: str, vehicle_type: str, user_weather: str = None) -> Dict[str, Any]:
+    """Calculate multiple route options between two locations using real road-based routes.
     
-    # Use ORS for real alternatives
-    ors_routes = get_ors_alternatives(start["lat"], start["lng"], end["lat"], end["lng"], profile, alternatives=3)
-    
+    Args:
+        start_location: Starting location name (or a {lat, lng} dict)
+        end_location: Destination location name (or a {lat, lng} dict)
+        vehicle_type: Type of vehicle (car, bike, walk)
+        user_weather: Optional user-specified weather condition
+    """
+    start, end, profile, weather, traffic = _route_context(start_location, end_location, vehicle_type, user_weather)
+    
+    # Use the local road network first when it is the primary provider, then ORS for real alternatives
+    ors_routes = []
+    if ROUTING_PROVIDER == "local":
+        ors_routes = await asyncio.to_thread(get_local_alternatives, start["lat"], start["lng"], end["lat"], end["lng"], profile, 3)
+    if not ors_routes:
+        ors_routes = await get_ors_alternatives_async(start["lat"], start["lng"], end["lat"], end["lng"], profile, alternatives=3)
+    if not ors_routes and ROUTING_PROVIDER != "local":
+        # ORS unavailable (no key, quota, outage): race the OSRM strategies instead
+        osrm_routes = await get_osrm_alternatives_async(start["lng"], start["lat"], end["lng"], end["lat"],
+                                                        OSRM_PROFILE_MAP.get(vehicle_type, "driving"), min_routes=3)
+        ors_routes = _osrm_route_options(osrm_routes)
+    
+    return _build_route_result(start_location, end_location, start, end, vehicle_type, weather, traffic, ors_routes)
+
+def _location_key(location):
+    if isinstance(location, dict):
+        return (round(float(location["lat"]), 5), round(float(location["lng"]), 5))
+    return location
+
+async def get_routes_batch_async(pairs: List[Tuple[Any, Any]], vehicle_type: str, user_weather: str = None,
+                                 concurrency: int = ROUTE_BATCH_CONCURRENCY) -> List[Dict[str, Any]]:
+    """
+    Route many (start, end) pairs, each a landmark name or {lat, lng} dict.
+    Identical pairs are routed once and share a result; distinct pairs run concurrently,
+    at most `concurrency` at a time.
+    Returns one {"result": ...} or {"error": ...} per input pair, in input order.
+    """
+    limit = asyncio.Semaphore(max(1, concurrency))
+    unique = {}
+    keys = []
+    for start_location, end_location in pairs:
+        try:
+            key = (_location_key(start_location), _location_key(end_location))
+        except (KeyError, TypeError, ValueError):
+            key = None
+        keys.append(key)
+        if key is not None and key not in unique:
+            unique[key] = (start_location, end_location)
+
+    async def route_one(start_location, end_location):
+        async with limit:
+            try:
+                return {"result": await get_route_async(start_location, end_location, vehicle_type, user_weather)}
+            except ValueError as e:
+                return {"error": str(e)}
+            except Exception as e:
+                print(f"Batch route {start_location} -> {end_location} failed: {e}")
+                return {"error": "Failed to calculate route"}
+
+    outcomes = await asyncio.gather(*(route_one(*pair) for pair in unique.values()))
+    by_key = dict(zip(unique.keys(), outcomes))
+    return [by_key[key] if key is not None else {"error": "Invalid location"} for key in keys]
+
+def _build_route_result(start_location, end_location, start, end, vehicle_type, weather, traffic, ors_routes) -> Dict[str, Any]:
+    """Turn provider routes (or the direct-path fallback) into the get_route_async response."""
     route_options = []
     
     if ors_routes:
@@ -437,11 +811,9 @@ def get_route(start_location: str, end_location: str, vehicle_type: str, user_we
                 "option_name": route["option_name"],
                 "description": "Shortest distance" if i==0 else f"Alternate route #{i+1}",
                 "distance": round(distance, 2),
-                "duration": round(duration, 2),
                 "original_duration": round(duration, 2),
                 "path": path,
-                "steps": steps,
-                "traffic": random.choice(["light", "moderate", "heavy"])
+                "steps": steps
             })
     
     # Fallback to old logic if ORS fails
@@ -451,35 +823,19 @@ def get_route(start_location: str, end_location: str, vehicle_type: str, user_we
         # Calculate direct distance
         direct_distance = calculate_distance(start["lat"], start["lng"], end["lat"], end["lng"])
         # Approximate the distance (straight-line distance with a realistic factor)
-        fallback_distance = direct_distance * 1.3  # Typical road path is 30% longer than direct
+        fallback_distance = direct_distance * ROAD_DETOUR_FACTOR
         
         # Use simplified speed estimate based on vehicle type
-        speed_map = {"car": 35, "bike": 15, "walk": 5}
-        avg_speed = speed_map.get(vehicle_type, 30)  # km/hr
+        avg_speed = AVG_SPEED_KMH.get(vehicle_type, 30)  # km/hr
         
         # Calculate duration in minutes
         fallback_duration = (fallback_distance / avg_speed) * 60
         
-        # Apply weather and traffic adjustments
-        adjusted_duration = fallback_duration
-        if weather["condition"] == "rainy":
-            adjusted_duration *= 1.2
-        elif weather["condition"] == "snowy":
-            adjusted_duration *= 1.5
-        elif weather["condition"] == "foggy":
-            adjusted_duration *= 1.3
-        
-        if traffic == "moderate":
-            adjusted_duration *= 1.3
-        elif traffic == "heavy":
-            adjusted_duration *= 1.6
-        
         # Add a simple fallback route (with a note that it's approximate)
         route_options.append({
             "option_name": "Route 1: Direct Path",
             "description": "Approximate direct path (OSRM routing failed)",
             "distance": round(fallback_distance, 2),
-            "duration": round(adjusted_duration, 2),
             "original_duration": round(fallback_duration, 2),
             "path": fallback_path,
             "steps": [{"instruction": "direct", "distance": fallback_distance * 1000, "duration": fallback_duration * 60}]
@@ -492,6 +848,9 @@ def get_route(start_location: str, end_location: str, vehicle_type: str, user_we
     if len(route_options) > 3:
         route_options = route_options[:3]
     
+    # Traffic and weather adjustment for all options and their steps at once
+    _adjust_travel_times(route_options, vehicle_type, weather)
+    
     return {
         "start": start,
         "end": end,
@@ -624,8 +983,12 @@ def generate_basic_directions(path: List[List[float]]) -> List[Dict[str, Any]]:
     steps = []
     total_distance = 0
     
-    # Calculate initial bearing
-    prev_bearing = calculate_bearing(path[0][0], path[0][1], path[1][0], path[1][1])
+    # Segment bearings and cumulative distances for the whole path at once
+    bearings = segment_bearings(path)
+    cumulative = cumulative_lengths(path)
+    
+    # Angle difference at each interior point to detect turns
+    angle_diffs = (bearings[1:] - bearings[:-1] + 180) % 360 - 180
     
     # Start with a "depart" step
     steps.append({
@@ -636,53 +999,41 @@ def generate_basic_directions(path: List[List[float]]) -> List[Dict[str, Any]]:
     
     segment_start_idx = 0
     
-    # Process all points to detect turns
-    for i in range(1, len(path) - 1):
-        # Calculate current bearing
-        current_bearing = calculate_bearing(path[i][0], path[i][1], path[i+1][0], path[i+1][1])
+    # Only the significant turns (more than 30 degrees change) need Python-level work
+    for i in (np.flatnonzero(np.abs(angle_diffs) > 30) + 1).tolist():
+        angle_diff = float(angle_diffs[i - 1])
         
-        # Calculate the angle difference to detect turns
-        angle_diff = (current_bearing - prev_bearing + 180) % 360 - 180
+        # Distance of the segment we just completed
+        segment_distance = float(cumulative[i] - cumulative[segment_start_idx])
         
-        # Determine if this is a significant turn
-        if abs(angle_diff) > 30:  # More than 30 degrees change is a turn
-            # Calculate distance of the segment we just completed
-            segment_distance = 0
-            for j in range(segment_start_idx, i):
-                segment_distance += calculate_distance(path[j][0], path[j][1], path[j+1][0], path[j+1][1])
-            
-            # Update the previous step's distance
-            if steps:
-                steps[-1]["distance"] = segment_distance * 1000  # Convert to meters
-                # Estimate duration: assume 30 km/h average (8.33 m/s)
-                steps[-1]["duration"] = (segment_distance * 1000) / 8.33
-            
-            total_distance += segment_distance
-            
-            # Determine turn direction
-            turn_type = "straight"
-            if angle_diff > 30 and angle_diff < 150:
-                turn_type = "right"
-            elif angle_diff < -30 and angle_diff > -150:
-                turn_type = "left"
-            elif abs(angle_diff) >= 150:
-                turn_type = "uturn"
-            
-            # Add the turn and next segment
-            steps.append({
-                "instruction": turn_type,
-                "distance": 0,  # Will be updated with the next segment
-                "duration": 0    # Will be updated with the next segment
-            })
-            
-            segment_start_idx = i
+        # Update the previous step's distance
+        if steps:
+            steps[-1]["distance"] = segment_distance * 1000  # Convert to meters
+            # Estimate duration: assume 30 km/h average (8.33 m/s)
+            steps[-1]["duration"] = (segment_distance * 1000) / 8.33
+        
+        total_distance += segment_distance
         
-        prev_bearing = current_bearing
+        # Determine turn direction
+        turn_type = "straight"
+        if angle_diff > 30 and angle_diff < 150:
+            turn_type = "right"
+        elif angle_diff < -30 and angle_diff > -150:
+            turn_type = "left"
+        elif abs(angle_diff) >= 150:
+            turn_type = "uturn"
+        
+        # Add the turn and next segment
+        steps.append({
+            "instruction": turn_type,
+            "distance": 0,  # Will be updated with the next segment
+            "duration": 0    # Will be updated with the next segment
+        })
+        
+        segment_start_idx = i
     
     # Calculate distance for the last segment
-    last_segment_distance = 0
-    for j in range(segment_start_idx, len(path) - 1):
-        last_segment_distance += calculate_distance(path[j][0], path[j][1], path[j+1][0], path[j+1][1])
+    last_segment_distance = float(cumulative[-1] - cumulative[segment_start_idx])
     
     # Update the last step's distance
     if steps:
@@ -724,113 +1075,192 @@ def calculate_bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> flo
     
     return bearing_deg
 
-def optimize_multi_stop_route(locations: list, vehicle_type: str = "car") -> dict:
+PROFILE_MAP = {
+    "car": "driving-car",
+    "bike": "cycling-regular",
+    "walk": "foot-walking"
+}
+OSRM_PROFILE_MAP = {"car": "driving", "bike": "cycling", "walk": "walking"}
+
+async def road_distance_matrix_async(points: List[List[float]], profile: str = "driving") -> np.ndarray:
     """
-    Use OpenRouteService optimization endpoint to solve the TSP for delivery stops.
-    locations: list of dicts with 'lat' and 'lng' keys
-    vehicle_type: 'car', 'bike', or 'walk'
-    Returns dict with optimized order, route geometry, and total distance/duration.
+    Road distance matrix in km between [lat, lng] points from one OSRM table request.
+    Without a provider answer (or for pairs it cannot route) the straight-line distance
+    times ROAD_DETOUR_FACTOR stands in.
     """
-    profile_map = {
-        "car": "driving-car",
-        "bike": "cycling-regular",
-        "walk": "foot-walking"
-    }
-    profile = profile_map.get(vehicle_type, "driving-car")
-    url = "https://api.openrouteservice.org/optimization"
-    headers = {"Authorization": OPENROUTESERVICE_API_KEY, "Content-Type": "application/json"}
+    estimate = distance_matrix(points) * ROAD_DETOUR_FACTOR
+    road = await get_osrm_table_async(points, profile)
+    if road is None:
+        return estimate
+    return np.where(np.isfinite(road), road, estimate)
 
-    # Build jobs (stops) and single vehicle
-    jobs = []
-    for idx, loc in enumerate(locations):
-        jobs.append({
-            "id": idx + 1,
-            "service": 300,  # seconds spent at each stop (arbitrary)
-            "location": [loc["lng"], loc["lat"]]
-        })
-    vehicle = {
-        "id": 1,
-        "profile": profile,
-        "start": [locations[0]["lng"], locations[0]["lat"]],
-        "end": [locations[0]["lng"], locations[0]["lat"]],  # round trip
+def _local_optimized_order(locations: list, matrix: np.ndarray, round_trip: bool = True) -> list:
+    """
+    Order stops with the local TSP solver over a distance matrix between them.
+    The tour starts at locations[0]; round trips end there again.
+    Returns: ordered [lng, lat] pairs
+    """
+    order, _ = solve_tsp(matrix, round_trip=round_trip)
+    ordered_coords = [[locations[i]["lng"], locations[i]["lat"]] for i in order]
+    if round_trip:
+        ordered_coords.append(ordered_coords[0])
+    return ordered_coords
+
+def _directions_request(profile: str, ordered_coords: list):
+    # ORS directions expects [lng, lat] pairs
+    directions_url = f"{ORS_BASE_URL}/v2/directions/{profile}"
+    directions_headers = {"Authorization": OPENROUTESERVICE_API_KEY}
+    directions_body = {
+        "coordinates": ordered_coords
     }
-    body = {
-        "jobs": jobs,
-        "vehicles": [vehicle]
+    return directions_url, directions_headers, directions_body
+
+def _optimized_result(dir_data: dict, ordered_coords: list) -> dict:
+    # ORS returns geometry as encoded polyline string, decode to coordinates
+    geometry = dir_data["routes"][0]["geometry"]
+    coordinates = polyline.decode(geometry)
+    # Return geometry and summary in the expected format
+    return {
+        "routes": [
+            {
+                "geometry": {"coordinates": [[lat, lng] for lat, lng in coordinates]},
+                "summary": dir_data["routes"][0]["summary"]
+            }
+        ],
+        "ordered_stops": [
+            {"lat": lat, "lng": lng} for lng, lat in ordered_coords
+        ]
     }
+
+async def optimize_multi_stop_route_async(locations: list, vehicle_type: str = "car", round_trip: bool = True) -> dict:
+    """
+    Solve the TSP for delivery stops locally over road distances (one OSRM table request, straight-line
+    estimates without it), then fetch road geometry for the tour from OpenRouteService.
+    locations: list of dicts with 'lat' and 'lng' keys
+    vehicle_type: 'car', 'bike', or 'walk'
+    round_trip: return to locations[0] at the end (otherwise the tour ends at the last stop)
+    Returns dict with optimized order, route geometry, and total distance/duration.
+    """
+    profile = PROFILE_MAP.get(vehicle_type, "driving-car")
     try:
-        resp = requests.post(url, json=body, headers=headers, timeout=20)
-        if resp.status_code != 200:
-            print(f"ORS optimization error: {resp.status_code} {resp.text}")
-            return {"error": resp.text}
-        data = resp.json()
-        # Parse the optimized order
-        if not data.get("routes") or not data.get("jobs"):
-            print(f"ORS optimization missing routes/jobs: {data}")
-            return {"error": "ORS optimization did not return routes/jobs"}
-        route = data["routes"][0]
-        steps = route["steps"]
-        # Map job ids to locations
-        id_to_loc = {j["id"]: j["location"] for j in data["jobs"]}
-        ordered_coords = [id_to_loc[step["job"]] for step in steps if "job" in step]
-        # Add start/end if not present
-        if ordered_coords[0] != vehicle["start"]:
-            ordered_coords = [vehicle["start"]] + ordered_coords
-        if ordered_coords[-1] != vehicle["end"]:
-            ordered_coords = ordered_coords + [vehicle["end"]]
-        # ORS directions expects [lng, lat] pairs
-        coords_str = "|".join([f"{lng},{lat}" for lng, lat in ordered_coords])
-        directions_url = f"https://api.openrouteservice.org/v2/directions/{profile}"
-        directions_headers = {"Authorization": OPENROUTESERVICE_API_KEY}
-        directions_body = {
-            "coordinates": ordered_coords
-        }
-        dir_resp = requests.post(directions_url, json=directions_body, headers=directions_headers, timeout=20)
+        matrix = await road_distance_matrix_async([[loc["lat"], loc["lng"]] for loc in locations],
+                                                  OSRM_PROFILE_MAP.get(vehicle_type, "driving"))
+        ordered_coords = _local_optimized_order(locations, matrix, round_trip)
+        directions_url, directions_headers, directions_body = _directions_request(profile, ordered_coords)
+        dir_resp = await provider_client.post(directions_url, json=directions_body, headers=directions_headers)
         if dir_resp.status_code != 200:
             print(f"ORS directions error: {dir_resp.status_code} {dir_resp.text}")
             return {"error": dir_resp.text}
-        dir_data = dir_resp.json()
-        # ORS returns geometry as encoded polyline string, decode to coordinates
-        geometry = dir_data["routes"][0]["geometry"]
-        coordinates = polyline.decode(geometry)
-        # Return geometry and summary in the expected format
-        return {
-            "routes": [
-                {
-                    "geometry": {"coordinates": [[lat, lng] for lat, lng in coordinates]},
-                    "summary": dir_data["routes"][0]["summary"]
-                }
-            ],
-            "ordered_stops": [
-                {"lat": lat, "lng": lng} for lng, lat in ordered_coords
-            ]
-        }
+        return _optimized_result(dir_resp.json(), ordered_coords)
     except Exception as e:
         import traceback
         print(f"ORS optimization request failed: {e}")
         traceback.print_exc()
         return {"error": str(e)}
 
+def _fleet_point(point, default):
+    if point is None:
+        return default
+    return [point["lat"], point["lng"]]
+
+async def optimize_fleet_routes_async(locations: list, vehicles: list, vehicle_type: str = "car",
+                                      round_trip: bool = True, time_budget_s: float = VRP_TIME_BUDGET_S,
+                                      depart_at: datetime.datetime = None) -> dict:
+    """
+    Multi-vehicle routing (VRP) for delivery stops, solved locally over a travel-time matrix.
+    locations: list of dicts with 'lat' and 'lng'; locations[0] is the depot. Other stops may set
+               'demand', 'service_time' (seconds, default DEFAULT_SERVICE_S) and
+               'time_window' ([earliest, latest] seconds from dispatch start)
+    vehicles: list of dicts, all keys optional: 'id', 'capacity', 'start'/'end' ({lat, lng},
+              default the depot; round_trip=False lets routes end at their last stop),
+              'shift' ([start, end] seconds)
+    depart_at: dispatch time, for the traffic on the roads (default now)
+    Returns dict with one route per vehicle (ordered stops, arrivals, load, road geometry) and
+    the stops that could not be served.
+    """
+    depot = [locations[0]["lat"], locations[0]["lng"]]
+    points = [[loc["lat"], loc["lng"]] for loc in locations]
+    fleet = []
+    for v in vehicles:
+        start = _fleet_point(v.get("start"), depot)
+        end = _fleet_point(v.get("end"), depot if round_trip else None)
+        points.append(start)
+        start_node = len(points) - 1
+        end_node = None
+        if end is not None:
+            points.append(end)
+            end_node = len(points) - 1
+        fleet.append({"start": start_node, "end": end_node, "capacity": v.get("capacity"), "shift": v.get("shift")})
+    stops = [{
+        "node": i,
+        "demand": loc.get("demand", 0),
+        "service_s": loc.get("service_time", DEFAULT_SERVICE_S),
+        "window": loc.get("time_window"),
+    } for i, loc in enumerate(locations) if i > 0]
+    # Road distance/time estimated from straight-line distance, as in the get_route_async fallback,
+    # with the traffic multipliers of the dispatch hour (mean of the two endpoint zones)
+    distances = distance_matrix(points) * ROAD_DETOUR_FACTOR
+    model = get_traffic_model()
+    point_m = model.duration_multipliers(model.zones_along(points), vehicle_type, depart_at)
+    durations = distances / AVG_SPEED_KMH.get(vehicle_type, 30) * 3600 * ((point_m[:, None] + point_m[None, :]) / 2)
+    plan = await asyncio.to_thread(solve_vrp, durations, stops, fleet, distances, time_budget_s)
+
+    visits = []
+    for route, f in zip(plan["routes"], fleet):
+        visit = []
+        if route["stops"]:
+            visit = [points[f["start"]]] + [points[stops[s]["node"]] for s in route["stops"]]
+            if f["end"] is not None:
+                visit.append(points[f["end"]])
+        visits.append(visit)
+    # Road geometry for all vehicles is fetched concurrently
+    osrm_profile = OSRM_PROFILE_MAP.get(vehicle_type, "driving")
+    geometries = await asyncio.gather(*(get_osrm_trip_legs_async(visit, osrm_profile) for visit in visits))
+
+    routes = []
+    for route, v, visit, (road_coords, _) in zip(plan["routes"], vehicles, visits, geometries):
+        routes.append({
+            "vehicle_id": v.get("id", route["vehicle"] + 1),
+            "ordered_stops": [
+                {"index": stops[s]["node"], "lat": points[stops[s]["node"]][0], "lng": points[stops[s]["node"]][1],
+                 "arrival": round(t, 1)}
+                for s, t in zip(route["stops"], route["arrivals"])
+            ],
+            "load": route["load"],
+            "geometry": {"coordinates": road_coords or visit},
+            "summary": {"distance": route["distance_km"] * 1000, "duration": route["duration_s"]},
+        })
+    return {
+        "routes": routes,
+        "unassigned": [{"index": stops[s]["node"], "lat": locations[stops[s]["node"]]["lat"],
+                        "lng": locations[stops[s]["node"]]["lng"]} for s in plan["unassigned"]],
+        "summary": {
+            "distance": sum(r["summary"]["distance"] for r in routes),
+            "duration": sum(r["summary"]["duration"] for r in routes),
+        },
+    }
+
 # --- DAA Graph Algorithms: Floyd-Warshall Only ---
 
 def build_landmark_graph(locations=None, max_edge_km=2.5):
     """
     Build an adjacency list graph from Dehradun landmarks.
-    Edges are created between landmarks within max_edge_km (default 2.5km).
+    Edges are created between landmarks within max_edge_km (default 2.5km),
+    found with radius queries on the shared spatial index.
     Returns: dict {name: [(neighbor_name, distance_km), ...]}
     """
     if locations is None:
-        from .locations import DEHRADUN_LOCATIONS
-        locations = DEHRADUN_LOCATIONS
+        locations = get_location_store()
+    index = get_location_index(locations)
     graph = {}
     for loc in locations:
         graph[loc['name']] = []
-        for other in locations:
+        neighbours, dists = index.query_radius(loc['lat'], loc['lng'], max_edge_km)
+        for j, dist in zip(neighbours, dists):
+            other = locations[j]
             if loc['name'] == other['name']:
                 continue
-            dist = calculate_distance(loc['lat'], loc['lng'], other['lat'], other['lng'])
-            if dist <= max_edge_km:
-                graph[loc['name']].append((other['name'], dist))
+            graph[loc['name']].append((other['name'], float(dist)))
     return graph
 
 
@@ -870,28 +1300,264 @@ def reconstruct_fw_path(next_hop, start, end):
 
 
 def get_landmark_coords(name, locations=None):
-    if locations is None:
-        from .locations import DEHRADUN_LOCATIONS
-        locations = DEHRADUN_LOCATIONS
-    for loc in locations:
-        if loc['name'] == name:
-            return loc['lat'], loc['lng']
-    return None, None
+    loc = get_name_index(locations).get(name)
+    if loc is None:
+        return None, None
+    return loc['lat'], loc['lng']
+
+
+# Process-wide FW engine, rebuilt only when max_edge_km changes and updated incrementally
+# when the location set does.
+# Graph caches are keyed on the location list object itself (the location store is replaced,
+# never modified, on reload), so a reload invalidates them without hashing every location.
+FW_MAX_EDGE_KM = 12
+_fw_engine = None
+_fw_engine_key = None
+_fw_engine_lock = threading.Lock()
+
+
+def _current_locations(locations=None):
+    return get_location_store() if locations is None else locations
+
+
+def get_fw_engine(locations=None, max_edge_km=FW_MAX_EDGE_KM):
+    """
+    Return the shared FloydWarshallEngine for the given locations and edge limit.
+    """
+    global _fw_engine, _fw_engine_key
+    locations = _current_locations(locations)
+    with _fw_engine_lock:
+        if _fw_engine is None or _fw_engine_key[0] is not locations or _fw_engine_key[1] != max_edge_km:
+            graph = build_landmark_graph(locations, max_edge_km=max_edge_km)
+            if _fw_engine is not None and _fw_engine_key[1] == max_edge_km:
+                # Location set reloaded: patch the previous matrices instead of an O(n^3) rebuild
+                _fw_engine = _fw_engine.updated(graph, locations)
+            else:
+                _fw_engine = FloydWarshallEngine(graph, locations, max_edge_km)
+            _fw_engine_key = (locations, max_edge_km)
+        return _fw_engine
 
 
 def route_with_floyd_warshall(start_name, end_name, fw_cache=None, locations=None):
     """
     Find shortest path using Floyd-Warshall (optionally with precomputed cache).
+    Without fw_cache the shared precomputed engine is used.
     Returns: path (list of [lat, lng]), total distance (km)
     """
     if fw_cache is None:
         # Increase max_edge_km to 12 for a much more connected graph
-        graph = build_landmark_graph(locations, max_edge_km=12)
-        dist, next_hop = floyd_warshall(graph)
-    else:
-        dist, next_hop = fw_cache
+        engine = get_fw_engine(locations, max_edge_km=FW_MAX_EDGE_KM)
+        return engine.path_coords(start_name, end_name), engine.distance(start_name, end_name)
+    dist, next_hop = fw_cache
     path_names = reconstruct_fw_path(next_hop, start_name, end_name)
     path_coords = [get_landmark_coords(n, locations) for n in path_names]
     return path_coords, dist[start_name][end_name]
 
+
+# Pluggable shortest-path backends for landmark routing, selectable per call
+SHORTEST_PATH_ALGORITHMS = ("floyd_warshall", "dijkstra", "astar", "ch")
+_path_backends = {}
+_path_backends_lock = threading.Lock()
+
+
+def build_shortest_path_backend(algorithm, locations, max_edge_km=FW_MAX_EDGE_KM):
+    """New (unshared) shortest-path backend over the landmark graph of locations."""
+    if algorithm not in SHORTEST_PATH_ALGORITHMS:
+        raise ValueError(f"Unknown shortest-path algorithm: {algorithm}")
+    graph = build_landmark_graph(locations, max_edge_km=max_edge_km)
+    if algorithm == "floyd_warshall":
+        return FloydWarshallEngine(graph, locations, max_edge_km)
+    if algorithm == "dijkstra":
+        return DijkstraBackend(graph)
+    if algorithm == "astar":
+        coords = {loc['name']: (loc['lat'], loc['lng']) for loc in locations}
+        # Straight-line distance never exceeds the graph distance, so it is admissible
+        return AStarBackend(graph, lambda a, b: calculate_distance(*coords[a], *coords[b]))
+    return ContractionHierarchyBackend(graph)
+
+
+def get_shortest_path_backend(algorithm="floyd_warshall", locations=None, max_edge_km=FW_MAX_EDGE_KM):
+    """
+    Return a shared backend exposing shortest_path(start, end) -> (names, km).
+    floyd_warshall uses the precomputed all-pairs engine; dijkstra and astar search
+    on demand; ch preprocesses a contraction hierarchy once per location set.
+    """
+    if algorithm not in SHORTEST_PATH_ALGORITHMS:
+        raise ValueError(f"Unknown shortest-path algorithm: {algorithm}")
+    if algorithm == "floyd_warshall":
+        return get_fw_engine(locations, max_edge_km)
+    locations = _current_locations(locations)
+    key = (algorithm, id(locations), max_edge_km)
+    with _path_backends_lock:
+        cached = _path_backends.get(key)
+        backend = cached[1] if cached is not None and cached[0] is locations else None
+        if backend is None:
+            backend = build_shortest_path_backend(algorithm, locations, max_edge_km)
+            # Only the backends for the current location set are kept
+            for stale in [k for k, (locs, _) in _path_backends.items() if k[1:] != key[1:] or locs is not locations]:
+                del _path_backends[stale]
+            _path_backends[key] = (locations, backend)
+        return backend
+
+
+def _require_landmarks(names, locations=None):
+    """Raise ValueError unless every name is exactly a landmark name (backends index on exact names)."""
+    index = get_name_index(_current_locations(locations))
+    for name in names:
+        loc = index.get(name)
+        if loc is None or loc["name"] != name:
+            raise ValueError(f"Unknown landmark: {name}")
+
+def route_landmarks(start_name, end_name, algorithm="floyd_warshall", locations=None):
+    """
+    Shortest landmark path with the selected backend.
+    Returns: path (list of [lat, lng]), total distance (km)
+    Raises ValueError for a name that is not a landmark.
+    """
+    _require_landmarks((start_name, end_name), locations)
+    if algorithm == "floyd_warshall":
+        return route_with_floyd_warshall(start_name, end_name, locations=locations)
+    backend = get_shortest_path_backend(algorithm, locations)
+    path_names, dist = backend.shortest_path(start_name, end_name)
+    return [get_landmark_coords(n, locations) for n in path_names], dist
+
+_td_graphs = {}
+_td_graphs_lock = threading.Lock()
+
+
+def get_time_dependent_graph(vehicle_type="car", locations=None, max_edge_km=FW_MAX_EDGE_KM):
+    """Shared TimeDependentGraph over the landmark graph for a vehicle type (one of VEHICLES)."""
+    if vehicle_type not in VEHICLES:
+        raise ValueError(f"Unknown vehicle type: {vehicle_type}")
+    locations = _current_locations(locations)
+    key = (vehicle_type, id(locations), max_edge_km)
+    with _td_graphs_lock:
+        cached = _td_graphs.get(key)
+        td_graph = cached[1] if cached is not None and cached[0] is locations else None
+        if td_graph is None:
+            graph = build_landmark_graph(locations, max_edge_km=max_edge_km)
+            td_graph = TimeDependentGraph(graph, locations, vehicle_type, AVG_SPEED_KMH.get(vehicle_type, 30),
+                                          ROAD_DETOUR_FACTOR)
+            for stale in [k for k, (locs, _) in _td_graphs.items() if k[1:] != key[1:] or locs is not locations]:
+                del _td_graphs[stale]
+            _td_graphs[key] = (locations, td_graph)
+        return td_graph
+
+
+def route_landmarks_at(start_name, end_name, depart_at, vehicle_type="car", locations=None):
+    """
+    Fastest landmark path when leaving at depart_at, with rush-hour aware edge times.
+    Returns: path (list of [lat, lng]), total distance (km), travel time (minutes)
+    Raises ValueError for a name that is not a landmark.
+    """
+    _require_landmarks((start_name, end_name), locations)
+    path_names, dist, minutes = get_time_dependent_graph(vehicle_type, locations).shortest_path(start_name, end_name, depart_at)
+    return [get_landmark_coords(n, locations) for n in path_names], dist, minutes
+
+def get_isochrone(origin, vehicle_type="car", minutes=15.0, depart_at=None, locations=None):
+    """
+    Landmarks reachable from origin (landmark name or {lat, lng}) within `minutes`, with an
+    approximate reachability polygon, from the landmark travel-time matrix of the departure hour.
+    An ad-hoc origin reaches the graph over a straight-line leg to any landmark within the
+    graph's edge limit. Returns None if origin cannot be resolved.
+    """
+    locations = _current_locations(locations)
+    start = resolve_location(origin)
+    if start is None:
+        return None
+    # Default now and offset-aware departures are read in SERVICE_TIMEZONE, like hour_of_week does
+    depart_at = local_time(depart_at)
+    td_graph = get_time_dependent_graph(vehicle_type, locations)
+    matrix = td_graph.bucket_matrix(hour_of_week(depart_at))
+    model = get_traffic_model()
+    landmark_m = model.duration_multipliers(td_graph.zones, vehicle_type, depart_at)
+    origin_m = float(model.duration_multipliers(model.zones_along([[start["lat"], start["lng"]]]), vehicle_type, depart_at)[0])
+    if start["name"] in td_graph.index:
+        times = matrix[td_graph.index[start["name"]]]
+    else:
+        access_km = distance_matrix([[start["lat"], start["lng"]]], td_graph.coords)[0]
+        access = access_km * td_graph.minutes_per_km * (origin_m + landmark_m) / 2
+        access[access_km > FW_MAX_EDGE_KM] = np.inf
+        times = (access[:, None] + matrix).min(axis=0)
+
+    reached = np.flatnonzero(times <= minutes)
+    reached = reached[np.argsort(times[reached], kind="stable")]
+    # Leftover time at each reached point, as straight-line km at that zone's speed
+    radii = (minutes - times[reached]) / (td_graph.minutes_per_km * landmark_m[reached])
+    polygon = reachability_polygon([start["lat"], start["lng"]],
+                                   np.vstack([[start["lat"], start["lng"]], td_graph.coords[reached]]),
+                                   np.r_[minutes / (td_graph.minutes_per_km * origin_m), radii])
+    return {
+        "origin": start,
+        "vehicle_type": vehicle_type,
+        "minutes": minutes,
+        "depart_at": depart_at,
+        "reachable": [
+            {"name": td_graph.names[i], "lat": float(td_graph.coords[i, 0]), "lng": float(td_graph.coords[i, 1]),
+             "minutes": round(float(times[i]), 2)}
+            for i in reached if td_graph.names[i] != start["name"]
+        ],
+        "polygon": polygon,
+    }
+
+def landmark_distance_matrix(names, algorithm="floyd_warshall", locations=None):
+    """Shortest-path distances (km) between the given landmarks, as an n x n array."""
+    backend = get_shortest_path_backend(algorithm, locations)
+    if algorithm == "floyd_warshall":
+        idx = [backend.index[n] for n in names]
+        return backend.dist[np.ix_(idx, idx)]
+    matrix = np.zeros((len(names), len(names)))
+    for i, a in enumerate(names):
+        for j, b in enumerate(names):
+            if i != j:
+                matrix[i, j] = backend.shortest_path(a, b)[1]
+    return matrix
+
+
+def plan_landmark_tour(stop_names, algorithm="floyd_warshall", round_trip=False, locations=None,
+                       depart_at=None, vehicle_type="car"):
+    """
+    Visit order for stop_names[0] followed by the remaining stops, solved with the local TSP solver.
+    With depart_at the tour minimises travel time instead of distance: stops are ordered on the
+    travel-time matrix for the departure hour and each leg is the fastest path at the time it starts.
+    Returns: order (names), legs [(from, to, path names, km), ...]
+    Raises ValueError for a name that is not a landmark.
+    """
+    locations = _current_locations(locations)
+    _require_landmarks(stop_names, locations)
+    if depart_at is None:
+        matrix = landmark_distance_matrix(stop_names, algorithm, locations)
+        shortest_path = get_shortest_path_backend(algorithm, locations).shortest_path
+    else:
+        td_graph = get_time_dependent_graph(vehicle_type, locations)
+        matrix = td_graph.travel_time_matrix(stop_names, depart_at)
+    order_idx, _ = solve_tsp(matrix, round_trip=round_trip)
+    order = [stop_names[i] for i in order_idx]
+    visits = order + [order[0]] if round_trip else order
+    legs = []
+    t = depart_at
+    for a, b in zip(visits, visits[1:]):
+        if depart_at is None:
+            path_names, dist = shortest_path(a, b)
+        else:
+            path_names, dist, minutes = td_graph.shortest_path(a, b, t)
+            if path_names:
+                t += datetime.timedelta(minutes=minutes)
+        legs.append((a, b, path_names, dist))
+    return order, legs
+
+
+def tour_schedule(legs, depart_at, vehicle_type="car", locations=None):
+    """Departure and arrival time of each leg of a landmark tour leaving at depart_at."""
+    td_graph = get_time_dependent_graph(vehicle_type, locations)
+    schedule = []
+    t = depart_at
+    for a, b, path_names, _ in legs:
+        arrive = t + datetime.timedelta(seconds=round(td_graph.path_minutes(path_names, t) * 60)) if path_names else None
+        schedule.append({"from": a, "to": b, "depart_at": t, "arrive_at": arrive})
+        if arrive is None:
+            break
+        t = arrive
+    return schedule
+
 # --- End DAA Graph Algorithms ---
\ No newline at end of file
@@ -0,0 +1,106 @@
+from typing import List, Optional
+import numpy as np
+from .geo import cumulative_lengths, distance_matrix
+from .spatial_index import KM_PER_DEG_LAT
+
+# Geometric similarity between route polylines, used to drop near-duplicate alternatives.
+# Polylines are resampled to SAMPLE_POINTS points at equal arc length, so two routes are
+# compared along their whole course rather than at index-aligned vertices. Distances
+# (km) are discrete Frechet or Hausdorff over the samples; a bounding-box check rejects
+# clearly different routes before any pairwise work. Coordinates are [lat, lng].
+
+SAMPLE_POINTS = 32
+SIMILARITY_THRESHOLD_KM = 0.2
+MAX_LENGTH_RATIO = 1.5  # routes whose lengths differ more than this are never similar
+
+
+def resample(coords, n: int = SAMPLE_POINTS) -> np.ndarray:
+    """n points spaced equally along the polyline, including both ends."""
+    c = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if len(c) == 1:
+        return np.repeat(c, n, axis=0)
+    s = cumulative_lengths(c)
+    if s[-1] <= 0:
+        return np.repeat(c[:1], n, axis=0)
+    targets = np.linspace(0.0, s[-1], n)
+    return np.column_stack([np.interp(targets, s, c[:, 0]), np.interp(targets, s, c[:, 1])])
+
+
+class RouteShape:
+    """Resampled points, length and bounding box of one polyline, computed once per route."""
+
+    __slots__ = ("points", "length_km", "bbox")
+
+    def __init__(self, coords, n: int = SAMPLE_POINTS):
+        c = np.asarray(coords, dtype=float).reshape(-1, 2)
+        self.points = resample(c, n)
+        self.length_km = float(cumulative_lengths(c)[-1]) if len(c) > 1 else 0.0
+        self.bbox = np.concatenate([c.min(axis=0), c.max(axis=0)])  # min_lat, min_lng, max_lat, max_lng
+
+    @classmethod
+    def from_geojson(cls, geometry: dict, n: int = SAMPLE_POINTS) -> Optional["RouteShape"]:
+        """Shape of a GeoJSON LineString ([lng, lat] pairs); None if it has no coordinates."""
+        coords = (geometry or {}).get("coordinates") or []
+        if not coords:
+            return None
+        return cls([[pt[1], pt[0]] for pt in coords], n)
+
+
+def bbox_gap_km(a: RouteShape, b: RouteShape) -> float:
+    """
+    Lower bound on the Hausdorff (and so Frechet) distance: how far either bounding box
+    sticks out of the other.
+    """
+    lng_scale = KM_PER_DEG_LAT * np.cos(np.radians((a.bbox[0] + a.bbox[2]) / 2))
+    gap = np.abs(a.bbox - b.bbox).reshape(2, 2).max(axis=0) * [KM_PER_DEG_LAT, lng_scale]
+    return float(gap.max())
+
+
+def hausdorff_distance(a, b) -> float:
+    """Symmetric Hausdorff distance (km) between two point sets."""
+    d = distance_matrix(a, b)
+    return float(max(d.min(axis=1).max(), d.min(axis=0).max()))
+
+
+def frechet_distance(a, b) -> float:
+    """Discrete Frechet distance (km) between two polylines, evaluated one anti-diagonal at a time."""
+    d = distance_matrix(a, b)
+    n, m = d.shape
+    ca = np.full((n, m), np.inf)
+    for k in range(n + m - 1):
+        i = np.arange(max(0, k - m + 1), min(n, k + 1))
+        j = k - i
+        if k == 0:
+            ca[0, 0] = d[0, 0]
+            continue
+        prev = np.full(len(i), np.inf)
+        has_up, has_left = i > 0, j > 0
+        prev[has_up] = ca[i[has_up] - 1, j[has_up]]
+        prev[has_left] = np.minimum(prev[has_left], ca[i[has_left], j[has_left] - 1])
+        diag = has_up & has_left
+        prev[diag] = np.minimum(prev[diag], ca[i[diag] - 1, j[diag] - 1])
+        ca[i, j] = np.maximum(prev, d[i, j])
+    return float(ca[-1, -1])
+
+
+def shapes_similar(a: RouteShape, b: RouteShape, threshold_km: float = SIMILARITY_THRESHOLD_KM,
+                   metric: str = "frechet") -> bool:
+    """True if the routes stay within threshold_km of each other (Frechet or Hausdorff)."""
+    longer, shorter = max(a.length_km, b.length_km), min(a.length_km, b.length_km)
+    if shorter > 0 and longer / shorter > MAX_LENGTH_RATIO:
+        return False
+    if bbox_gap_km(a, b) > threshold_km:
+        return False
+    measure = hausdorff_distance if metric == "hausdorff" else frechet_distance
+    return measure(a.points, b.points) <= threshold_km
+
+
+def distinct_indices(shapes: List[Optional[RouteShape]], threshold_km: float = SIMILARITY_THRESHOLD_KM,
+                     metric: str = "frechet") -> List[int]:
+    """Indexes of the shapes kept when each is dropped if similar to an earlier kept one."""
+    kept = []
+    for i, shape in enumerate(shapes):
+        if shape is None or not any(shapes_similar(shape, shapes[k], threshold_km, metric)
+                                    for k in kept if shapes[k] is not None):
+            kept.append(i)
+    return kept
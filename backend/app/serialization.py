@@ -0,0 +1,106 @@
+from typing import Any, AsyncIterator, Dict
+import datetime
+import json
+import math
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+# Response encoding for the route endpoints. Handlers return these Response objects
+# directly, so FastAPI skips its jsonable_encoder pass over the (large) payloads.
+# JSON is encoded with orjson when installed; clients sending
+# "Accept: application/msgpack" get MessagePack instead. Incremental results are
+# streamed as NDJSON or server-sent events.
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def _default(obj: Any) -> Any:
+    """Types the encoders do not handle natively (numpy values, datetimes)."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _json_safe(obj: Any) -> Any:
+    """Copy of obj with NaN / infinity replaced by None, as orjson writes them (null)."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_safe(v) for v in obj]
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return _json_safe(_default(obj))
+    return obj
+
+
+def dumps_json(content: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    # The stdlib would write Infinity / NaN, which is not valid JSON
+    return json.dumps(_json_safe(content), default=_default, separators=(",", ":"), allow_nan=False).encode()
+
+
+def dumps_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, default=_default, use_bin_type=True)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_msgpack(content)
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "").lower()
+    return MSGPACK_AVAILABLE and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def negotiated_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """MessagePack if the client asked for it (and msgpack is installed), otherwise fast JSON."""
+    response_class = MsgPackResponse if wants_msgpack(request) else FastJSONResponse
+    return response_class(content, status_code=status_code, headers={"Vary": "Accept"})
+
+
+async def _framed(records: AsyncIterator[Dict[str, Any]], stream_format: str) -> AsyncIterator[bytes]:
+    async for record in records:
+        if stream_format == "sse":
+            yield b"event: " + record["type"].encode() + b"\ndata: " + dumps_json(record) + b"\n\n"
+        else:
+            yield dumps_json(record) + b"\n"
+
+
+def streaming_response(records: AsyncIterator[Dict[str, Any]], stream_format: str = "ndjson") -> StreamingResponse:
+    """
+    Stream dict records as they are produced: one JSON object per line (ndjson) or one
+    server-sent event per record, named after its "type" (sse).
+    """
+    return StreamingResponse(_framed(records, stream_format), media_type=STREAM_FORMATS[stream_format],
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,237 @@
+from typing import List, Dict, Tuple, Callable, Optional
+import heapq
+
+# Backends for single source->target queries on a landmark graph
+# ({name: [(neighbor_name, weight), ...]}, as built by build_landmark_graph).
+# Each backend exposes shortest_path(start, end) -> (path names, distance),
+# returning ([], inf) when end is unreachable.
+
+INF = float('inf')
+
+
+def _unwind(prev: Dict[str, Optional[str]], end: str) -> List[str]:
+    path = [end]
+    while prev[path[-1]] is not None:
+        path.append(prev[path[-1]])
+    path.reverse()
+    return path
+
+
+def dijkstra(graph, start: str, end: Optional[str] = None) -> Tuple[Dict[str, float], Dict[str, Optional[str]]]:
+    """
+    Heap-based Dijkstra from start. Stops early once end is settled.
+    Returns: dist, prev dicts for the settled part of the graph.
+    """
+    dist = {start: 0.0}
+    prev = {start: None}
+    settled = set()
+    heap = [(0.0, start)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        if u == end:
+            break
+        for v, w in graph.get(u, ()):
+            nd = d + w
+            if nd < dist.get(v, INF):
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(heap, (nd, v))
+    return dist, prev
+
+
+def astar(graph, start: str, end: str, heuristic: Callable[[str, str], float]) -> Tuple[List[str], float]:
+    """
+    A* search. heuristic(node, end) must never overestimate the remaining distance.
+    Returns: path names, total distance
+    """
+    dist = {start: 0.0}
+    prev = {start: None}
+    settled = set()
+    heap = [(heuristic(start, end), 0.0, start)]
+    while heap:
+        _, d, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        if u == end:
+            return _unwind(prev, end), d
+        settled.add(u)
+        for v, w in graph.get(u, ()):
+            nd = d + w
+            if nd < dist.get(v, INF):
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(heap, (nd + heuristic(v, end), nd, v))
+    return [], INF
+
+
+class DijkstraBackend:
+    name = "dijkstra"
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def shortest_path(self, start: str, end: str) -> Tuple[List[str], float]:
+        if start not in self.graph or end not in self.graph:
+            raise KeyError(start if start not in self.graph else end)
+        dist, prev = dijkstra(self.graph, start, end)
+        if end not in dist:
+            return [], INF
+        return _unwind(prev, end), dist[end]
+
+
+class AStarBackend:
+    name = "astar"
+
+    def __init__(self, graph, heuristic: Callable[[str, str], float]):
+        self.graph = graph
+        self.heuristic = heuristic
+
+    def shortest_path(self, start: str, end: str) -> Tuple[List[str], float]:
+        return astar(self.graph, start, end, self.heuristic)
+
+
+class ContractionHierarchyBackend:
+    """
+    Contraction hierarchies: nodes are contracted in edge-difference order, adding
+    shortcut edges where no witness path exists. Queries run a bidirectional
+    Dijkstra that only climbs the hierarchy, then unpack shortcuts into the
+    original landmark path.
+    """
+    name = "ch"
+
+    def __init__(self, graph, witness_settle_limit: int = 500):
+        self.witness_settle_limit = witness_settle_limit
+        self.nodes = list(graph.keys())
+        # edges[(u, v)] = (weight, middle node or None for an original edge)
+        self.edges: Dict[Tuple[str, str], Tuple[float, Optional[str]]] = {}
+        out_edges = {u: {} for u in self.nodes}
+        in_edges = {u: {} for u in self.nodes}
+        for u, adj in graph.items():
+            for v, w in adj:
+                if u != v and w < out_edges[u].get(v, INF):
+                    out_edges[u][v] = w
+                    in_edges[v][u] = w
+                    self.edges[(u, v)] = (w, None)
+        self.rank: Dict[str, int] = {}
+        # Searches from s go up via up_out; searches back from t go up via down_in
+        self.up_out: Dict[str, Dict[str, float]] = {u: {} for u in self.nodes}
+        self.down_in: Dict[str, Dict[str, float]] = {u: {} for u in self.nodes}
+        self._contract_all(out_edges, in_edges)
+
+    def _witness_dist(self, out_edges, source: str, skip: str, limit: float) -> Dict[str, float]:
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        settled = 0
+        while heap and settled < self.witness_settle_limit:
+            d, u = heapq.heappop(heap)
+            if d > dist.get(u, INF):
+                continue
+            if d > limit:
+                break
+            settled += 1
+            for v, w in out_edges[u].items():
+                if v == skip:
+                    continue
+                nd = d + w
+                if nd < dist.get(v, INF):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return dist
+
+    def _shortcuts(self, out_edges, in_edges, v: str) -> List[Tuple[str, str, float]]:
+        shortcuts = []
+        outs = out_edges[v]
+        if not outs:
+            return shortcuts
+        max_out = max(outs.values())
+        for u, w_uv in in_edges[v].items():
+            witness = self._witness_dist(out_edges, u, v, w_uv + max_out)
+            for w, w_vw in outs.items():
+                if w == u:
+                    continue
+                via = w_uv + w_vw
+                if witness.get(w, INF) > via:
+                    shortcuts.append((u, w, via))
+        return shortcuts
+
+    def _priority(self, out_edges, in_edges, v: str, deleted_neighbours: Dict[str, int]) -> int:
+        added = len(self._shortcuts(out_edges, in_edges, v))
+        removed = len(out_edges[v]) + len(in_edges[v])
+        return added - removed + deleted_neighbours.get(v, 0)
+
+    def _contract_all(self, out_edges, in_edges):
+        deleted_neighbours: Dict[str, int] = {}
+        heap = [(self._priority(out_edges, in_edges, v, deleted_neighbours), v) for v in self.nodes]
+        heapq.heapify(heap)
+        while heap:
+            _, v = heapq.heappop(heap)
+            if v in self.rank:
+                continue
+            # Lazy update: re-evaluate and contract only if v is still the cheapest
+            priority = self._priority(out_edges, in_edges, v, deleted_neighbours)
+            if heap and priority > heap[0][0]:
+                heapq.heappush(heap, (priority, v))
+                continue
+            for u, w, via in self._shortcuts(out_edges, in_edges, v):
+                if via < out_edges[u].get(w, INF):
+                    out_edges[u][w] = via
+                    in_edges[w][u] = via
+                    self.edges[(u, w)] = (via, v)
+            self.rank[v] = len(self.rank)
+            for w, weight in out_edges[v].items():
+                self.up_out[v][w] = weight
+                del in_edges[w][v]
+                deleted_neighbours[w] = deleted_neighbours.get(w, 0) + 1
+            for u, weight in in_edges[v].items():
+                self.down_in[v][u] = weight
+                del out_edges[u][v]
+                deleted_neighbours[u] = deleted_neighbours.get(u, 0) + 1
+            out_edges[v] = {}
+            in_edges[v] = {}
+
+    def _upward(self, adjacency, source: str) -> Tuple[Dict[str, float], Dict[str, Optional[str]]]:
+        dist = {source: 0.0}
+        prev = {source: None}
+        heap = [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for v, w in adjacency[u].items():
+                nd = d + w
+                if nd < dist.get(v, INF):
+                    dist[v] = nd
+                    prev[v] = u
+                    heapq.heappush(heap, (nd, v))
+        return dist, prev
+
+    def _unpack(self, u: str, v: str) -> List[str]:
+        _, mid = self.edges[(u, v)]
+        if mid is None:
+            return [u, v]
+        return self._unpack(u, mid) + self._unpack(mid, v)[1:]
+
+    def shortest_path(self, start: str, end: str) -> Tuple[List[str], float]:
+        if start not in self.rank or end not in self.rank:
+            raise KeyError(start if start not in self.rank else end)
+        fwd_dist, fwd_prev = self._upward(self.up_out, start)
+        bwd_dist, bwd_prev = self._upward(self.down_in, end)
+        best, meet = INF, None
+        for node, d in fwd_dist.items():
+            total = d + bwd_dist.get(node, INF)
+            if total < best:
+                best, meet = total, node
+        if meet is None:
+            return [], INF
+        hierarchy_path = _unwind(fwd_prev, meet)
+        node = meet
+        while bwd_prev[node] is not None:
+            node = bwd_prev[node]
+            hierarchy_path.append(node)
+        path = [hierarchy_path[0]]
+        for u, v in zip(hierarchy_path, hierarchy_path[1:]):
+            path += self._unpack(u, v)[1:]
+        return path, best
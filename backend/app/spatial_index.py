@@ -0,0 +1,105 @@
+from typing import List, Dict, Any, Tuple
+import math
+import threading
+import numpy as np
+
+from .geo import EARTH_RADIUS_KM, haversine
+
+KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+
+class GridIndex:
+    """
+    Spatial index bucketing points into a uniform lat/lng grid of roughly cell_km cells.
+    Radius queries only scan the buckets overlapping the query box, then filter
+    candidates by exact haversine distance.
+    """
+
+    def __init__(self, lats, lngs, cell_km: float = 2.5):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lngs = np.asarray(lngs, dtype=float)
+        self.cell_km = cell_km
+        self.cell_deg = cell_km / KM_PER_DEG_LAT
+        self.buckets: Dict[Tuple[int, int], np.ndarray] = {}
+        if len(self.lats) == 0:
+            return
+        rows = np.floor(self.lats / self.cell_deg).astype(np.int64)
+        cols = np.floor(self.lngs / self.cell_deg).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        cells = np.stack([rows[order], cols[order]], axis=1)
+        starts = np.flatnonzero(np.r_[True, np.any(cells[1:] != cells[:-1], axis=1)])
+        for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+            self.buckets[(int(cells[start, 0]), int(cells[start, 1]))] = np.sort(order[start:end])
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def query_radius(self, lat: float, lng: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points within radius_km of (lat, lng).
+        Returns: (indices in ascending order, distances_km)
+        """
+        dlat = radius_km / KM_PER_DEG_LAT
+        # Widen the longitude span at the band edge nearest the pole
+        cos_lat = math.cos(math.radians(min(89.0, abs(lat) + dlat)))
+        dlng = radius_km / (KM_PER_DEG_LAT * max(cos_lat, 1e-6))
+        row_lo, row_hi = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+        col_lo, col_hi = math.floor((lng - dlng) / self.cell_deg), math.floor((lng + dlng) / self.cell_deg)
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > len(self.buckets):
+            candidates = [bucket for (r, c), bucket in self.buckets.items()
+                          if row_lo <= r <= row_hi and col_lo <= c <= col_hi]
+        else:
+            candidates = [self.buckets[(r, c)]
+                          for r in range(row_lo, row_hi + 1)
+                          for c in range(col_lo, col_hi + 1)
+                          if (r, c) in self.buckets]
+        if not candidates:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        idx = np.sort(np.concatenate(candidates))
+        dists = haversine(lat, lng, self.lats[idx], self.lngs[idx])
+        mask = dists <= radius_km
+        return idx[mask], dists[mask]
+
+    def nearest(self, lat: float, lng: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k points closest to (lat, lng), doubling the search radius from one cell.
+        Returns: (indices, distances_km) sorted by distance
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        radius = self.cell_km
+        while True:
+            idx, dists = self.query_radius(lat, lng, radius)
+            if len(idx) >= k:
+                order = np.argsort(dists, kind="stable")[:k]
+                return idx[order], dists[order]
+            radius *= 2
+
+
+_location_index = None
+_location_index_source = None
+_location_index_lock = threading.Lock()
+
+
+def get_location_index(locations: List[Dict[str, Any]] = None) -> GridIndex:
+    """
+    Shared GridIndex over a location list (default: the current location store).
+    Index positions match positions in the list. Every LocationStore (e.g. one per region)
+    keeps its own index for as long as it lives; plain lists share one slot, rebuilt only
+    when the list object changes.
+    """
+    global _location_index, _location_index_source
+    if locations is None:
+        from .locations import get_location_store
+        locations = get_location_store()
+    with _location_index_lock:
+        if hasattr(locations, "lat"):
+            # Cached on the store itself, so it lives and dies with it
+            if locations.grid_index is None:
+                locations.grid_index = GridIndex(locations.lat, locations.lng)
+            return locations.grid_index
+        if _location_index is None or _location_index_source is not locations:
+            _location_index = GridIndex([loc['lat'] for loc in locations], [loc['lng'] for loc in locations])
+            _location_index_source = locations
+        return _location_index
@@ -0,0 +1,146 @@
+from typing import Any, Dict, List, Tuple
+from collections import OrderedDict
+import datetime
+import heapq
+import os
+import threading
+
+import numpy as np
+
+from .graph_engine import floyd_warshall_matrix
+from .traffic_model import get_traffic_model, zone_indices, hour_of_week, local_time, HOURS_PER_WEEK, VEHICLES
+
+# Time-dependent travel times on the landmark graph ({name: [(neighbor, km), ...]}).
+# An edge's free-flow time (km * detour factor at the vehicle's average speed) is scaled by
+# the traffic-model multiplier for the hour, averaged over the zones of its two endpoints.
+# Speeds change at hour boundaries while an edge is being traversed, so leaving later never
+# means arriving earlier (FIFO) and plain label-setting Dijkstra on arrival times is exact.
+# Repeat queries that only need travel times use all-pairs matrices computed once per hour bucket.
+# Hours whose edge multipliers are identical (e.g. night hours, repeated weekdays) share one
+# matrix, and at most TD_MATRIX_CACHE_SIZE matrices are kept per graph (least recently used go).
+
+BUCKET_MINUTES = 60
+TD_MATRIX_CACHE_SIZE = int(os.environ.get("TD_MATRIX_CACHE_SIZE", "24"))
+
+INF = float('inf')
+
+
+def week_minute(when: datetime.datetime) -> float:
+    """Minutes since Monday 00:00 of the week containing `when` (local time in SERVICE_TIMEZONE)."""
+    when = local_time(when)
+    return hour_of_week(when) * BUCKET_MINUTES + when.minute + when.second / 60
+
+
+class TimeDependentGraph:
+    def __init__(self, graph: Dict[str, List[Tuple[str, float]]], locations: List[Dict[str, Any]],
+                 vehicle_type: str = "car", speed_kmh: float = 35, detour_factor: float = 1.3,
+                 max_buckets: int = TD_MATRIX_CACHE_SIZE):
+        self.vehicle_type = vehicle_type
+        self.names = list(graph.keys())
+        self.index = {name: i for i, name in enumerate(self.names)}
+        by_name = {loc['name']: loc for loc in locations}
+        self.coords = np.array([[by_name[name]['lat'], by_name[name]['lng']] for name in self.names], dtype=float)
+        self.zones = zone_indices([by_name[name]['traffic_zone'] for name in self.names])
+        self.minutes_per_km = detour_factor / speed_kmh * 60  # free flow
+
+        src, dst, km = [], [], []
+        self.out_edges = [[] for _ in self.names]
+        for u, edges in graph.items():
+            for v, w in edges:
+                self.out_edges[self.index[u]].append(len(km))
+                src.append(self.index[u])
+                dst.append(self.index[v])
+                km.append(w)
+        self.src = np.array(src, dtype=np.intp)
+        self.dst = np.array(dst, dtype=np.intp)
+        self.km = np.array(km, dtype=float)
+        self.free_minutes = self.km * self.minutes_per_km
+        vehicle = VEHICLES.index(vehicle_type) if vehicle_type in VEHICLES else 0
+        node_multipliers = get_traffic_model().multipliers[:, self.zones, vehicle].astype(float)  # (hours, nodes)
+        self.edge_multipliers = (node_multipliers[:, self.src] + node_multipliers[:, self.dst]) / 2  # (hours, edges)
+        # First hour of the week with the same edge multipliers as each hour
+        first_hour = {}
+        self.bucket_of_hour = [first_hour.setdefault(row.tobytes(), hour) for hour, row in enumerate(self.edge_multipliers)]
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._buckets_lock = threading.Lock()
+
+    def edge_minutes(self, edge: int, t: float) -> float:
+        """Minutes to traverse edge when entering it at week minute t."""
+        remaining = self.free_minutes[edge]  # free-flow minutes still to cover
+        elapsed = 0.0
+        while True:
+            multiplier = self.edge_multipliers[int(t // BUCKET_MINUTES) % HOURS_PER_WEEK, edge]
+            to_boundary = BUCKET_MINUTES - t % BUCKET_MINUTES
+            if remaining * multiplier <= to_boundary:
+                return elapsed + remaining * multiplier
+            remaining -= to_boundary / multiplier
+            elapsed += to_boundary
+            t += to_boundary
+
+    def shortest_path(self, start: str, end: str, depart_at: datetime.datetime) -> Tuple[List[str], float, float]:
+        """
+        Fastest path leaving start at depart_at (time-dependent Dijkstra).
+        Returns: path names, distance (km), travel time (minutes); ([], inf, inf) if unreachable.
+        """
+        s, target = self.index[start], self.index[end]
+        t0 = week_minute(depart_at)
+        arrival = {s: t0}
+        prev_edge = {s: None}
+        settled = set()
+        heap = [(t0, s)]
+        while heap:
+            t, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+            if u == target:
+                break
+            for e in self.out_edges[u]:
+                v = self.dst[e]
+                arrive = t + self.edge_minutes(e, t)
+                if arrive < arrival.get(v, INF):
+                    arrival[v] = arrive
+                    prev_edge[v] = e
+                    heapq.heappush(heap, (arrive, v))
+        if target not in settled:
+            return [], INF, INF
+        edges = []
+        node = target
+        while prev_edge[node] is not None:
+            edges.append(prev_edge[node])
+            node = self.src[prev_edge[node]]
+        edges.reverse()
+        names = [start] + [self.names[self.dst[e]] for e in edges]
+        return names, float(self.km[edges].sum()), arrival[target] - t0
+
+    def path_minutes(self, names: List[str], depart_at: datetime.datetime) -> float:
+        """Travel time (minutes) along a fixed landmark path leaving at depart_at."""
+        t0 = t = week_minute(depart_at)
+        for a, b in zip(names, names[1:]):
+            i, j = self.index[a], self.index[b]
+            edge = next(e for e in self.out_edges[i] if self.dst[e] == j)
+            t += self.edge_minutes(edge, t)
+        return t - t0
+
+    def bucket_matrix(self, hour: int) -> np.ndarray:
+        """All-pairs travel times (minutes) with the speeds of one hour bucket, cached per distinct bucket."""
+        bucket = self.bucket_of_hour[hour]
+        with self._buckets_lock:
+            matrix = self._buckets.get(bucket)
+            if matrix is None:
+                n = len(self.names)
+                weights = np.full((n, n), np.inf)
+                weights[self.src, self.dst] = self.free_minutes * self.edge_multipliers[bucket]
+                matrix, _ = floyd_warshall_matrix(weights)
+                self._buckets[bucket] = matrix
+                while len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(bucket)
+            return matrix
+
+    def travel_time_matrix(self, names: List[str], depart_at: datetime.datetime) -> np.ndarray:
+        """Travel times (minutes) between the given landmarks at the hour bucket of depart_at."""
+        idx = [self.index[n] for n in names]
+        return self.bucket_matrix(hour_of_week(depart_at))[np.ix_(idx, idx)]
@@ -0,0 +1,162 @@
+from typing import Any, Dict, List, Optional
+import csv
+import datetime
+import os
+import threading
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from .geo import distance_matrix
+from .spatial_index import get_location_index
+
+# Precomputed traffic model: a speed-factor table indexed by hour of week (Monday 00:00
+# = 0 .. Sunday 23:00 = 167), traffic zone and vehicle type. A factor is the fraction of
+# free-flow speed, so provider durations are divided by it. The built-in table is the
+# expected value of the old per-request traffic draw; TRAFFIC_PROFILE_PATH may point to a
+# CSV (hour_of_week, traffic_zone, vehicle_type, speed_factor) whose rows override it.
+# Lookups are deterministic, so results only change when the hour bucket does.
+
+ZONES = ("low", "medium", "high")
+VEHICLES = ("car", "bike", "walk")
+HOURS_PER_WEEK = 168
+TRAFFIC_PROFILE_PATH = os.environ.get("TRAFFIC_PROFILE_PATH", "")
+# Hour buckets are wall-clock time in the service area; timezone-aware datetimes are converted to it
+SERVICE_TIMEZONE = ZoneInfo(os.environ.get("SERVICE_TIMEZONE", "Asia/Kolkata"))
+# Above this many landmarks, zone lookups use the spatial index instead of a dense distance matrix
+DENSE_ZONE_LOOKUP_MAX = 2000
+
+# Duration multipliers for each traffic level, and the upper bounds used to label a multiplier
+LEVEL_MULTIPLIERS = {"light": 1.0, "moderate": 1.3, "heavy": 1.6}
+LEVEL_BOUNDS = ((1.2, "light"), (1.4, "moderate"))
+# Share of the congestion delay each vehicle type suffers (pedestrians walk past queues)
+VEHICLE_TRAFFIC_SENSITIVITY = {"car": 1.0, "bike": 0.6, "walk": 0.0}
+WEATHER_MULTIPLIERS = {"rainy": 1.2, "snowy": 1.5, "foggy": 1.3}
+
+
+def local_time(when: Optional[datetime.datetime] = None) -> datetime.datetime:
+    """when as wall-clock time in SERVICE_TIMEZONE (default now); naive datetimes are taken as already local."""
+    if when is None:
+        return datetime.datetime.now(SERVICE_TIMEZONE)
+    if when.tzinfo is not None:
+        return when.astimezone(SERVICE_TIMEZONE)
+    return when
+
+
+def hour_of_week(when: Optional[datetime.datetime] = None) -> int:
+    when = local_time(when)
+    return when.weekday() * 24 + when.hour
+
+
+def _level_probabilities(zone: str, hour: int, weekend: bool) -> Dict[str, float]:
+    """Traffic level probabilities for one zone and hour (the rules get_traffic_condition used to sample)."""
+    if zone == "high":
+        probs = {"light": 10, "moderate": 30, "heavy": 60}
+    elif zone == "medium":
+        probs = {"light": 30, "moderate": 50, "heavy": 20}
+    else:
+        probs = {"light": 60, "moderate": 30, "heavy": 10}
+    is_rush_hour = (8 <= hour <= 10) or (17 <= hour <= 19)
+    if is_rush_hour and not weekend:
+        probs["heavy"] += 30
+        probs["moderate"] += 10
+        probs["light"] -= 40
+    elif weekend:
+        probs["heavy"] -= 20
+        probs["light"] += 20
+    probs = {k: max(0, v) for k, v in probs.items()}
+    total = sum(probs.values())
+    return {k: v / total for k, v in probs.items()}
+
+
+def default_speed_factors() -> np.ndarray:
+    """Built-in (HOURS_PER_WEEK, len(ZONES), len(VEHICLES)) speed-factor table."""
+    factors = np.ones((HOURS_PER_WEEK, len(ZONES), len(VEHICLES)), dtype=np.float32)
+    for how in range(HOURS_PER_WEEK):
+        weekend = how // 24 >= 5
+        for z, zone in enumerate(ZONES):
+            probs = _level_probabilities(zone, how % 24, weekend)
+            delay = sum(p * LEVEL_MULTIPLIERS[level] for level, p in probs.items()) - 1
+            for v, vehicle in enumerate(VEHICLES):
+                factors[how, z, v] = 1 / (1 + delay * VEHICLE_TRAFFIC_SENSITIVITY[vehicle])
+    return factors
+
+
+def load_speed_factors(path: str, base: np.ndarray = None) -> np.ndarray:
+    """Table from a CSV of (hour_of_week, traffic_zone, vehicle_type, speed_factor) rows over base."""
+    factors = (default_speed_factors() if base is None else base).copy()
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            how = int(row["hour_of_week"])
+            speed_factor = float(row["speed_factor"])
+            if not 0 <= how < HOURS_PER_WEEK or speed_factor <= 0:
+                raise ValueError(f"Invalid traffic profile row: {row}")
+            factors[how, ZONES.index(row["traffic_zone"]), VEHICLES.index(row["vehicle_type"])] = speed_factor
+    return factors
+
+
+def traffic_labels(multipliers) -> np.ndarray:
+    """Traffic level ("light" / "moderate" / "heavy") for each duration multiplier."""
+    bounds = [bound for bound, _ in LEVEL_BOUNDS]
+    names = np.array([name for _, name in LEVEL_BOUNDS] + ["heavy"])
+    return names[np.searchsorted(bounds, np.asarray(multipliers, dtype=float), side="right")]
+
+
+class TrafficModel:
+    def __init__(self, speed_factors: np.ndarray, locations: List[Dict[str, Any]] = None):
+        if speed_factors.shape != (HOURS_PER_WEEK, len(ZONES), len(VEHICLES)):
+            raise ValueError(f"Speed-factor table has shape {speed_factors.shape}")
+        # Stored as duration multipliers so adjustments are plain multiplications
+        self.multipliers = (1 / speed_factors).astype(np.float32)
+        self.locations = locations  # None: the current location store
+
+    def zones_along(self, coords) -> np.ndarray:
+        """Zone index of the nearest landmark for each [lat, lng] point."""
+        if len(coords) == 0:
+            return np.zeros(0, dtype=np.intp)
+        locations = self.locations
+        if locations is None:
+            from .locations import get_location_store
+            locations = get_location_store()
+        if hasattr(locations, "zone_codes"):
+            zones = np.asarray(locations.zone_codes, dtype=np.intp)
+        else:
+            zones = zone_indices([loc["traffic_zone"] for loc in locations])
+        if len(locations) > DENSE_ZONE_LOOKUP_MAX:
+            index = get_location_index(locations)
+            return zones[[index.nearest(lat, lng, 1)[0][0] for lat, lng in coords]]
+        if hasattr(locations, "lat"):
+            landmarks = np.column_stack([locations.lat, locations.lng])
+        else:
+            landmarks = np.array([[loc["lat"], loc["lng"]] for loc in locations], dtype=float)
+        return zones[distance_matrix(coords, landmarks).argmin(axis=1)]
+
+    def duration_multipliers(self, zones, vehicle_type: str = "car", when: Optional[datetime.datetime] = None) -> np.ndarray:
+        """Travel-time multiplier for each zone index at the hour bucket of `when` (default now)."""
+        vehicle = VEHICLES.index(vehicle_type) if vehicle_type in VEHICLES else 0
+        return self.multipliers[hour_of_week(when), np.asarray(zones, dtype=np.intp), vehicle]
+
+    def traffic_label(self, zones, when: Optional[datetime.datetime] = None) -> str:
+        """Traffic level for the most congested of the given zones (as felt by a car)."""
+        return str(traffic_labels(self.duration_multipliers(zones, "car", when).max()))
+
+
+def zone_indices(zone_names) -> np.ndarray:
+    return np.array([ZONES.index(z) if z in ZONES else 0 for z in zone_names], dtype=np.intp)
+
+
+_traffic_model = None
+_traffic_model_lock = threading.Lock()
+
+
+def get_traffic_model() -> TrafficModel:
+    """Shared TrafficModel, loaded from TRAFFIC_PROFILE_PATH if set (else the built-in table)."""
+    global _traffic_model
+    with _traffic_model_lock:
+        if _traffic_model is None:
+            if TRAFFIC_PROFILE_PATH:
+                print(f"Loading traffic speed profiles from {TRAFFIC_PROFILE_PATH}")
+                _traffic_model = TrafficModel(load_speed_factors(TRAFFIC_PROFILE_PATH))
+            else:
+                _traffic_model = TrafficModel(default_speed_factors())
+        return _traffic_model
@@ -0,0 +1,155 @@
+from typing import List, Tuple
+import time
+import numpy as np
+
+# Local TSP solver over a precomputed distance/duration matrix.
+# Tours always start at index 0. Open tours end at whichever stop is cheapest;
+# round trips return to index 0 (the return leg is not repeated in the order).
+# Matrices may be asymmetric and may contain np.inf for unreachable pairs.
+
+HELD_KARP_MAX_STOPS = 12
+DEFAULT_TIME_BUDGET_S = 0.2
+EPS = 1e-9
+
+
+def tour_cost(matrix: np.ndarray, order: List[int], round_trip: bool = False) -> float:
+    stops = list(order) + [order[0]] if round_trip and len(order) > 1 else list(order)
+    if len(stops) < 2:
+        return 0.0
+    return float(matrix[stops[:-1], stops[1:]].sum())
+
+
+def held_karp(matrix: np.ndarray, round_trip: bool = False) -> Tuple[List[int], float]:
+    """Exact dynamic program, O(n^2 * 2^n). Only for small stop counts."""
+    n = len(matrix)
+    if n <= 2:
+        order = list(range(n))
+        return order, tour_cost(matrix, order, round_trip)
+    m = n - 1
+    sub = matrix[1:, 1:]
+    full = 1 << m
+    # dp[mask, j]: cheapest path from 0 through the stops in mask, ending at stop j+1
+    dp = np.full((full, m), np.inf)
+    parent = np.full((full, m), -1, dtype=np.int64)
+    for j in range(m):
+        dp[1 << j, j] = matrix[0, j + 1]
+    for mask in range(1, full):
+        if mask & (mask - 1) == 0:
+            continue
+        for j in range(m):
+            bit = 1 << j
+            if not mask & bit:
+                continue
+            candidates = dp[mask ^ bit] + sub[:, j]
+            k = int(np.argmin(candidates))
+            dp[mask, j] = candidates[k]
+            parent[mask, j] = k
+    final = dp[full - 1] + (matrix[1:, 0] if round_trip else 0.0)
+    j = int(np.argmin(final))
+    cost = float(final[j])
+    if not np.isfinite(cost):
+        # Some stop is unreachable; parents are meaningless, return a complete order anyway
+        order = nearest_neighbour(matrix)
+        return order, tour_cost(matrix, order, round_trip)
+    order = []
+    mask = full - 1
+    while j >= 0:
+        order.append(j + 1)
+        mask, j = mask ^ (1 << j), int(parent[mask, j])
+    order.append(0)
+    order.reverse()
+    return order, cost
+
+
+def nearest_neighbour(matrix: np.ndarray) -> List[int]:
+    n = len(matrix)
+    order = [0]
+    remaining = set(range(1, n))
+    while remaining:
+        last = order[-1]
+        nxt = min(remaining, key=lambda k: matrix[last, k])
+        order.append(nxt)
+        remaining.remove(nxt)
+    return order
+
+
+def _two_opt_pass(matrix: np.ndarray, order: List[int], round_trip: bool, deadline: float) -> bool:
+    """Apply improving segment reversals (exact for asymmetric matrices). Returns True if improved."""
+    improved = False
+    n = len(order)
+    i = 1
+    while i < n - 1 and time.perf_counter() < deadline:
+        q = np.array(order + [order[0]] if round_trip else order)
+        fwd = np.concatenate([[0.0], np.cumsum(matrix[q[:-1], q[1:]])])
+        bwd = np.concatenate([[0.0], np.cumsum(matrix[q[1:], q[:-1]])])
+        j = np.arange(i + 1, n)
+        has_next = j + 1 < len(q)
+        nxt = q[np.minimum(j + 1, len(q) - 1)]
+        old = matrix[q[i - 1], q[i]] + (fwd[j] - fwd[i]) + np.where(has_next, matrix[q[j], nxt], 0.0)
+        new = matrix[q[i - 1], q[j]] + (bwd[j] - bwd[i]) + np.where(has_next, matrix[q[i], nxt], 0.0)
+        with np.errstate(invalid="ignore"):
+            delta = new - old
+        # inf - inf (both unreachable) is not an improvement
+        delta = np.where(np.isnan(delta), np.inf, delta)
+        best = int(np.argmin(delta))
+        if delta[best] < -EPS:
+            jj = int(j[best])
+            order[i:jj + 1] = order[i:jj + 1][::-1]
+            improved = True
+        else:
+            i += 1
+    return improved
+
+
+def _or_opt_pass(matrix: np.ndarray, order: List[int], round_trip: bool, deadline: float) -> bool:
+    """Move chains of 1-3 stops to their cheapest position. Returns True if improved."""
+    improved = False
+    for seg_len in (1, 2, 3):
+        i = 1
+        while i + seg_len <= len(order) and time.perf_counter() < deadline:
+            seg = order[i:i + seg_len]
+            rest = order[:i] + order[i + seg_len:]
+            current = tour_cost(matrix, order, round_trip)
+            q = np.array(rest + [rest[0]] if round_trip else rest)
+            # Insert after position k of rest (k >= 0 keeps index 0 first)
+            k = np.arange(len(rest))
+            has_next = k + 1 < len(q)
+            nxt = q[np.minimum(k + 1, len(q) - 1)]
+            inner = tour_cost(matrix, seg)
+            with np.errstate(invalid="ignore"):
+                added = matrix[q[k], seg[0]] + inner + np.where(has_next, matrix[seg[-1], nxt] - matrix[q[k], nxt], 0.0)
+            base = tour_cost(matrix, rest, round_trip)
+            totals = np.where(np.isnan(added), np.inf, base + added)
+            best = int(np.argmin(totals))
+            if totals[best] < current - EPS:
+                order[:] = rest[:best + 1] + seg + rest[best + 1:]
+                improved = True
+            i += 1
+    return improved
+
+
+def local_search(matrix: np.ndarray, order: List[int], round_trip: bool = False,
+                 time_budget_s: float = DEFAULT_TIME_BUDGET_S) -> List[int]:
+    """2-opt and Or-opt until no move improves the tour or the time budget runs out."""
+    deadline = time.perf_counter() + time_budget_s
+    order = list(order)
+    while time.perf_counter() < deadline:
+        improved = _two_opt_pass(matrix, order, round_trip, deadline)
+        improved = _or_opt_pass(matrix, order, round_trip, deadline) or improved
+        if not improved:
+            break
+    return order
+
+
+def solve_tsp(matrix, round_trip: bool = False, time_budget_s: float = DEFAULT_TIME_BUDGET_S) -> Tuple[List[int], float]:
+    """
+    Order the stops of a distance/duration matrix, starting from index 0.
+    Uses exact Held-Karp up to HELD_KARP_MAX_STOPS stops, otherwise nearest
+    neighbour construction improved by 2-opt/Or-opt within time_budget_s.
+    Returns: visiting order (indices), tour cost
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if len(matrix) <= HELD_KARP_MAX_STOPS:
+        return held_karp(matrix, round_trip)
+    order = local_search(matrix, nearest_neighbour(matrix), round_trip, time_budget_s)
+    return order, tour_cost(matrix, order, round_trip)
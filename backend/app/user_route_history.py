@@ -11,14 +11,20 @@ def get_history_file(username):
     return os.path.join(HISTORY_DIR, f'{username}.json')
 
 def add_route_to_history(username, route_data):
+    add_routes_to_history(username, [route_data])
+
+def add_routes_to_history(username, routes):
+    """Append several entries with a single read/write of the history file."""
     file_path = get_history_file(username)
     if os.path.exists(file_path):
         with open(file_path, 'r') as f:
             history = json.load(f)
     else:
         history = []
-    route_data['timestamp'] = datetime.utcnow().isoformat()
-    history.append(route_data)
+    timestamp = datetime.utcnow().isoformat()
+    for route_data in routes:
+        route_data['timestamp'] = timestamp
+        history.append(route_data)
     with open(file_path, 'w') as f:
         json.dump(history, f, indent=2)
 
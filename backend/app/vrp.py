@@ -0,0 +1,265 @@
+from typing import Any, Dict, List, Optional
+import math
+import time
+import numpy as np
+
+# Vehicle routing with capacities, service times and time windows.
+# Works on a precomputed travel-time matrix (seconds) whose indexes are "nodes"
+# (depots and stops alike). Times are seconds from the start of the dispatch.
+#
+# stops:    [{"node": int, "demand": float = 0, "service_s": float = 0,
+#             "window": (earliest, latest) or None}, ...]
+# vehicles: [{"start": node, "end": node or None (route ends at its last stop),
+#             "capacity": float = inf, "shift": (start, end) or None}, ...]
+#
+# Construction is regret-2 insertion over all vehicles; improvement relocates single
+# stops (within and between routes) and reverses segments until no move helps or the
+# time budget runs out. Stops that cannot be served feasibly are reported unassigned.
+
+DEFAULT_TIME_BUDGET_S = 2.0
+EPS = 1e-6
+
+
+class _Route:
+    """One vehicle's limits and current stop sequence."""
+
+    def __init__(self, vehicle: dict, open_node: int):
+        self.start = vehicle["start"]
+        self.end = vehicle["end"] if vehicle.get("end") is not None else open_node
+        self.capacity = float(vehicle.get("capacity", math.inf) or math.inf)
+        shift = vehicle.get("shift") or (0.0, math.inf)
+        self.shift_start, self.shift_end = float(shift[0]), float(shift[1])
+        self.stops: List[int] = []
+
+
+class VRPSolver:
+    def __init__(self, durations, stops: List[dict], vehicles: List[dict], distances=None):
+        durations = np.asarray(durations, dtype=float)
+        n = len(durations)
+        # Extra zero-cost node n is the "end" of routes that finish at their last stop
+        self.dur = np.zeros((n + 1, n + 1))
+        self.dur[:n, :n] = durations
+        self.dist = None
+        if distances is not None:
+            self.dist = np.zeros((n + 1, n + 1))
+            self.dist[:n, :n] = np.asarray(distances, dtype=float)
+        self.open_node = n
+        self.node = np.array([s["node"] for s in stops], dtype=np.int64)
+        self.demand = np.array([float(s.get("demand", 0) or 0) for s in stops])
+        self.service = np.array([float(s.get("service_s", 0) or 0) for s in stops])
+        windows = [s.get("window") or (0.0, math.inf) for s in stops]
+        self.early = np.array([float(w[0]) for w in windows])
+        self.late = np.array([float(w[1]) for w in windows])
+        self.vehicles = vehicles
+        self.routes = [_Route(v, n) for v in vehicles]
+
+    # --- schedule evaluation ---
+
+    def schedule(self, route: _Route, stops: List[int] = None) -> Optional[Dict[str, Any]]:
+        """Simulate a stop sequence; None if it breaks a window, the shift or the capacity."""
+        stops = route.stops if stops is None else stops
+        if self.demand[stops].sum() > route.capacity + EPS:
+            return None
+        t = route.shift_start
+        prev = route.start
+        arrivals = []
+        for s in stops:
+            t = max(t + self.dur[prev, self.node[s]], self.early[s])
+            if t > self.late[s] + EPS:
+                return None
+            arrivals.append(t)
+            t += self.service[s]
+            prev = self.node[s]
+        t += self.dur[prev, route.end]
+        if t > route.shift_end + EPS:
+            return None
+        return {"arrivals": arrivals, "finish": t}
+
+    def route_cost(self, route: _Route, stops: List[int] = None) -> float:
+        stops = route.stops if stops is None else stops
+        seq = [route.start] + [int(self.node[s]) for s in stops] + [route.end]
+        return float(self.dur[seq[:-1], seq[1:]].sum())
+
+    def _insertion_state(self, route: _Route):
+        """Departure time at each position and the latest feasible service start after it."""
+        stops = route.stops
+        nodes = np.array([route.start] + [int(self.node[s]) for s in stops] + [route.end], dtype=np.int64)
+        depart = np.empty(len(stops) + 1)
+        t = route.shift_start
+        depart[0] = t
+        for k, s in enumerate(stops):
+            t = max(t + self.dur[nodes[k], nodes[k + 1]], self.early[s])
+            t += self.service[s]
+            depart[k + 1] = t
+        # latest[k]: latest time the element after position k may be reached
+        latest = np.empty(len(stops) + 1)
+        latest[-1] = route.shift_end
+        nxt = route.shift_end
+        for k in range(len(stops) - 1, -1, -1):
+            s = stops[k]
+            nxt = min(self.late[s], nxt - self.dur[nodes[k + 1], nodes[k + 2]] - self.service[s])
+            latest[k] = nxt
+        load = float(self.demand[stops].sum()) if stops else 0.0
+        return nodes, depart, latest, load
+
+    def insertion_costs(self, route: _Route, candidates: np.ndarray):
+        """
+        Cheapest feasible insertion of each candidate stop into route.
+        Returns: added travel time (inf if infeasible), best position (index into route.stops)
+        """
+        if len(candidates) == 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        nodes, depart, latest, load = self._insertion_state(route)
+        prev, nxt = nodes[:-1], nodes[1:]
+        u = self.node[candidates][:, None]
+        to_u = self.dur[prev[None, :], u]
+        from_u = self.dur[u, nxt[None, :]]
+        arrive_u = np.maximum(depart[None, :] + to_u, self.early[candidates][:, None])
+        reach_next = arrive_u + self.service[candidates][:, None] + from_u
+        feasible = (arrive_u <= self.late[candidates][:, None] + EPS) & (reach_next <= latest[None, :] + EPS)
+        feasible &= (load + self.demand[candidates] <= route.capacity + EPS)[:, None]
+        delta = np.where(feasible, to_u + from_u - self.dur[prev, nxt][None, :], np.inf)
+        pos = np.argmin(delta, axis=1)
+        return delta[np.arange(len(candidates)), pos], pos
+
+    # --- construction ---
+
+    def construct(self) -> List[int]:
+        """Regret-2 insertion. Returns the stops that could not be placed."""
+        unassigned = np.arange(len(self.node))
+        m = len(self.routes)
+        cost = np.empty((len(unassigned), m))
+        pos = np.empty((len(unassigned), m), dtype=np.int64)
+        for r, route in enumerate(self.routes):
+            cost[:, r], pos[:, r] = self.insertion_costs(route, unassigned)
+        while len(unassigned):
+            best_r = np.argmin(cost, axis=1)
+            best = cost[np.arange(len(unassigned)), best_r]
+            if not np.isfinite(best).any():
+                break
+            if m > 1:
+                second = np.partition(cost, 1, axis=1)[:, 1]
+                with np.errstate(invalid="ignore"):
+                    regret = np.where(np.isfinite(second), second - best, 1e12)
+                regret = np.where(np.isfinite(best), regret, -np.inf)
+                pick = int(np.lexsort((best, -regret))[0])
+            else:
+                pick = int(np.argmin(best))
+            r = int(best_r[pick])
+            self.routes[r].stops.insert(int(pos[pick, r]), int(unassigned[pick]))
+            keep = np.arange(len(unassigned)) != pick
+            unassigned, cost, pos = unassigned[keep], cost[keep], pos[keep]
+            # Only the modified route's insertion options changed
+            cost[:, r], pos[:, r] = self.insertion_costs(self.routes[r], unassigned)
+        return unassigned.tolist()
+
+    # --- improvement ---
+
+    def _relocate_pass(self, deadline: float) -> bool:
+        improved = False
+        for r, route in enumerate(self.routes):
+            k = 0
+            while k < len(route.stops) and time.perf_counter() < deadline:
+                s = route.stops[k]
+                reduced = route.stops[:k] + route.stops[k + 1:]
+                if self.schedule(route, reduced) is None:
+                    k += 1
+                    continue
+                gain = self.route_cost(route) - self.route_cost(route, reduced)
+                original = route.stops
+                route.stops = reduced
+                best_delta, best_r, best_pos = math.inf, None, None
+                for r2, other in enumerate(self.routes):
+                    delta, p = self.insertion_costs(other, np.array([s]))
+                    if delta[0] < best_delta:
+                        best_delta, best_r, best_pos = delta[0], r2, int(p[0])
+                if best_r is not None and best_delta < gain - EPS:
+                    self.routes[best_r].stops.insert(best_pos, s)
+                    improved = True
+                    if best_r == r:
+                        k += 1
+                else:
+                    route.stops = original
+                    k += 1
+        return improved
+
+    def _two_opt_pass(self, deadline: float) -> bool:
+        improved = False
+        for route in self.routes:
+            n = len(route.stops)
+            current = self.route_cost(route)
+            i = 0
+            while i < n - 1 and time.perf_counter() < deadline:
+                moved = False
+                for j in range(i + 1, n):
+                    candidate = route.stops[:i] + route.stops[i:j + 1][::-1] + route.stops[j + 1:]
+                    cost = self.route_cost(route, candidate)
+                    if cost < current - EPS and self.schedule(route, candidate) is not None:
+                        route.stops, current = candidate, cost
+                        improved = moved = True
+                        break
+                if not moved:
+                    i += 1
+        return improved
+
+    def _insert_unassigned(self, unassigned: List[int]) -> List[int]:
+        remaining = []
+        for s in unassigned:
+            best_delta, best_r, best_pos = math.inf, None, None
+            for r, route in enumerate(self.routes):
+                delta, p = self.insertion_costs(route, np.array([s]))
+                if delta[0] < best_delta:
+                    best_delta, best_r, best_pos = delta[0], r, int(p[0])
+            if best_r is None:
+                remaining.append(s)
+            else:
+                self.routes[best_r].stops.insert(best_pos, s)
+        return remaining
+
+    def solve(self, time_budget_s: float = DEFAULT_TIME_BUDGET_S) -> Dict[str, Any]:
+        deadline = time.perf_counter() + time_budget_s
+        unassigned = self.construct()
+        while time.perf_counter() < deadline:
+            improved = self._relocate_pass(deadline)
+            improved = self._two_opt_pass(deadline) or improved
+            if unassigned:
+                before = len(unassigned)
+                unassigned = self._insert_unassigned(unassigned)
+                improved = improved or len(unassigned) < before
+            if not improved:
+                break
+        return self.result(unassigned)
+
+    def result(self, unassigned: List[int]) -> Dict[str, Any]:
+        routes = []
+        for v, route in enumerate(self.routes):
+            # A vehicle whose shift cannot even cover start -> end stays empty
+            plan = self.schedule(route) or {"arrivals": [], "finish": route.shift_start}
+            seq = [route.start] + [int(self.node[s]) for s in route.stops] + [route.end]
+            routes.append({
+                "vehicle": v,
+                "stops": list(route.stops),
+                "arrivals": plan["arrivals"],
+                "finish": plan["finish"],
+                "load": float(self.demand[route.stops].sum()) if route.stops else 0.0,
+                "duration_s": plan["finish"] - route.shift_start,
+                "travel_s": self.route_cost(route),
+                "distance_km": float(self.dist[seq[:-1], seq[1:]].sum()) if self.dist is not None else None,
+            })
+        return {
+            "routes": routes,
+            "unassigned": sorted(unassigned),
+            "travel_s": sum(r["travel_s"] for r in routes),
+        }
+
+
+def solve_vrp(durations, stops: List[dict], vehicles: List[dict], distances=None,
+              time_budget_s: float = DEFAULT_TIME_BUDGET_S) -> Dict[str, Any]:
+    """
+    Assign and sequence stops across a fleet, minimising total travel time.
+    Returns: {"routes": [{"vehicle", "stops", "arrivals", "finish", "load", "duration_s",
+    "travel_s", "distance_km"}, ...], "unassigned": [stop indexes], "travel_s"}
+    """
+    if not vehicles:
+        raise ValueError("At least one vehicle required")
+    return VRPSolver(durations, stops, vehicles, distances).solve(time_budget_s)
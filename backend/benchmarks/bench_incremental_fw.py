@@ -0,0 +1,127 @@
+"""
+Check and time incremental Floyd-Warshall updates (FloydWarshallEngine.updated) against full rebuilds.
+
+Run from the backend directory:
+    python -m benchmarks.bench_incremental_fw [--trials 30] [--sizes 300 1000]
+
+Each trial applies random landmark additions, removals and moves to a synthetic landmark set and
+asserts that the updated engine has the same distances as a full rebuild and that following its
+next hops reproduces every distance. The timing runs then compare one update of each kind with a
+full rebuild. Exits with an AssertionError on the first mismatch.
+"""
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from app.route_service import build_landmark_graph
+from app.graph_engine import FloydWarshallEngine
+
+from .bench_shortest_path import synthetic_locations, timed
+
+TOLERANCE = 1e-6
+
+
+def random_point(rng):
+    return {"lat": 30.15 + rng.random() * 0.25, "lng": 77.85 + rng.random() * 0.3}
+
+
+def check_paths(engine, label):
+    """Following next_hop from every source reaches every target with exactly the stored distance."""
+    n = len(engine.names)
+    for i in range(n):
+        for j in range(n):
+            if i == j:
+                continue
+            if not np.isfinite(engine.dist[i, j]):
+                assert engine.next_hop[i, j] == -1, f"{label}: next hop set for unreachable {i}->{j}"
+                continue
+            k, length = i, 0.0
+            for _ in range(n):
+                if k == j:
+                    break
+                step = engine.next_hop[k, j]
+                assert step >= 0, f"{label}: broken path {i}->{j} at {k}"
+                length += engine.weights[k, step]
+                k = step
+            assert k == j, f"{label}: next hops loop on {i}->{j}"
+            assert math.isclose(length, engine.dist[i, j], abs_tol=TOLERANCE), \
+                f"{label}: path {i}->{j} is {length} km, dist says {engine.dist[i, j]}"
+
+
+def check_against_rebuild(engine, rebuilt, label):
+    assert sorted(engine.names) == sorted(rebuilt.names), f"{label}: landmark sets differ"
+    order = [engine.index[name] for name in rebuilt.names]
+    dist = engine.dist[np.ix_(order, order)]
+    same = np.isclose(dist, rebuilt.dist, atol=TOLERANCE) | (np.isinf(dist) & np.isinf(rebuilt.dist))
+    assert same.all(), f"{label}: {int((~same).sum())} distances differ from a full rebuild"
+
+
+def mutate(locations, rng, tag):
+    """Copy of locations with 1-4 random additions, removals or moves."""
+    updated = [dict(loc) for loc in locations]
+    for k in range(rng.randint(1, 4)):
+        op = rng.random()
+        if op < 0.4 and len(updated) > 5:
+            updated.pop(rng.randrange(len(updated)))
+        elif op < 0.8:
+            updated.append({"name": f"N{tag}_{k}", **random_point(rng)})
+        else:
+            updated[rng.randrange(len(updated))]["lat"] += 0.003
+    return updated
+
+
+def verify(trials, seed):
+    rng = random.Random(seed)
+    updates = 0
+    for trial in range(trials):
+        locations = synthetic_locations(rng.randint(20, 60), seed=seed + trial)
+        max_edge_km = rng.choice([1.0, 1.5, 3.0])
+        engine = FloydWarshallEngine(build_landmark_graph(locations, max_edge_km), locations, max_edge_km)
+        for step in range(4):
+            locations = mutate(locations, rng, f"{trial}_{step}")
+            graph = build_landmark_graph(locations, max_edge_km)
+            engine = engine.updated(graph, locations)
+            label = f"trial {trial} step {step}"
+            check_against_rebuild(engine, FloydWarshallEngine(graph, locations, max_edge_km), label)
+            check_paths(engine, label)
+            updates += 1
+    print(f"{updates} incremental updates over {trials} trials match full rebuilds")
+
+
+def run(n, max_edge_km, seed):
+    rng = random.Random(seed)
+    locations = synthetic_locations(n)
+    engine = FloydWarshallEngine(build_landmark_graph(locations, max_edge_km), locations, max_edge_km)
+    added = locations + [{"name": "New landmark", **random_point(rng)}]
+    removed = locations[:-1]
+    moved = [dict(loc) for loc in locations]
+    moved[rng.randrange(n)]["lat"] += 0.003
+    print(f"\n{n} landmarks")
+    print(f"{'change':<12}{'incremental ms':>16}{'full rebuild ms':>17}")
+    for label, changed in (("add", added), ("remove", removed), ("move", moved)):
+        graph = build_landmark_graph(changed, max_edge_km)
+        incremental, inc_s = timed(lambda: engine.updated(graph, changed))
+        rebuilt, full_s = timed(lambda: FloydWarshallEngine(graph, changed, max_edge_km))
+        check_against_rebuild(incremental, rebuilt, f"{n} landmarks, {label}")
+        print(f"{label:<12}{inc_s * 1000:>16.1f}{full_s * 1000:>17.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=30)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 1000])
+    parser.add_argument("--max-edge-km", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    verify(args.trials, args.seed)
+    print(f"(checked in {time.perf_counter() - started:.1f} s)")
+    for n in args.sizes:
+        run(n, args.max_edge_km, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compare response encodings for route payloads: FastAPI's default path
+(jsonable_encoder + json.dumps), orjson, and MessagePack.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization [--repeat 50]
+
+Payloads are synthetic but shaped like the real responses: a get_route_async result with
+three route options, and a 10-stop multi-stop result with a stitched road polyline.
+"""
+import argparse
+import json
+import math
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.serialization import ORJSON_AVAILABLE, MSGPACK_AVAILABLE, dumps_json, dumps_msgpack
+
+
+def road_path(rng, start, end, points):
+    """Wiggly [lat, lng] path between two points, roughly like a decoded road geometry."""
+    path = []
+    for i in range(points):
+        t = i / (points - 1)
+        path.append([
+            start[0] + (end[0] - start[0]) * t + 0.002 * math.sin(t * 40) + rng.uniform(-1e-4, 1e-4),
+            start[1] + (end[1] - start[1]) * t + 0.002 * math.cos(t * 35) + rng.uniform(-1e-4, 1e-4),
+        ])
+    return path
+
+
+def route_payload(rng, points_per_route=800):
+    start, end = [30.3165, 78.0322], [30.2843, 78.0650]
+    options = []
+    for i in range(3):
+        options.append({
+            "option_name": f"Route {i+1}: {'Fast (Shortest)' if i == 0 else 'Alternate'}",
+            "description": "Shortest distance" if i == 0 else f"Alternate route #{i+1}",
+            "distance": round(rng.uniform(5, 9), 2),
+            "duration": round(rng.uniform(12, 25), 2),
+            "original_duration": round(rng.uniform(12, 25), 2),
+            "path": road_path(rng, start, end, points_per_route),
+            "steps": [{"instruction": f"Turn left onto road {k}", "distance": rng.uniform(50, 900),
+                       "duration": rng.uniform(5, 90)} for k in range(25)],
+            "traffic": "moderate",
+        })
+    return {
+        "start": {"name": "Clock Tower", "lat": start[0], "lng": start[1], "traffic_zone": "high"},
+        "end": {"name": "Badripur", "lat": end[0], "lng": end[1], "traffic_zone": "medium"},
+        "vehicle_type": "car",
+        "weather": {"condition": "clear"},
+        "traffic": "moderate",
+        "route_options": options,
+    }
+
+
+def multi_stop_payload(rng, stops=10, points_per_leg=600):
+    coords = [[30.28 + rng.random() * 0.08, 78.0 + rng.random() * 0.08] for _ in range(stops)]
+    path = []
+    for a, b in zip(coords, coords[1:]):
+        leg = road_path(rng, a, b, points_per_leg)
+        path += leg[1:] if path else leg
+    return {
+        "order": [f"Stop {i}" for i in range(stops)],
+        "path_coords": path,
+        "total_distance_km": rng.uniform(20, 40),
+    }
+
+
+def default_fastapi(payload):
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def bench(encode, payload, repeat):
+    body = encode(payload)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encode(payload)
+    return len(body), (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    rng = random.Random(7)
+    payloads = [("route (3 options)", route_payload(rng)), ("10-stop route", multi_stop_payload(rng))]
+    encoders = [("fastapi default", default_fastapi),
+                ("orjson" if ORJSON_AVAILABLE else "json (orjson missing)", dumps_json)]
+    if MSGPACK_AVAILABLE:
+        encoders.append(("msgpack", dumps_msgpack))
+    else:
+        print("msgpack not installed; skipping MessagePack")
+
+    print(f"{'payload':<20} {'encoder':<22} {'bytes':>10} {'encode ms':>10}")
+    for payload_name, payload in payloads:
+        for encoder_name, encode in encoders:
+            size, ms = bench(encode, payload, args.repeat)
+            print(f"{payload_name:<20} {encoder_name:<22} {size:>10} {ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
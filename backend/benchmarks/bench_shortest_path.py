@@ -0,0 +1,86 @@
+"""
+Compare the shortest-path backends against the original dict-based Floyd-Warshall.
+
+Run from the backend directory:
+    python -m benchmarks.bench_shortest_path [--sizes 38 300 1000] [--queries 200]
+
+Sizes other than the landmark count (38 in the bundled file) use synthetic landmarks scattered over the Dehradun area.
+"""
+import argparse
+import random
+import time
+
+from app.locations import get_all_locations
+from app.route_service import build_landmark_graph, floyd_warshall, calculate_distance
+from app.graph_engine import FloydWarshallEngine
+from app.shortest_path import DijkstraBackend, AStarBackend, ContractionHierarchyBackend
+
+# Legacy FW is O(n^3) in pure Python; skip it above this size
+LEGACY_FW_MAX_NODES = 400
+NUMPY_FW_MAX_NODES = 3000
+
+
+def synthetic_locations(n, seed=42):
+    rng = random.Random(seed)
+    return [
+        {"name": f"P{i}", "lat": 30.15 + rng.random() * 0.25, "lng": 77.85 + rng.random() * 0.3}
+        for i in range(n)
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(n, num_queries, max_edge_km):
+    landmarks = get_all_locations()
+    locations = landmarks if n == len(landmarks) else synthetic_locations(n)
+    graph, build_s = timed(lambda: build_landmark_graph(locations, max_edge_km=max_edge_km))
+    names = list(graph.keys())
+    rng = random.Random(7)
+    queries = [(rng.choice(names), rng.choice(names)) for _ in range(num_queries)]
+    coords = {loc["name"]: (loc["lat"], loc["lng"]) for loc in locations}
+    print(f"\n{n} landmarks, {sum(len(v) for v in graph.values())} edges (graph built in {build_s * 1000:.1f} ms)")
+    print(f"{'backend':<22}{'preprocess ms':>15}{'per query us':>15}")
+
+    reference = None
+    if n <= LEGACY_FW_MAX_NODES:
+        (dist, _), prep = timed(lambda: floyd_warshall(graph))
+        reference = [dist[s][t] for s, t in queries]
+        print(f"{'legacy dict FW':<22}{prep * 1000:>15.1f}{'-':>15}")
+
+    backends = []
+    if n <= NUMPY_FW_MAX_NODES:
+        backends.append(("numpy FW", lambda: FloydWarshallEngine(graph, locations, max_edge_km)))
+    backends += [
+        ("dijkstra", lambda: DijkstraBackend(graph)),
+        ("astar", lambda: AStarBackend(graph, lambda a, b: calculate_distance(*coords[a], *coords[b]))),
+        ("contraction hierarchy", lambda: ContractionHierarchyBackend(graph)),
+    ]
+    for label, factory in backends:
+        backend, prep = timed(factory)
+        results, query_s = timed(lambda: [backend.shortest_path(s, t)[1] for s, t in queries])
+        if reference is None:
+            reference = results
+        mismatches = sum(1 for a, b in zip(results, reference) if abs(a - b) > 1e-6 and a != b)
+        note = "" if not mismatches else f"  ({mismatches} mismatches!)"
+        print(f"{label:<22}{prep * 1000:>15.1f}{query_s / num_queries * 1e6:>15.1f}{note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    num_landmarks = len(get_all_locations())
+    parser.add_argument("--sizes", type=int, nargs="+", default=[num_landmarks, 300, 1000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-edge-km", type=float, default=None,
+                        help="edge radius (default 12 km for the real landmarks, 1.2 km for synthetic sets)")
+    args = parser.parse_args()
+    for n in args.sizes:
+        max_edge_km = args.max_edge_km or (12 if n == num_landmarks else 1.2)
+        run(n, args.queries, max_edge_km)
+
+
+if __name__ == "__main__":
+    main()